@@ -1,16 +1,89 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Request, request, jsonify, Response, stream_with_context, g
 from flask_cors import CORS
-import fitz  # PyMuPDF
-import tiktoken
-import faiss
-import numpy as np
-from sentence_transformers import SentenceTransformer
-from ctransformers import AutoModelForCausalLM
 import tempfile
 import os
-from werkzeug.utils import secure_filename
+import json
+import shutil
+import threading
+import time
+import uuid
+from werkzeug.exceptions import RequestEntityTooLarge
+from embedding_cache import embedding_cache, cached_query_embedding
+from embedding_store import get_embedding_store, is_extraction_failure
+from corpus_index import build_corpus_index
+from pdf_extraction import last_extraction_stats
+from upload_spool import MAX_UPLOAD_BYTES, SpooledFile, UploadFile, UploadSpool, UploadTooLarge, hash_file, temporary_spool
+from job_queue import JobQueue
+from inference_worker import QueueFullError, InferenceTimeoutError
+from prescreen import (
+    STAGE_EMBEDDING,
+    DEFAULT_TOP_N as PRESCREEN_TOP_N,
+    DEFAULT_THRESHOLD as PRESCREEN_THRESHOLD,
+)
+from fast_scoring import FAST, normalize_weights
+from batch_embedder import last_batch_stats
+from result_cache import result_cache
+from jd_revisions import (
+    jd_revision_store,
+    revision_id,
+    describe_change,
+    REUSED,
+    RECOMPUTED,
+    DEFAULT_SCORE_DELTA as REVISION_SCORE_DELTA,
+)
+from tokenization import CHUNKER_ID, last_chunking_stats
+from scoring import (
+    FULL as SCORING_FULL,
+    SCORE_ONLY,
+    DEFAULT_MODE as SCORING_MODE,
+    DEFAULT_REASONING_TOP_N,
+    last_scoring_stats,
+    reset_scoring_stats,
+    normalize_mode,
+    parse_score,
+    scored_result,
+)
+from metrics import (
+    stage_timer,
+    start_request_timings,
+    request_timings,
+    request_seconds,
+    requests_total,
+    render as render_metrics,
+    render_gauge,
+    render_counter,
+)
+from context_packing import last_packing_stats, reset_packing_stats
+from engine import (
+    registry,
+    load_embed_model,
+    get_llm_worker,
+    cached_extract_file,
+    load_resume_files,
+    scoring_cache_key,
+    build_scoring_prompt,
+    process_resume_jd_matching,
+    match_resumes,
+    fast_match_resumes,
+    jd_requirement_lists,
+    count_llm_calls,
+    count_errors,
+    EMBED_MODEL_NAME,
+    NOT_LOADED,
+    LOADING,
+    READY,
+    FAILED,
+)
+
+class UploadRequest(Request):
+    """Request whose uploaded files Werkzeug writes straight to disk, so spooling them copies nothing"""
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return UploadFile()
 
 app = Flask(__name__)
+app.request_class = UploadRequest
+# Per-request cap on the multipart body; larger requests are answered with 413 before parsing
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES
 
 # Configure CORS to allow all origins, methods, and headers
 CORS(app, resources={
@@ -21,39 +94,59 @@ CORS(app, resources={
     }
 })
 
+def debug_requested():
+    """Whether the client asked for per-stage timings with debug=1"""
+    return (request.args.get('debug') or request.form.get('debug', '')).lower() in ('1', 'true')
+
+@app.before_request
+def before_request():
+    g.request_started = time.perf_counter()
+    # Always reset, so a reused worker thread does not carry the last request's timings
+    start_request_timings(debug_requested())
+
 # Add CORS headers to all responses
 @app.after_request
 def after_request(response):
     response.headers.add('Access-Control-Allow-Origin', '*')
     response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
     response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
+    # Route patterns, not raw paths, so job ids do not create new series
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    requests_total.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    if 'request_started' in g:
+        request_seconds.observe(time.perf_counter() - g.request_started, endpoint=endpoint)
     return response
 
-# Global variables for models
-embed_model = None
-llm_model = None
-
-def load_models():
-    """Load the AI models once at startup"""
-    global embed_model, llm_model
-    if embed_model is None:
-        embed_model = SentenceTransformer("all-MiniLM-L6-v2")
-    if llm_model is None:
-        llm_model = AutoModelForCausalLM.from_pretrained(
-            "./mistral-7b-instruct-v0.2.Q4_K_M.gguf",
-            model_type="mistral",
-            gpu_layers=0,
-            max_new_tokens=256,
-            context_length=512
-        )
+def debug_fields():
+    """{'timings': per-stage totals} when the request asked for debug output, else {}"""
+    timings = request_timings()
+    return {'timings': timings} if timings is not None else {}
+
+# Corpus index over every resume in the persistent store, extended as it grows.
+# FAISS must not be searched while vectors are added, so searches hold the lock too
+store_corpus = None
+store_corpus_previews = {}
+store_corpus_count = -1
+store_corpus_newest = None
+store_corpus_lock = threading.RLock()
+
+
+# Background queue for /api/jobs; uploads are spooled under JOB_SPOOL_DIR
+job_queue = None
+job_queue_lock = threading.Lock()
+JOB_SPOOL_DIR = os.environ.get("JOB_SPOOL_DIR") or None
+
+# The only caller of the LLM; every request queues its prompts here
+llm_worker = get_llm_worker()
 
 def extract_text_from_pdf(file):
     """Extract text from PDF file"""
     try:
-        doc = fitz.open(stream=file.read(), filetype="pdf")
-        text = "\n".join([page.get_text() for page in doc])
-        file.seek(0)  # Reset file pointer
-        return text if text.strip() else "EMPTY_CONTENT"
+        # Spooled to disk and opened from there; identical uploads are only parsed once
+        with temporary_spool() as spool:
+            return cached_extract_file(spool.add(file), "ERROR_EXTRACTION")
+    except UploadTooLarge:
+        raise
     except Exception as e:
         return f"ERROR_EXTRACTION: {str(e)}"
 
@@ -76,168 +169,134 @@ def get_job_description_text(request):
     
     return None, "No job description provided (neither text nor file)"
 
-def chunk_text(text, max_tokens=80, stride=40):
-    """Chunk text into smaller pieces"""
-    enc = tiktoken.get_encoding("cl100k_base")
-    tokens = enc.encode(text)
-    chunks = []
-    for i in range(0, len(tokens), stride):
-        chunk = tokens[i:i + max_tokens]
-        chunk_text = enc.decode(chunk)
-        chunks.append(chunk_text)
-        if i + max_tokens >= len(tokens):
-            break
-    return chunks
-
-def build_faiss_index(chunks, model):
-    """Build FAISS index for chunks"""
-    embeddings = model.encode(chunks, convert_to_tensor=False)
-    dim = len(embeddings[0])
-    index = faiss.IndexFlatL2(dim)
-    index.add(np.array(embeddings).astype("float32"))
-    return index, embeddings
-
-def retrieve_chunks(query, chunks, index, model, k=3):
-    """Retrieve relevant chunks for a query"""
-    query_vec = model.encode([query], convert_to_tensor=False)
-    D, I = index.search(np.array(query_vec).astype("float32"), k)
-    return [chunks[i] for i in I[0]]
-
-def make_prompt(question, context_chunks, model_max_tokens=512):
-    """Create prompt for LLM"""
-    enc = tiktoken.get_encoding("cl100k_base")
-    
-    base_prompt = (
-        "Use the context to answer the question.\n\n"
-        f"Question: {question}\nAnswer:"
-    )
-    
-    base_tokens = len(enc.encode(base_prompt))
-    reserved_for_answer = 100
-    available_for_context = model_max_tokens - base_tokens - reserved_for_answer
-    
-    context = ""
-    used_tokens = 0
-    
-    for chunk in context_chunks:
-        chunk_with_separator = chunk + "\n\n"
-        chunk_tokens = len(enc.encode(chunk_with_separator))
-        
-        if used_tokens + chunk_tokens > available_for_context:
-            break
-            
-        context += chunk_with_separator
-        used_tokens += chunk_tokens
-    
-    prompt = (
-        "Use the context to answer the question.\n\n"
-        f"Context:\n{context}"
-        f"Question: {question}\n"
-        f"Answer:"
-    )
-    
-    final_tokens = len(enc.encode(prompt))
-    if final_tokens > model_max_tokens - 50:
-        truncate_tokens = final_tokens - (model_max_tokens - 50)
-        context_tokens = enc.encode(context)
-        if len(context_tokens) > truncate_tokens:
-            context_tokens = context_tokens[:-truncate_tokens]
-            context = enc.decode(context_tokens)
-        
-        prompt = (
-            "Use the context to answer the question.\n\n"
-            f"Context:\n{context}"
-            f"Question: {question}\n"
-            f"Answer:"
-        )
-    
-    return prompt
+def load_resume_texts(files):
+    """Extract and index uploaded resume PDFs from the files Werkzeug spooled to disk"""
+    with temporary_spool() as spool:
+        return load_resume_files(spool.add_all(files))
 
-def extract_score_from_response(response):
-    """Extract score and reasoning from LLM response"""
-    try:
-        # Look for score in the response
-        response_lower = response.lower()
-        if "score:" in response_lower:
-            score_part = response_lower.split("score:")[1].split()[0]
-            score = float(score_part)
-        elif "%" in response:
-            score_part = response.split("%")[0].split()[-1]
-            score = float(score_part)
-        else:
-            # Default score based on response length and content
-            score = min(100, len(response) / 2)
-        
-        # Ensure score is between 0 and 100
-        score = max(0, min(100, score))
-        
-        return score, response
-    except:
-        return 50.0, response
-
-def process_resume_jd_matching(resume_text, jd_text, resume_name):
-    """Process a single resume against a job description"""
-    if resume_text.startswith("ERROR_") or resume_text == "EMPTY_FILE" or resume_text == "EMPTY_CONTENT":
-        return {
-            'resume_name': resume_name,
-            'score': 0.0,
-            'reasoning': f"Error processing resume: {resume_text}",
-            'chunks_used': 0
-        }
-    
-    # Chunk the resume
-    chunks = chunk_text(resume_text)
-    
-    # Build index for this resume
-    index, embeddings = build_faiss_index(chunks, embed_model)
-    
-    # Retrieve relevant chunks based on job description
-    top_chunks = retrieve_chunks(jd_text, chunks, index, embed_model, k=3)
-    
-    # Create a scoring prompt
-    scoring_prompt = f"""
-    Please analyze how well this resume matches the job requirements and provide a score from 0-100.
-    
-    Job Requirements:
-    {jd_text[:1000]}...
-    
-    Resume Content:
-    {' '.join(top_chunks)}
-    
-    Please provide a score (0-100) and brief reasoning for the match quality.
-    Consider skills, experience, education, and overall fit.
-    
-    Format your response as:
-    Score: [number]
-    Reasoning: [brief explanation]
-    """
-    
-    try:
-        response = llm_model(scoring_prompt, max_new_tokens=150)
-        score, reasoning = extract_score_from_response(response)
-        
-        return {
-            'resume_name': resume_name,
-            'score': score,
-            'reasoning': reasoning,
-            'chunks_used': len(top_chunks)
-        }
-    except Exception as e:
-        return {
-            'resume_name': resume_name,
-            'score': 0.0,
-            'reasoning': f"Error processing: {str(e)}",
-            'chunks_used': 0
-        }
+def load_resume_text(file):
+    """Extract and index a single resume PDF"""
+    return load_resume_texts([file])[0]
+
+def get_store_corpus():
+    """Return a corpus index over all stored resumes, adding the ones stored since the last call"""
+    global store_corpus, store_corpus_count, store_corpus_newest
+    store = get_embedding_store()
+    with store_corpus_lock:
+        count = store.count(EMBED_MODEL_NAME, CHUNKER_ID)
+        if store_corpus is None or count != store_corpus_count:
+            newest = store.newest(EMBED_MODEL_NAME, CHUNKER_ID)
+            documents = []
+            for pdf_hash, text, chunks, embeddings in store.iter_documents(
+                    EMBED_MODEL_NAME, CHUNKER_ID, since=store_corpus_newest, until=newest):
+                documents.append((pdf_hash, chunks, embeddings))
+                store_corpus_previews[pdf_hash] = text[:100] + "..." if len(text) > 100 else text
+            with stage_timer("index_build"):
+                if store_corpus is None:
+                    store_corpus = build_corpus_index(documents, load_embed_model().get_sentence_embedding_dimension())
+                else:
+                    # Only the new vectors are indexed; ivf retrains once it needs more lists
+                    store_corpus.add(documents)
+            store_corpus_count = count
+            store_corpus_newest = newest
+        return store_corpus, store_corpus_previews
+
+@app.route('/api/health/live', methods=['GET'])
+def health_live():
+    """Liveness: the process is up and serving requests"""
+    return jsonify({
+        'status': 'alive',
+        'uptime_seconds': round(time.time() - registry.started_at, 1)
+    })
+
+@app.route('/api/health/ready', methods=['GET'])
+def health_ready():
+    """Readiness: both models are loaded and requests will not wait on them"""
+    body = {
+        'status': registry.state,
+        'ready': registry.state == READY,
+        'error': registry.error,
+        'startup_timings': dict(registry.startup_timings)
+    }
+    return jsonify(body), (200 if registry.state == READY else 503)
 
 @app.route('/api/status', methods=['GET'])
 def get_status():
     """Get API status"""
+    ready = registry.state == READY
     return jsonify({
-        'status': 'running',
-        'message': 'Resume Checker API is running'
+        'status': 'running' if ready else registry.state,
+        'message': 'Resume Checker API is running' if ready else f"Resume Checker API is up, models {registry.state.replace('_', ' ')}",
+        'models_ready': ready,
+        'startup_timings': dict(registry.startup_timings),
+        'embedding_cache': embedding_cache.stats(),
+        'result_cache': result_cache.stats(),
+        'jd_revisions': jd_revision_store.stats(),
+        'embedding_store': get_embedding_store().stats(),
+        'last_embedding_batch': last_batch_stats.latest(),
+        'last_chunking': last_chunking_stats.latest(),
+        'last_packing': last_packing_stats.latest(),
+        'last_scoring': last_scoring_stats.latest(),
+        'llm_queue': llm_worker.stats()
     })
 
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Request counts, stage latency histograms, queue depth, cache hit rates and model state (Prometheus text format)"""
+    queue_stats = llm_worker.stats()
+    caches = {'embedding': embedding_cache.stats(), 'result': result_cache.stats()}
+    gauges = [
+        render_gauge("resume_checker_model_state", "1 for the current model load state",
+                     {(state,): int(state == registry.state) for state in (NOT_LOADED, LOADING, READY, FAILED)},
+                     ("state",)),
+        render_gauge("resume_checker_llm_queue_depth", "Prompts waiting for the LLM worker",
+                     {(): queue_stats['queue_length']}),
+        render_gauge("resume_checker_llm_active_requests", "Requests with prompts queued",
+                     {(): queue_stats['active_requests']}),
+        render_counter("resume_checker_llm_prompts_total", "Prompts handled by the LLM worker by outcome",
+                       {(outcome,): queue_stats[outcome] for outcome in ("completed", "failed", "rejected")},
+                       ("outcome",)),
+        render_gauge("resume_checker_llm_latency_seconds", "Recent queue + generation latency percentiles",
+                     {("0.5",): queue_stats['latency_p50_seconds'], ("0.95",): queue_stats['latency_p95_seconds']},
+                     ("quantile",)),
+        render_gauge("resume_checker_cache_hit_rate", "Hit rate of each in-process cache",
+                     {(name,): stats['hit_rate'] for name, stats in caches.items()}, ("cache",)),
+        render_gauge("resume_checker_cache_entries", "Entries held by each in-process cache",
+                     {(name,): stats['entries'] for name, stats in caches.items()}, ("cache",)),
+    ]
+    if job_queue is not None:
+        gauges.append(render_gauge("resume_checker_job_queue_depth", "Background jobs waiting to run",
+                                   {(): job_queue.queue_depth()}))
+    return Response(render_metrics(*gauges), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/llm/stats', methods=['GET'])
+def get_llm_stats():
+    """Queue length and per-prompt latency of the LLM worker"""
+    return jsonify(llm_worker.stats())
+
+def error_response(error):
+    """500 with the error message, logging the traceback that the response body omits"""
+    if isinstance(error, (UploadTooLarge, RequestEntityTooLarge)):
+        return upload_too_large(error)
+    app.logger.exception("Request to %s failed", request.path)
+    return jsonify({'error': str(error)}), 500
+
+@app.errorhandler(413)
+def upload_too_large(error):
+    """413 when a request's uploads exceed UPLOAD_MAX_BYTES"""
+    limit = app.config['MAX_CONTENT_LENGTH']
+    return jsonify({
+        'error': f"Uploads exceed the limit of {limit // (1024 * 1024)} MB per request",
+        'max_bytes': limit
+    }), 413
+
+def backpressure_response(error):
+    """429 when the LLM queue is full, 503 when a prompt timed out waiting"""
+    status = 429 if isinstance(error, QueueFullError) else 503
+    return jsonify({'error': str(error), 'retry_after': error.retry_after}), status, {
+        'Retry-After': str(error.retry_after)
+    }
+
 @app.route('/api/test', methods=['GET'])
 def test_endpoint():
     """Simple test endpoint for debugging"""
@@ -251,7 +310,7 @@ def single_resume_check():
     """Check a single resume against a job description"""
     try:
         # Load models if not loaded
-        load_models()
+        registry.load_all()
         
         # Get resume file
         resume_file = request.files.get('resume')
@@ -266,15 +325,19 @@ def single_resume_check():
         # Get optional parameters
         max_score = int(request.form.get('max_score', 100))
         cutoff_score = int(request.form.get('cutoff_score', 70))
+        # A single resume is its own shortlist, so only score_only skips the reasoning
+        scoring_mode = normalize_mode(request.form.get('scoring_mode', SCORING_MODE))
         
         # Extract text from resume
-        resume_text = extract_text_from_pdf(resume_file)
+        resume_text = load_resume_text(resume_file)
         
         # Process matching
         result = process_resume_jd_matching(
             resume_text, 
             job_description, 
-            resume_file.filename
+            resume_file.filename,
+            request_id=uuid.uuid4().hex,
+            with_reasoning=scoring_mode != SCORE_ONLY
         )
         
         # Scale score to max_score
@@ -284,72 +347,448 @@ def single_resume_check():
             'score': round(scaled_score, 1),
             'reasoning': result['reasoning'],
             'resume_name': result['resume_name'],
-            'job_description_source': 'file' if 'job_description_file' in request.files else 'text'
+            'job_description_source': 'file' if 'job_description_file' in request.files else 'text',
+            'cache_hit': result.get('cache_hit', False),
+            'parse_failed': result.get('parse_failed', False),
+            **debug_fields()
         })
         
+    except (QueueFullError, InferenceTimeoutError) as e:
+        return backpressure_response(e)
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
+
+@app.route('/api/single-resume-check/stream', methods=['POST'])
+def single_resume_check_stream():
+    """
+    Check a single resume, streaming the score as soon as it is generated and
+    then the reasoning piece by piece, as server-sent events (default) or NDJSON.
+    """
+    try:
+        # Load models if not loaded
+        registry.load_all()
+        
+        resume_file = request.files.get('resume')
+        if not resume_file:
+            return jsonify({'error': 'No resume file provided'}), 400
+        
+        job_description, error = get_job_description_text(request)
+        if error:
+            return jsonify({'error': error}), 400
+        
+        max_score = int(request.form.get('max_score', 100))
+        use_sse = request.args.get('format') != 'ndjson'
+        jd_source = 'file' if 'job_description_file' in request.files else 'text'
+        resume_name = resume_file.filename
+        resume_text = load_resume_text(resume_file)
+        
+        # Failed extractions and memoized pairs are answered without the LLM
+        result = None
+        pieces = None
+        if is_extraction_failure(resume_text):
+            result = process_resume_jd_matching(resume_text, job_description, resume_name)
+        else:
+            cache_key = scoring_cache_key(resume_text, job_description)
+            cached = result_cache.get(cache_key)
+            if cached is not None:
+                result = dict(cached, resume_name=resume_name, cache_hit=True)
+            else:
+                prompt, prefix_key, top_chunks = build_scoring_prompt(resume_text, job_description)
+                pieces = llm_worker.stream(
+                    prompt,
+                    request_id=uuid.uuid4().hex,
+                    prefix_key=prefix_key,
+                    max_new_tokens=150
+                )
+    except (QueueFullError, InferenceTimeoutError) as e:
+        return backpressure_response(e)
+    except Exception as e:
+        return error_response(e)
+    
+    def event(name, payload):
+        if use_sse:
+            return f"event: {name}\ndata: {json.dumps(payload)}\n\n"
+        return json.dumps(dict(payload, event=name)) + "\n"
+    
+    def final(result):
+        return event('done', {
+            'score': round((result['score'] / 100) * max_score, 1),
+            'reasoning': result['reasoning'],
+            'resume_name': result['resume_name'],
+            'job_description_source': jd_source,
+            'cache_hit': result.get('cache_hit', False),
+            'parse_failed': result.get('parse_failed', False)
+        })
+    
+    def generate():
+        if pieces is None:
+            yield final(result)
+            return
+        # The prompt ends with the score cue, so the completion starts with the number
+        completion = ""
+        score = None
+        try:
+            for piece in pieces:
+                completion += piece
+                if score is None:
+                    score = parse_score(completion, complete=False)
+                    if score is not None:
+                        yield event('score', {'score': round((score / 100) * max_score, 1)})
+                yield event('token', {'text': piece})
+        except Exception as e:
+            yield event('error', {'error': str(e)})
+            return
+        # done carries the score already streamed; a completion ending right after
+        # its number is parsed once more now that it is complete
+        with stage_timer("parsing"):
+            scored = scored_result(completion, len(top_chunks), score=score)
+        if score is None and not scored.get('parse_failed'):
+            yield event('score', {'score': round((scored['score'] / 100) * max_score, 1)})
+        if not scored.get('parse_failed'):
+            result_cache.put(cache_key, scored)
+        yield final(dict(scored, resume_name=resume_name, cache_hit=False))
+    
+    mimetype = 'text/event-stream' if use_sse else 'application/x-ndjson'
+    return Response(stream_with_context(generate()), mimetype=mimetype)
+
+@app.route('/api/shortlist', methods=['POST'])
+def shortlist_resumes():
+    """Shortlist stored resumes by their best chunk similarity to a job description"""
+    try:
+        # Only embeddings are needed; don't wait for the LLM
+        load_embed_model()
+        
+        # Get job description (either from text or file)
+        job_description, error = get_job_description_text(request)
+        if error:
+            return jsonify({'error': error}), 400
+        
+        top_n = int(request.form.get('top_n', 10))
+        
+        with stage_timer("retrieval"):
+            query_vec = cached_query_embedding(job_description, load_embed_model(), EMBED_MODEL_NAME)
+        with store_corpus_lock:
+            corpus, previews = get_store_corpus()
+            with stage_timer("retrieval"):
+                shortlisted = corpus.shortlist(query_vec, top_n)
+            total_stored = len(previews)
+        
+        # Squared L2 on normalized embeddings -> cosine similarity
+        results = [
+            {
+                'resume_id': pdf_hash,
+                'similarity': round(1 - distance / 2, 4),
+                'preview': previews[pdf_hash]
+            }
+            for pdf_hash, distance in shortlisted
+        ]
+        
+        return jsonify({
+            'results': results,
+            'total_stored': total_stored,
+            'index_type': corpus.index_type,
+            **debug_fields()
+        })
+        
+    except Exception as e:
+        return error_response(e)
+
+def get_batch_inputs(request):
+    """Collect resume files and job description texts from a batch request"""
+    resumes = []
+    job_descriptions = []
+    
+    # Extract resume files
+    for key in request.files:
+        if key.startswith('resume_'):
+            resumes.append(request.files[key])
+    
+    # Extract job descriptions (text format for batch processing)
+    for key in request.form:
+        if key.startswith('job_description_'):
+            job_descriptions.append(request.form[key])
+    
+    # Also check for JD files in batch processing
+    for key in request.files:
+        if key.startswith('job_description_file_'):
+            jd_file = request.files[key]
+            jd_text = extract_text_from_pdf(jd_file)
+            if not jd_text.startswith("ERROR_") and jd_text != "EMPTY_CONTENT":
+                job_descriptions.append(jd_text)
+    
+    if not resumes:
+        return resumes, job_descriptions, 'No resume files provided'
+    
+    if not job_descriptions:
+        return resumes, job_descriptions, 'No job descriptions provided'
+    
+    if any(not jd.strip() for jd in job_descriptions):
+        return resumes, job_descriptions, 'Job descriptions must not be blank'
+    
+    return resumes, job_descriptions, None
+
+def summarize_jd_revisions(job_descriptions, previous_jd_ids, results):
+    """Per JD, its revision id and, when it was edited from a known revision, what changed and which resumes were rescored"""
+    summaries = []
+    for jd_idx, jd in enumerate(job_descriptions):
+        summary = {'jd_index': jd_idx, 'revision_id': revision_id(jd)}
+        previous_id = previous_jd_ids[jd_idx] if jd_idx < len(previous_jd_ids) else None
+        if previous_id:
+            previous = jd_revision_store.get(previous_id)
+            jd_results = [r for r in results if r['jd_index'] == jd_idx]
+            summary.update({
+                'previous_revision_id': previous_id,
+                'previous_found': previous is not None,
+                'change': describe_change(
+                    previous['jd_text'], jd, previous['jd_vec'],
+                    cached_query_embedding(jd, load_embed_model(), EMBED_MODEL_NAME)
+                ) if previous else None,
+                'reused': [r['resume_name'] for r in jd_results if r.get('revision_status') == REUSED],
+                'recomputed': [r['resume_name'] for r in jd_results if r.get('revision_status') == RECOMPUTED]
+            })
+        summaries.append(summary)
+    return summaries
 
 @app.route('/api/resume-checker', methods=['POST'])
 def resume_checker():
     """Check multiple resumes against multiple job descriptions"""
     try:
+        # mode=fast scores from embeddings only and never waits for the LLM
+        fast = request.form.get('mode') == FAST
         # Load models if not loaded
-        load_models()
-        
-        # Get form data
-        resumes = []
-        job_descriptions = []
+        if fast:
+            load_embed_model()
+        else:
+            registry.load_all()
         
-        # Extract resume files
-        for key in request.files:
-            if key.startswith('resume_'):
-                resumes.append(request.files[key])
+        resumes, job_descriptions, error = get_batch_inputs(request)
+        if error:
+            return jsonify({'error': error}), 400
         
-        # Extract job descriptions (text format for batch processing)
-        for key in request.form:
-            if key.startswith('job_description_'):
-                job_descriptions.append(request.form[key])
+        # Refuse up front rather than failing halfway through the batch
+        if not fast and llm_worker.is_overloaded():
+            return backpressure_response(QueueFullError(llm_worker.retry_after()))
         
-        # Also check for JD files in batch processing
-        for key in request.files:
-            if key.startswith('job_description_file_'):
-                jd_file = request.files[key]
-                jd_text = extract_text_from_pdf(jd_file)
-                if not jd_text.startswith("ERROR_") and jd_text != "EMPTY_CONTENT":
-                    job_descriptions.append(jd_text)
+        # Extract all resumes and embed new ones in shared batches
+        resume_texts = load_resume_texts(resumes)
         
-        if not resumes:
-            return jsonify({'error': 'No resume files provided'}), 400
+        if fast:
+            try:
+                weights = normalize_weights({
+                    name: request.form.get(f'weight_{name}')
+                    for name in ('mean', 'covered', 'best')
+                })
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            started = time.perf_counter()
+            results, requirements = fast_match_resumes(
+                [resume_file.filename for resume_file in resumes],
+                resume_texts,
+                job_descriptions,
+                weights
+            )
+            return jsonify({
+                'mode': FAST,
+                'results': results,
+                'total_processed': len(results),
+                'llm_calls': 0,
+                'llm_calls_skipped': len(results) - count_errors(results),
+                'errors': count_errors(results),
+                'fast_scoring_seconds': round(time.perf_counter() - started, 4),
+                'jd_requirements': requirements,
+                'cache_stats': embedding_cache.stats(),
+                'embedding_stats': dict(last_batch_stats),
+                'chunking_stats': dict(last_chunking_stats),
+                'extraction_stats': dict(last_extraction_stats),
+                **debug_fields()
+            })
         
-        if not job_descriptions:
-            return jsonify({'error': 'No job descriptions provided'}), 400
+        # Optional embedding pre-screen limiting which pairs reach the LLM
+        prescreen_top_n = int(request.form.get('prescreen_top_n', PRESCREEN_TOP_N))
+        prescreen_threshold = float(request.form.get('prescreen_threshold', PRESCREEN_THRESHOLD))
+        scoring_mode = normalize_mode(request.form.get('scoring_mode', SCORING_MODE))
+        reset_scoring_stats(scoring_mode)
+        reset_packing_stats()
+        # Revision ids from an earlier response, in JD order, for JDs that were edited since
+        previous_jd_ids = [jd_id or None for jd_id in request.form.getlist('previous_jd_id')]
         
         # Process all combinations
-        results = []
-        for resume_file in resumes:
-            resume_text = extract_text_from_pdf(resume_file)
-            
-            for jd in job_descriptions:
-                result = process_resume_jd_matching(
-                    resume_text, 
-                    jd, 
-                    resume_file.filename
-                )
-                result['job_description'] = jd[:100] + "..." if len(jd) > 100 else jd
-                results.append(result)
+        results = list(match_resumes(
+            [resume_file.filename for resume_file in resumes],
+            resume_texts,
+            job_descriptions,
+            prescreen_top_n,
+            prescreen_threshold,
+            request_id=uuid.uuid4().hex,
+            block=True,
+            scoring_mode=scoring_mode,
+            reasoning_top_n=int(request.form.get('reasoning_top_n', DEFAULT_REASONING_TOP_N)),
+            previous_jd_ids=previous_jd_ids,
+            revision_score_delta=float(request.form.get('revision_score_delta', REVISION_SCORE_DELTA))
+        ))
+        # Scored JD by JD; keep the response in resume order
+        results.sort(key=lambda r: (r['resume_index'], r['jd_index']))
         
         return jsonify({
             'results': results,
-            'total_processed': len(results)
+            'total_processed': len(results),
+            'llm_calls': count_llm_calls(results),
+            'llm_calls_skipped': sum(1 for r in results if r['score_stage'] == STAGE_EMBEDDING),
+            'errors': count_errors(results),
+            'cache_stats': embedding_cache.stats(),
+            'embedding_stats': dict(last_batch_stats),
+            'chunking_stats': dict(last_chunking_stats),
+            'packing_stats': dict(last_packing_stats),
+            'extraction_stats': dict(last_extraction_stats),
+            'scoring_stats': dict(last_scoring_stats),
+            'jd_revisions': summarize_jd_revisions(job_descriptions, previous_jd_ids, results),
+            'jd_requirements': jd_requirement_lists(job_descriptions),
+            **debug_fields()
         })
         
+    except (QueueFullError, InferenceTimeoutError) as e:
+        return backpressure_response(e)
+    except Exception as e:
+        return error_response(e)
+
+def run_matching_job(payload, start):
+    """Job runner: match the spooled resumes of a job, resuming after `start` pairs"""
+    try:
+        registry.load_all()
+        resume_texts = load_resume_files([
+            SpooledFile(resume['name'], resume['path'], resume.get('hash') or hash_file(resume['path']), None)
+            for resume in payload['resumes']
+        ])
+        yield from match_resumes(
+            [resume['name'] for resume in payload['resumes']],
+            resume_texts,
+            payload['job_descriptions'],
+            payload['prescreen_top_n'],
+            payload['prescreen_threshold'],
+            start,
+            request_id=payload['request_id'],
+            block=True,
+            scoring_mode=payload.get('scoring_mode', SCORING_FULL),
+            reasoning_top_n=payload.get('reasoning_top_n', DEFAULT_REASONING_TOP_N),
+            previous_jd_ids=payload.get('previous_jd_ids'),
+            revision_score_delta=payload.get('revision_score_delta', REVISION_SCORE_DELTA)
+        )
+    finally:
+        shutil.rmtree(payload['job_dir'], ignore_errors=True)
+
+def get_job_queue():
+    """Return the background job queue, starting its workers on first use"""
+    global job_queue
+    with job_queue_lock:
+        if job_queue is None:
+            job_queue = JobQueue(run_matching_job)
+        return job_queue
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """Queue a batch resume check and return its job id immediately"""
+    try:
+        resumes, job_descriptions, error = get_batch_inputs(request)
+        if error:
+            return jsonify({'error': error}), 400
+        
+        # Spool uploads to disk so the job outlives this request
+        if JOB_SPOOL_DIR:
+            os.makedirs(JOB_SPOOL_DIR, exist_ok=True)
+        job_dir = tempfile.mkdtemp(prefix="resume_job_", dir=JOB_SPOOL_DIR)
+        try:
+            spooled = [
+                {'name': f.name, 'path': f.path, 'hash': f.hash}
+                for f in UploadSpool(job_dir).add_all(resumes)
+            ]
+        except Exception:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            raise
+        
+        payload = {
+            'resumes': spooled,
+            'job_descriptions': job_descriptions,
+            'prescreen_top_n': int(request.form.get('prescreen_top_n', PRESCREEN_TOP_N)),
+            'prescreen_threshold': float(request.form.get('prescreen_threshold', PRESCREEN_THRESHOLD)),
+            'scoring_mode': normalize_mode(request.form.get('scoring_mode', SCORING_MODE)),
+            'reasoning_top_n': int(request.form.get('reasoning_top_n', DEFAULT_REASONING_TOP_N)),
+            'previous_jd_ids': [jd_id or None for jd_id in request.form.getlist('previous_jd_id')],
+            'revision_score_delta': float(request.form.get('revision_score_delta', REVISION_SCORE_DELTA)),
+            'job_dir': job_dir,
+            'request_id': uuid.uuid4().hex
+        }
+        job = get_job_queue().submit(payload, len(resumes) * len(job_descriptions))
+        
+        return jsonify({
+            'job_id': job.id,
+            'status': job.status,
+            'total': job.total,
+            'status_url': f"/api/jobs/{job.id}",
+            'results_url': f"/api/jobs/{job.id}/results",
+            'stream_url': f"/api/jobs/{job.id}/stream"
+        }), 202
+        
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    """Report progress and ETA of a job"""
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/jobs/<job_id>/results', methods=['GET'])
+def get_job_results(job_id):
+    """Return job results from `offset` onward, so clients can fetch them incrementally"""
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    offset = int(request.args.get('offset', 0))
+    results = job.results[offset:]
+    response = job.to_dict()
+    response.update({
+        'results': results,
+        'offset': offset,
+        'next_offset': offset + len(results),
+        'llm_calls': count_llm_calls(job.results),
+        'errors': count_errors(job.results)
+    })
+    return jsonify(response)
+
+@app.route('/api/jobs/<job_id>/stream', methods=['GET'])
+def stream_job_results(job_id):
+    """Stream job results as NDJSON (default) or server-sent events as each pair completes"""
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    use_sse = request.args.get('format') == 'sse'
+    offset = int(request.args.get('offset', 0))
+    
+    def generate():
+        position = offset
+        while True:
+            results, finished = job.wait_for_results(position)
+            for result in results:
+                line = json.dumps(result)
+                yield f"event: result\ndata: {line}\n\n" if use_sse else line + "\n"
+            position += len(results)
+            if finished and position >= job.done:
+                status = json.dumps(job.to_dict())
+                yield f"event: done\ndata: {status}\n\n" if use_sse else status + "\n"
+                return
+    
+    mimetype = 'text/event-stream' if use_sse else 'application/x-ndjson'
+    return Response(stream_with_context(generate()), mimetype=mimetype)
 
 if __name__ == '__main__':
-    print("Loading AI models...")
-    load_models()
-    print("Models loaded successfully!")
+    # Models load in the background; /api/health/ready reports when they are usable
+    print("Loading AI models in the background...")
+    registry.start_loading()
+    # Restart any persisted jobs that had not finished
+    started = time.perf_counter()
+    get_job_queue()
+    registry.record_timing('job_queue', started)
     print("Starting Flask server on http://localhost:8501")
     app.run(host='0.0.0.0', port=8501, debug=False)
\ No newline at end of file
@@ -0,0 +1,229 @@
+"""
+Autotuner for the LLM backend configuration.
+
+Benchmarks candidate thread counts, batch sizes and the quantizations of the
+configured model found next to it (e.g. *.Q4_K_M.gguf, *.Q5_K_M.gguf,
+*.Q8_0.gguf) on this CPU, and writes the fastest configuration whose scores
+agree with a reference score set to llm_config.json, where llm_backends.py
+picks it up.
+
+The reference set is a JSON list of {"resume", "job_description", "score"}
+items, scored with the API's scoring prompt (engine.build_scoring_prompt,
+which retrieves and packs each resume's context within the prompt's token
+budget with the embedding model), or {"prompt", "score"} items used as is. If the --reference file
+does not exist it is created by scoring --samples synthetic pairs with the
+largest (highest precision) quantization found, so cheaper ones are compared
+against it. A candidate agrees on a pair when its score is within
+--tolerance points of the reference, and qualifies when it agrees on at least
+--min-agreement of the pairs.
+
+Scores depend on the model file, not on threads or batch size, so agreement
+is measured once per quantization; each qualifying quantization is then
+timed for every threads x batch size combination.
+
+    python autotune.py --reference reference_scores.json
+    python autotune.py --threads 4,8 --batch-sizes 8,64 --min-agreement 0.85
+"""
+
+import gc
+import json
+import os
+import random
+import re
+import time
+
+from llm_backends import LLM_CONFIG, CONFIG_PATH, BACKENDS, STUB, load_backend, model_id, write_config
+from scoring import generation_kwargs, parse_score
+from engine import build_scoring_prompt
+
+# Quantization tag before the extension, e.g. ".Q4_K_M.gguf" or "-f16.gguf"
+QUANT_TAG = re.compile(r"[.-](I?Q\d\w*|F16|BF16|F32)\.gguf$", re.IGNORECASE)
+
+# Fixed so repeated runs of one candidate sample the same scores
+SEED = 0
+
+WORDS = ("python machine learning data engineer experience skills project team lead "
+         "university degree developed managed designed cloud kubernetes sql analytics "
+         "backend frontend api testing deployment pipeline research mentoring agile").split()
+
+
+def find_quantizations(model_path):
+    """GGUF files that differ from model_path only in their quantization tag, largest first"""
+    directory, name = os.path.split(model_path)
+    match = QUANT_TAG.search(name)
+    if not match or not os.path.isdir(directory or "."):
+        return [model_path]
+    stem = name[:match.start()]
+    paths = [
+        os.path.join(directory, other) for other in os.listdir(directory or ".")
+        if other.startswith(stem) and QUANT_TAG.fullmatch(other[len(stem):])
+    ]
+    if model_path not in paths:
+        paths.append(model_path)
+    # File size orders quantizations by precision without parsing every naming scheme
+    return sorted(paths, key=lambda path: os.path.getsize(path) if os.path.exists(path) else 0, reverse=True)
+
+
+def default_thread_counts():
+    cpus = os.cpu_count() or 1
+    return sorted({max(1, cpus // 4), max(1, cpus // 2), cpus})
+
+
+def parse_ints(value):
+    return [int(part) for part in value.split(",") if part.strip()]
+
+
+def synthetic_pairs(count, seed=SEED):
+    """Random resume / JD texts for a reference set when none is given"""
+    rng = random.Random(seed)
+    return [{
+        'resume': " ".join(rng.choices(WORDS, k=rng.randint(120, 300))),
+        'job_description': " ".join(rng.choices(WORDS, k=rng.randint(40, 120)))
+    } for _ in range(count)]
+
+
+def item_prompt(item):
+    """Scoring prompt of a reference item, built as the API builds it"""
+    if 'prompt' in item:
+        return item['prompt']
+    return build_scoring_prompt(item['resume'], item['job_description'])[0]
+
+
+def score_prompts(model, prompts):
+    """(scores, seconds per prompt) of score-only generations; unparseable scores are None"""
+    kwargs = dict(generation_kwargs(False, 0), seed=SEED)
+    scores = []
+    start = time.perf_counter()
+    for prompt in prompts:
+        scores.append(parse_score(model(prompt, **kwargs)))
+    return scores, (time.perf_counter() - start) / max(1, len(prompts))
+
+
+def agreement(scores, reference, tolerance):
+    """Share of pairs scored within tolerance of the reference, and the mean absolute error"""
+    errors = [abs(score - ref) if score is not None else None for score, ref in zip(scores, reference)]
+    agreed = sum(1 for error in errors if error is not None and error <= tolerance)
+    parsed = [error for error in errors if error is not None]
+    return {
+        'agreement': round(agreed / len(reference), 4) if reference else 0.0,
+        'mean_abs_error': round(sum(parsed) / len(parsed), 2) if parsed else None,
+        'unparsed': len(errors) - len(parsed)
+    }
+
+
+def load_reference(path, base_config, samples):
+    """Load the reference items, scoring and writing synthetic ones first if the file is missing"""
+    if os.path.exists(path):
+        with open(path) as f:
+            items = json.load(f)
+        return [item for item in items if item.get('score') is not None]
+    items = synthetic_pairs(samples)
+    model = load_backend(base_config)
+    scores, _ = score_prompts(model, [item_prompt(item) for item in items])
+    del model
+    gc.collect()
+    for item, score in zip(items, scores):
+        item['score'] = score
+    items = [item for item in items if item['score'] is not None]
+    with open(path, "w") as f:
+        json.dump(items, f, indent=2)
+    return items
+
+
+def autotune(base_config, reference_items, model_paths, thread_counts, batch_sizes,
+             tolerance=10.0, min_agreement=0.9, timing_samples=4):
+    """
+    Measure every candidate and return (best config or None, candidate results).
+
+    Candidates are ordered by seconds per pair; the best is the fastest one
+    whose quantization meets min_agreement.
+    """
+    prompts = [item_prompt(item) for item in reference_items]
+    reference = [float(item['score']) for item in reference_items]
+    timing_prompts = prompts[:timing_samples]
+    results = []
+    for path in model_paths:
+        quality_config = dict(base_config, model_path=path)
+        model = load_backend(quality_config)
+        scores, _ = score_prompts(model, prompts)
+        del model
+        gc.collect()
+        quality = agreement(scores, reference, tolerance)
+        qualifies = quality['agreement'] >= min_agreement
+        for threads in thread_counts:
+            for batch_size in batch_sizes:
+                config = dict(quality_config, threads=threads, batch_size=batch_size)
+                result = {'model': model_id(config), 'threads': threads, 'batch_size': batch_size,
+                          'qualifies': qualifies, **quality}
+                if qualifies:
+                    started = time.perf_counter()
+                    model = load_backend(config)
+                    result['load_seconds'] = round(time.perf_counter() - started, 3)
+                    # Warm up so the first prompt's allocations are not timed
+                    score_prompts(model, timing_prompts[:1])
+                    _, seconds = score_prompts(model, timing_prompts)
+                    result['seconds_per_pair'] = round(seconds, 4)
+                    del model
+                    gc.collect()
+                result['config'] = config
+                results.append(result)
+
+    timed = sorted((r for r in results if r['qualifies']), key=lambda r: r['seconds_per_pair'])
+    return (timed[0]['config'] if timed else None), timed + [r for r in results if not r['qualifies']]
+
+
+if __name__ == "__main__":
+    import argparse
+    import platform
+    import sys
+
+    parser = argparse.ArgumentParser(description="Pick the fastest LLM configuration that keeps scores")
+    parser.add_argument("--backend", choices=BACKENDS, default=LLM_CONFIG['backend'])
+    parser.add_argument("--model", default=LLM_CONFIG['model_path'],
+                        help="GGUF model; other quantizations next to it are tried too")
+    parser.add_argument("--models", help="comma-separated GGUF files to try instead of discovering them")
+    parser.add_argument("--threads", type=parse_ints, default=default_thread_counts())
+    parser.add_argument("--batch-sizes", type=parse_ints, default=[8, 64, 512])
+    parser.add_argument("--reference", default="reference_scores.json")
+    parser.add_argument("--samples", type=int, default=20,
+                        help="synthetic pairs scored when the reference file does not exist")
+    parser.add_argument("--tolerance", type=float, default=10.0, help="score points counted as agreement")
+    parser.add_argument("--min-agreement", type=float, default=0.9)
+    parser.add_argument("--timing-samples", type=int, default=4, help="pairs timed per candidate")
+    parser.add_argument("--output", default=CONFIG_PATH)
+    args = parser.parse_args()
+
+    base = dict(LLM_CONFIG, backend=args.backend, model_path=args.model)
+    if args.models:
+        paths = [path.strip() for path in args.models.split(",") if path.strip()]
+    elif args.backend == STUB:
+        paths = [args.model]
+    else:
+        paths = find_quantizations(args.model)
+
+    reference_items = load_reference(args.reference, dict(base, model_path=paths[0]), args.samples)
+    best, candidates = autotune(base, reference_items, paths, args.threads, args.batch_sizes,
+                                args.tolerance, args.min_agreement, args.timing_samples)
+    report = {
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpus': os.cpu_count(),
+        'reference': args.reference,
+        'reference_pairs': len(reference_items),
+        'tolerance': args.tolerance,
+        'min_agreement': args.min_agreement,
+        'candidates': [{k: v for k, v in c.items() if k != 'config'} for c in candidates]
+    }
+    if best is None:
+        print(json.dumps(report, indent=2))
+        sys.exit(f"No candidate agreed with the reference on {args.min_agreement:.0%} of pairs")
+    winner = candidates[0]
+    write_config(best, args.output, autotune={
+        'seconds_per_pair': winner['seconds_per_pair'],
+        'agreement': winner['agreement'],
+        'cpus': report['cpus'],
+        'tuned_at': time.strftime("%Y-%m-%dT%H:%M:%S")
+    })
+    report['best'] = best
+    report['written_to'] = args.output
+    print(json.dumps(report, indent=2))
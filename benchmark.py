@@ -0,0 +1,292 @@
+"""
+End-to-end benchmark of the resume matching pipeline.
+
+Generates a synthetic corpus of resume and job description PDFs (1-4 pages,
+varying section lengths) and times every stage of scoring each resume
+against each JD, as in process_resume_jd_matching:
+
+    extraction       spooling uploads to disk + PDF text extraction (process pool, as for uploads)
+    chunking         token windows per resume
+    embedding        batched chunk embedding
+    faiss_build      one corpus index over all chunks
+    faiss_search     JD requirement embeddings + fused top chunks of every resume per JD,
+                     packed to the prompt's token budget
+    prompt_assembly  scoring prompt per pair (engine.build_scoring_prompt, as the API)
+    llm_generation   one generation per pair through the inference worker
+    score_parsing    score and reasoning from each completion
+
+The embedding, result and PDF caches are bypassed so every run measures cold
+work, after one untimed warm-up run. By default a deterministic stub LLM
+stands in for the GGUF model so the suite runs offline; pass --llm <gguf> to
+time the real model. Each scenario also reports the process's peak resident
+memory (peak_rss_mb, reset per scenario where the kernel allows it, see
+reset_peak_rss). Results are JSON; --compare <previous.json> adds the
+per-stage ratio to an earlier run.
+
+    python benchmark.py --output bench.json
+    python benchmark.py --resumes 50 --jds 1 --compare bench.json
+"""
+
+import io
+import os
+import random
+import time
+import zlib
+
+import numpy as np
+
+from pdf_extraction import extract_pdf_batch
+from upload_spool import temporary_spool
+from tokenization import chunk_text
+from batch_embedder import embed_chunk_lists
+from corpus_index import build_corpus_index
+from jd_requirements import MULTI_QUERY, RRF_K, split_requirements
+from prescreen import prescreen, prescreen_requirements
+from inference_worker import InferenceWorker
+from scoring import generation_kwargs, parse_score
+from prompts import scoring_context
+from engine import build_scoring_prompt
+from llm_backends import LLM_CONFIG, StubLLM, load_backend
+
+STAGES = ("extraction", "chunking", "embedding", "faiss_build", "faiss_search",
+          "prompt_assembly", "llm_generation", "score_parsing")
+
+WORDS = ("python machine learning data engineer experience skills project team lead "
+         "university degree developed managed designed cloud kubernetes sql analytics "
+         "backend frontend api testing deployment pipeline research mentoring agile").split()
+SECTIONS = ("Summary", "Experience", "Education", "Skills", "Projects")
+
+
+class StubEmbedder:
+    """Hashed bag-of-words vectors with the SentenceTransformer encode interface"""
+
+    def __init__(self, dim=384):
+        self.dim = dim
+
+    def get_sentence_embedding_dimension(self):
+        return self.dim
+
+    def encode(self, texts, batch_size=32, convert_to_tensor=False, **kwargs):
+        vectors = np.zeros((len(texts), self.dim), dtype="float32")
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, zlib.crc32(word.encode("utf-8")) % self.dim] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+
+def make_pdf(rng, title, pages):
+    """PDF bytes with a title and one section per heading spread over pages"""
+    import fitz  # PyMuPDF
+
+    doc = fitz.open()
+    for page_number in range(pages):
+        page = doc.new_page()
+        lines = [title] if page_number == 0 else []
+        for heading in rng.sample(SECTIONS, k=rng.randint(2, len(SECTIONS))):
+            lines.append(heading)
+            lines.append(" ".join(rng.choices(WORDS, k=rng.randint(30, 160))))
+        page.insert_textbox(fitz.Rect(50, 50, 560, 790), "\n".join(lines), fontsize=9)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def make_corpus(resumes, jds, seed=0):
+    """Return (resume PDF bytes, JD PDF bytes) with 1-4 page resumes and 1 page JDs"""
+    rng = random.Random(seed)
+    resume_pdfs = [make_pdf(rng, f"Candidate {i}", rng.randint(1, 4)) for i in range(resumes)]
+    jd_pdfs = [make_pdf(rng, f"Job Description {i}", 1) for i in range(jds)]
+    return resume_pdfs, jd_pdfs
+
+
+def reset_peak_rss():
+    """Restart the peak RSS counter of this process (Linux only); False if it cannot be reset"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB, since start or the last reset_peak_rss"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    import resource
+    import sys
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def spool_and_extract(pdfs):
+    """Spool PDFs to disk and extract them by path, as the API does with uploads"""
+    with temporary_spool(max_bytes=float("inf")) as spool:
+        paths = [spool.add(io.BytesIO(pdf)).path for pdf in pdfs]
+        return extract_pdf_batch(paths)
+
+
+def retrieve(corpus, embed_model, jd_text, k=3, budget=None):
+    """Top chunks of every resume for a JD, retrieved and packed as the API does (engine.prescreen_resumes)"""
+    if MULTI_QUERY:
+        query_vecs = embed_model.encode(split_requirements(jd_text), convert_to_tensor=False)
+        return prescreen_requirements(corpus, query_vecs, k, rrf_k=RRF_K, budget=budget)[0]
+    query_vec = embed_model.encode([jd_text], convert_to_tensor=False)
+    return prescreen(corpus, query_vec, k, budget=budget)[0]
+
+
+def run_scenario(resume_pdfs, jd_pdfs, embed_model, worker):
+    """Time each pipeline stage for every resume x JD pair"""
+    timings = dict.fromkeys(STAGES, 0.0)
+    rss_reset = reset_peak_rss()
+
+    def timed(stage, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        timings[stage] += time.perf_counter() - start
+        return result
+
+    texts = timed("extraction", spool_and_extract, resume_pdfs + jd_pdfs)
+    resume_texts, jd_texts = texts[:len(resume_pdfs)], texts[len(resume_pdfs):]
+    chunk_lists = timed("chunking", lambda: [chunk_text(text) for text in resume_texts])
+    vector_lists = timed("embedding", embed_chunk_lists, embed_model, chunk_lists)
+    corpus = timed("faiss_build", build_corpus_index,
+                   list(zip(range(len(resume_texts)), chunk_lists, vector_lists)),
+                   embed_model.get_sentence_embedding_dimension())
+
+    kwargs = generation_kwargs(True, 150)
+    scores = []
+    for jd_text in jd_texts:
+        top_chunks = timed("faiss_search", retrieve, corpus, embed_model, jd_text, 3, scoring_context(jd_text)[2])
+        for resume_idx in range(len(resume_texts)):
+            prompt, prefix_key, _ = timed("prompt_assembly", build_scoring_prompt,
+                                          resume_texts[resume_idx], jd_text, top_chunks.get(resume_idx, []))
+            completion = timed("llm_generation", lambda: worker.generate(
+                prompt, prefix_key=prefix_key, block=True, **kwargs))
+            score = timed("score_parsing", parse_score, completion)
+            if score is not None:
+                scores.append(score)
+
+    pairs = len(resume_texts) * len(jd_texts)
+    per_item = {"extraction": len(texts), "chunking": len(resume_texts), "embedding": len(resume_texts),
+                "faiss_build": len(resume_texts), "faiss_search": len(jd_texts)}
+    return {
+        'resumes': len(resume_texts),
+        'jds': len(jd_texts),
+        'pairs': pairs,
+        'chunks': sum(len(chunks) for chunks in chunk_lists),
+        'mean_score': round(sum(scores) / len(scores), 2) if scores else None,
+        'total_seconds': round(sum(timings.values()), 4),
+        'peak_rss_mb': peak_rss_mb(),
+        'peak_rss_since_start': not rss_reset,
+        'stages': {
+            stage: {
+                'seconds': round(seconds, 4),
+                'ms_per_item': round(seconds * 1000 / max(1, per_item.get(stage, pairs)), 3)
+            }
+            for stage, seconds in timings.items()
+        }
+    }
+
+
+def run_benchmark(resume_counts=(1, 50, 200), jd_counts=(1, 10), embed_model=None, llm=None,
+                  repeat=1, seed=0):
+    """Run every resumes x JDs scenario, keeping the fastest of repeat runs per stage"""
+    embed_model = embed_model or StubEmbedder()
+    llm = llm or StubLLM()
+    worker = InferenceWorker(lambda: llm)
+    resume_pdfs, jd_pdfs = make_corpus(max(resume_counts), max(jd_counts), seed)
+    # Untimed run so imports, the encoder and the extraction pool are warm
+    run_scenario(resume_pdfs[:1], jd_pdfs[:1], embed_model, worker)
+
+    scenarios = []
+    for resumes in resume_counts:
+        for jds in jd_counts:
+            runs = [run_scenario(resume_pdfs[:resumes], jd_pdfs[:jds], embed_model, worker)
+                    for _ in range(repeat)]
+            best = min(runs, key=lambda run: run['total_seconds'])
+            for stage in STAGES:
+                best['stages'][stage] = min((run['stages'][stage] for run in runs),
+                                            key=lambda timing: timing['seconds'])
+            scenarios.append(best)
+    return scenarios
+
+
+def compare(scenarios, previous):
+    """Per-stage seconds ratio (current / previous) for scenarios present in both runs"""
+    earlier = {(s['resumes'], s['jds']): s for s in previous.get('scenarios', [])}
+    comparison = []
+    for scenario in scenarios:
+        old = earlier.get((scenario['resumes'], scenario['jds']))
+        if old is None:
+            continue
+        ratios = {
+            stage: round(timing['seconds'] / old['stages'][stage]['seconds'], 2)
+            for stage, timing in scenario['stages'].items()
+            if old['stages'].get(stage, {}).get('seconds')
+        }
+        comparison.append({'resumes': scenario['resumes'], 'jds': scenario['jds'], 'ratios': ratios})
+    return comparison
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import platform
+
+    parser = argparse.ArgumentParser(description="Resume matching pipeline benchmark")
+    parser.add_argument("--resumes", type=int, nargs="+", default=[1, 50, 200])
+    parser.add_argument("--jds", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--embed-model", default="stub",
+                        help="sentence-transformers model name, or 'stub' for hashed vectors")
+    parser.add_argument("--llm", default="stub",
+                        help="GGUF model path loaded with the configured backend (llm_backends.py), or 'stub'")
+    parser.add_argument("--stub-token-ms", type=float, default=0.0,
+                        help="simulated generation time per token of the stub LLM")
+    parser.add_argument("--output", help="write the JSON results here as well as to stdout")
+    parser.add_argument("--compare", help="earlier JSON results to compute per-stage ratios against")
+    args = parser.parse_args()
+
+    if args.embed_model == "stub":
+        embed_model = StubEmbedder()
+    else:
+        from sentence_transformers import SentenceTransformer
+        embed_model = SentenceTransformer(args.embed_model)
+    if args.llm == "stub":
+        llm = StubLLM(args.stub_token_ms / 1000)
+    else:
+        llm = load_backend(dict(LLM_CONFIG, model_path=args.llm))
+
+    results = {
+        'config': {
+            'resumes': args.resumes,
+            'jds': args.jds,
+            'repeat': args.repeat,
+            'seed': args.seed,
+            'embed_model': args.embed_model,
+            'llm': args.llm,
+            'stub_token_ms': args.stub_token_ms,
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'cpus': os.cpu_count()
+        },
+        'scenarios': run_benchmark(args.resumes, args.jds, embed_model, llm, args.repeat, args.seed)
+    }
+    if args.compare:
+        with open(args.compare) as f:
+            results['comparison'] = compare(results['scenarios'], json.load(f))
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
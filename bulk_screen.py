@@ -0,0 +1,407 @@
+"""
+Offline bulk screening of a directory or zip of resumes.
+
+Scores every resume PDF under a directory (recursively) or inside a zip
+against every job description (PDF or TXT) in a directory, with the same
+matching code as the API (engine.match_resumes and
+process_resume_jd_matching), and writes one row per pair as it goes:
+
+    python bulk_screen.py resumes.zip jds/ --output results.csv
+    python bulk_screen.py resumes/ jds/ --output results.parquet --scoring-mode fast
+
+Resumes move through three stages in batches, each stage on its own thread
+with a bounded queue (--queue-depth batches) in between, so reading the next
+batch, extracting and embedding the one after and LLM scoring all overlap
+while memory stays bounded:
+
+    read      zip members are spooled to a temp directory (upload_spool.py);
+              files in a directory are used in place
+    index     extraction in the all-core process pool, batched embedding and
+              the persistent embedding store (engine.load_resume_files)
+    score     pre-screen, packing and LLM scoring of every pair in the batch
+
+After each batch the rows are flushed (CSV: appended to the file; Parquet:
+one part file per batch in a directory named like the output) and a
+checkpoint next to the output records how many resumes are done. Rerunning
+the same command resumes after the last finished batch; --restart starts
+over. Resumes are taken in sorted name order so a rerun sees the same order.
+An existing output without a checkpoint is never replaced unless
+--overwrite is given.
+
+Pre-screen top-N and shortlist reasoning rank within a batch, so bulk runs
+offer the threshold pre-screen and the full, score_only and fast modes only.
+"""
+
+import csv
+import hashlib
+import json
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+import zipfile
+
+from upload_spool import SpooledFile, UploadSpool, hash_file, make_spool_dir
+
+DEFAULT_BATCH_SIZE = int(os.environ.get("BULK_BATCH_SIZE", "64"))
+DEFAULT_QUEUE_DEPTH = int(os.environ.get("BULK_QUEUE_DEPTH", "2"))
+
+COLUMNS = ("resume_index", "resume_name", "jd_index", "jd_name", "score", "score_stage",
+           "embedding_score", "chunks_used", "reasoning_generated", "cache_hit", "parse_failed",
+           "reasoning", "requirement_coverage")
+
+# Marks the end of a stage's output
+_DONE = object()
+
+
+class _Failure:
+    """An exception raised in a stage thread, handed downstream to the caller"""
+
+    def __init__(self, error):
+        self.error = error
+
+
+def list_resumes(source):
+    """Sorted (name, location) of the resume PDFs in a directory or zip; location is a path or zip member"""
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            members = [info.filename for info in archive.infolist()
+                       if not info.is_dir() and info.filename.lower().endswith(".pdf")]
+        return [(name, name) for name in sorted(members)]
+    if not os.path.isdir(source):
+        raise ValueError(f"{source} is neither a directory nor a zip file")
+    found = []
+    for root, _, files in os.walk(source):
+        for name in files:
+            if name.lower().endswith(".pdf"):
+                path = os.path.join(root, name)
+                found.append((os.path.relpath(path, source), path))
+    return sorted(found)
+
+
+def load_job_descriptions(directory):
+    """(names, texts) of the PDF and TXT job descriptions in a directory; unreadable ones are skipped"""
+    from engine import extract_text
+    from embedding_store import is_extraction_failure
+
+    names, texts = [], []
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if name.lower().endswith(".pdf"):
+            text = extract_text(path)
+        elif name.lower().endswith(".txt"):
+            with open(path, encoding="utf-8", errors="replace") as f:
+                text = f.read()
+        else:
+            continue
+        if is_extraction_failure(text) or not text.strip():
+            print(f"Skipping job description {name}: {text[:80]}", file=sys.stderr)
+            continue
+        names.append(name)
+        texts.append(text)
+    return names, texts
+
+
+def run_stages(batches, stages, depth=DEFAULT_QUEUE_DEPTH):
+    """
+    Yield batches after passing them through stages, one thread per stage.
+
+    Stages are connected by queues of at most depth batches, so a slow stage
+    holds back the ones before it instead of letting batches pile up.
+    """
+    inbox = queue.Queue(maxsize=depth)
+
+    def feed():
+        try:
+            for batch in batches:
+                inbox.put(batch)
+        except Exception as e:
+            inbox.put(_Failure(e))
+        inbox.put(_DONE)
+
+    def run(stage, source, sink):
+        while True:
+            item = source.get()
+            if item is _DONE or isinstance(item, _Failure):
+                sink.put(item)
+                if item is _DONE:
+                    return
+                continue
+            try:
+                sink.put(stage(item))
+            except Exception as e:
+                sink.put(_Failure(e))
+
+    threading.Thread(target=feed, name="bulk-feed", daemon=True).start()
+    source = inbox
+    for stage in stages:
+        sink = queue.Queue(maxsize=depth)
+        threading.Thread(target=run, args=(stage, source, sink), name=f"bulk-{stage.__name__}",
+                         daemon=True).start()
+        source = sink
+    while True:
+        item = source.get()
+        if item is _DONE:
+            return
+        if isinstance(item, _Failure):
+            raise item.error
+        yield item
+
+
+def read_batch(source, batch):
+    """Spool a batch of zip members to disk, or hash a batch of files in place"""
+    start, entries = batch
+    if not zipfile.is_zipfile(source):
+        files = [SpooledFile(name, path, hash_file(path), os.path.getsize(path)) for name, path in entries]
+        return start, None, files
+    directory = make_spool_dir("bulk_")
+    spool = UploadSpool(directory, max_bytes=float("inf"))
+    try:
+        with zipfile.ZipFile(source) as archive:
+            for name, member in entries:
+                with archive.open(member) as f:
+                    spool.add(f, name)
+    except Exception:
+        shutil.rmtree(directory, ignore_errors=True)
+        raise
+    return start, directory, spool.files
+
+
+def index_batch(batch):
+    """Extract and embed a batch, keeping only names and texts"""
+    from engine import load_resume_files
+
+    start, directory, files = batch
+    try:
+        texts = load_resume_files(files)
+    finally:
+        if directory:
+            shutil.rmtree(directory, ignore_errors=True)
+    return start, [f.name for f in files], texts
+
+
+def score_batch(batch, jd_names, jd_texts, scoring_mode, prescreen_threshold):
+    """Rows for every (resume, JD) pair of an indexed batch"""
+    from engine import match_resumes, fast_match_resumes
+    from fast_scoring import FAST
+
+    start, names, texts = batch
+    if scoring_mode == FAST:
+        results, _ = fast_match_resumes(names, texts, jd_texts)
+    else:
+        results = list(match_resumes(
+            names, texts, jd_texts, prescreen_top_n=0, prescreen_threshold=prescreen_threshold,
+            block=True, scoring_mode=scoring_mode
+        ))
+    rows = []
+    for result in results:
+        row = {column: result.get(column) for column in COLUMNS}
+        row['resume_index'] = start + result['resume_index']
+        row['jd_name'] = jd_names[result['jd_index']]
+        if row['requirement_coverage'] is not None:
+            row['requirement_coverage'] = json.dumps(row['requirement_coverage'])
+        rows.append(row)
+    return rows
+
+
+class CsvOutput:
+    """Rows appended to one CSV file; the checkpoint keeps its length"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def exists(self):
+        return os.path.isfile(self.path) and os.path.getsize(self.path) > 0
+
+    def resume(self, checkpoint):
+        # Anything written after the last checkpoint belongs to an unfinished batch
+        size = checkpoint.get('output_bytes', 0) if checkpoint else 0
+        with open(self.path, "a+b") as f:
+            f.truncate(size)
+
+    def write(self, rows):
+        with open(self.path, "a", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=COLUMNS)
+            if f.tell() == 0:
+                writer.writeheader()
+            writer.writerows(rows)
+            f.flush()
+            os.fsync(f.fileno())
+            return {'output_bytes': f.tell()}
+
+
+class ParquetOutput:
+    """One Parquet part file per batch in a directory; the checkpoint keeps the part count"""
+
+    def __init__(self, path):
+        self.path = path
+        self.parts = 0
+
+    def exists(self):
+        return os.path.isdir(self.path) and any(name.startswith("part-") for name in os.listdir(self.path))
+
+    def resume(self, checkpoint):
+        os.makedirs(self.path, exist_ok=True)
+        self.parts = checkpoint.get('parts', 0) if checkpoint else 0
+        for name in os.listdir(self.path):
+            if name.startswith("part-") and int(name[5:10]) >= self.parts:
+                os.remove(os.path.join(self.path, name))
+
+    def write(self, rows):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet output needs pyarrow (pip install pyarrow); use a .csv output instead")
+        table = pa.Table.from_pylist(rows, schema=pa.schema([
+            ("resume_index", pa.int64()), ("resume_name", pa.string()), ("jd_index", pa.int64()),
+            ("jd_name", pa.string()), ("score", pa.float64()), ("score_stage", pa.string()),
+            ("embedding_score", pa.float64()), ("chunks_used", pa.int64()),
+            ("reasoning_generated", pa.bool_()), ("cache_hit", pa.bool_()), ("parse_failed", pa.bool_()),
+            ("reasoning", pa.string()),
+            ("requirement_coverage", pa.string())
+        ]))
+        path = os.path.join(self.path, f"part-{self.parts:05d}.parquet")
+        pq.write_table(table, path + ".tmp")
+        os.replace(path + ".tmp", path)
+        self.parts += 1
+        return {'parts': self.parts}
+
+
+def checkpoint_path(output):
+    return output.rstrip("/\\") + ".checkpoint.json"
+
+
+def resume_signatures(source, resumes):
+    """One "name size version" string per listed resume; the version is the CRC in a zip, else the mtime"""
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            infos = [archive.getinfo(location) for _, location in resumes]
+        return [f"{name} {info.file_size} {info.CRC}" for (name, _), info in zip(resumes, infos)]
+    signatures = []
+    for name, path in resumes:
+        stat = os.stat(path)
+        signatures.append(f"{name} {stat.st_size} {stat.st_mtime_ns}")
+    return signatures
+
+
+def run_fingerprint(source, resumes, jd_texts, scoring_mode, prescreen_threshold):
+    """
+    Identifies a run's inputs and settings, so a checkpoint is only resumed by the same run.
+
+    resumes is list_resumes(source): adding, removing or changing a resume
+    shifts which ones the checkpoint's count covers, so it changes the run.
+    """
+    digest = hashlib.sha256()
+    parts = [os.path.abspath(source), scoring_mode, str(prescreen_threshold)]
+    for part in parts + resume_signatures(source, resumes) + jd_texts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def load_checkpoint(path, fingerprint):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        checkpoint = json.load(f)
+    if checkpoint.get('fingerprint') != fingerprint:
+        raise ValueError(f"{path} belongs to a run with other inputs or settings; pass --restart to start over")
+    return checkpoint
+
+
+def save_checkpoint(path, checkpoint):
+    with open(path + ".tmp", "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(path + ".tmp", path)
+
+
+def bulk_screen(source, jd_dir, output, scoring_mode, prescreen_threshold=0.0,
+                batch_size=DEFAULT_BATCH_SIZE, queue_depth=DEFAULT_QUEUE_DEPTH, restart=False, log=None,
+                overwrite=False):
+    """
+    Screen every resume in source against every JD in jd_dir, resuming from output's checkpoint.
+
+    Output left by a run without a checkpoint (or by another program) is
+    only replaced with overwrite=True.
+    """
+    from engine import registry, load_embed_model
+    from fast_scoring import FAST
+
+    jd_names, jd_texts = load_job_descriptions(jd_dir)
+    if not jd_texts:
+        raise ValueError(f"No readable job descriptions in {jd_dir}")
+    resumes = list_resumes(source)
+
+    writer = ParquetOutput(output) if output.endswith(".parquet") else CsvOutput(output)
+    state_path = checkpoint_path(output)
+    fingerprint = run_fingerprint(source, resumes, jd_texts, scoring_mode, prescreen_threshold)
+    restarted = restart and os.path.exists(state_path)
+    if restarted:
+        os.remove(state_path)
+    checkpoint = load_checkpoint(state_path, fingerprint)
+    if checkpoint is None and not restarted and not overwrite and writer.exists():
+        raise ValueError(f"{output} already exists and has no checkpoint; pass --overwrite to replace it")
+    writer.resume(checkpoint)
+    done = checkpoint['resumes_done'] if checkpoint else 0
+    if done and log:
+        log(f"Resuming after {done} of {len(resumes)} resumes")
+
+    # Load models before the stage threads need them
+    if scoring_mode == FAST:
+        load_embed_model()
+    else:
+        registry.load_all()
+
+    batches = ((start, resumes[start:start + batch_size]) for start in range(done, len(resumes), batch_size))
+    def read(batch):
+        return read_batch(source, batch)
+
+    started = time.perf_counter()
+    pairs = 0
+    for batch in run_stages(batches, [read, index_batch], queue_depth):
+        rows = score_batch(batch, jd_names, jd_texts, scoring_mode, prescreen_threshold)
+        state = writer.write(rows)
+        done = batch[0] + len(batch[1])
+        save_checkpoint(state_path, dict(state, fingerprint=fingerprint, resumes_done=done,
+                                         resumes_total=len(resumes)))
+        pairs += len(rows)
+        if log:
+            elapsed = time.perf_counter() - started
+            log(f"{done}/{len(resumes)} resumes, {pairs} pairs, {pairs / elapsed:.1f} pairs/sec")
+    return {'resumes': len(resumes), 'job_descriptions': len(jd_texts), 'pairs_written': pairs,
+            'seconds': round(time.perf_counter() - started, 2), 'output': output}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from scoring import FULL, SCORE_ONLY, DEFAULT_MODE
+    from fast_scoring import FAST
+
+    parser = argparse.ArgumentParser(description="Screen a directory or zip of resumes against a directory of JDs")
+    parser.add_argument("resumes", help="directory (searched recursively) or zip of resume PDFs")
+    parser.add_argument("jds", help="directory of job description PDF/TXT files")
+    parser.add_argument("--output", default="bulk_results.csv",
+                        help="results file: .csv, or .parquet for a directory of Parquet parts")
+    parser.add_argument("--scoring-mode", choices=(FULL, SCORE_ONLY, FAST),
+                        default=DEFAULT_MODE if DEFAULT_MODE in (FULL, SCORE_ONLY) else SCORE_ONLY)
+    parser.add_argument("--prescreen-threshold", type=float, default=0.0,
+                        help="only pairs with an embedding score at least this high reach the LLM (0 disables)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="resumes per batch")
+    parser.add_argument("--queue-depth", type=int, default=DEFAULT_QUEUE_DEPTH,
+                        help="batches buffered between pipeline stages")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and start over")
+    parser.add_argument("--overwrite", action="store_true",
+                        help="replace an existing output that has no checkpoint")
+    args = parser.parse_args()
+
+    summary = bulk_screen(
+        args.resumes, args.jds, args.output, args.scoring_mode, args.prescreen_threshold,
+        args.batch_size, args.queue_depth, args.restart,
+        log=lambda message: print(message, file=sys.stderr, flush=True),
+        overwrite=args.overwrite
+    )
+    print(json.dumps(summary, indent=2))
@@ -0,0 +1,210 @@
+"""
+Adaptive context packing for LLM prompts.
+
+The LLM's context length (llm_backends.py, default 2048 tokens) is split
+between the prompt template, the reserved answer tokens, the job description
+and the resume context. The JD gets what it needs up to CONTEXT_JD_SHARE of
+what is left and is cut on a token boundary rather than at a character
+count; everything else goes to the resume. plan_context is memoized per JD,
+so a batch tokenizes and truncates each JD once.
+
+Retrieval then fetches more candidate chunks than fit, and select_context
+picks among them greedily by maximal marginal relevance per token:
+
+    gain  = MMR_LAMBDA * relevance + (1 - MMR_LAMBDA) * (1 - max similarity to chosen chunks)
+    cost  = tokens the chunk adds, net of its overlap with chosen neighbours
+
+The gain is MMR shifted to stay positive, so the budget is filled with the
+most relevant new text left rather than left empty once chunks repeat.
+
+Chunks are 80-token windows every 40 tokens, so neighbouring windows share
+half their text. Chosen neighbours are merged into one span that carries the
+shared tokens once, and a chunk is only charged for its new tokens.
+"""
+
+import functools
+import os
+
+import numpy as np
+
+from llm_backends import LLM_CONFIG
+from metrics import RequestStats
+from tokenization import TokenChunk, count_tokens, get_encoder, CHUNK_STRIDE
+
+CONTEXT_LENGTH = LLM_CONFIG['context_length']
+JD_SHARE = float(os.environ.get("CONTEXT_JD_SHARE", "0.35"))
+MMR_LAMBDA = float(os.environ.get("CONTEXT_MMR_LAMBDA", "0.7"))
+MAX_CANDIDATES = int(os.environ.get("CONTEXT_MAX_CANDIDATES", "32"))
+
+# Shorter suffix/prefix matches are coincidence rather than window overlap
+MIN_OVERLAP_CHARS = 16
+
+# Totals of the current request since its last reset
+last_packing_stats = RequestStats("packing_stats", {
+    'documents': 0,
+    'candidates': 0,
+    'chunks': 0,
+    'merged': 0,
+    'tokens': 0,
+    'overlap_tokens_saved': 0
+})
+
+
+def reset_packing_stats():
+    """Zero the packing counters before a new request"""
+    last_packing_stats.reset()
+
+
+def truncate_tokens(text, max_tokens):
+    """text cut to its first max_tokens tokens"""
+    enc = get_encoder()
+    tokens = enc.encode(text)
+    return text if len(tokens) <= max_tokens else enc.decode(tokens[:max_tokens])
+
+
+@functools.lru_cache(maxsize=1024)
+def plan_context(jd_text, template_tokens, answer_tokens, context_length=CONTEXT_LENGTH):
+    """
+    Split the context window for one JD.
+
+    Returns (jd_text, truncated, resume_tokens): the JD fitted to its share,
+    whether it was cut, and the tokens left for resume context.
+    """
+    available = context_length - template_tokens - answer_tokens
+    if available <= 0:
+        raise ValueError(
+            f"Context length {context_length} leaves no room for the prompt "
+            f"({template_tokens} template + {answer_tokens} answer tokens)"
+        )
+    jd_tokens = count_tokens(jd_text)
+    jd_limit = int(available * JD_SHARE)
+    if jd_tokens > jd_limit:
+        return truncate_tokens(jd_text, jd_limit), True, available - jd_limit
+    return jd_text, False, available - jd_tokens
+
+
+def candidate_count(budget, k=3):
+    """Chunks to retrieve per document so select_context can fill budget tokens"""
+    # A chosen neighbour adds only a stride of new tokens; retrieve twice that many to choose from
+    return int(min(MAX_CANDIDATES, max(k, 2 * -(-budget // CHUNK_STRIDE))))
+
+
+def overlap_chars(first, second):
+    """Length of the longest suffix of first that is a prefix of second"""
+    if not first or not second:
+        return 0
+    longest = min(len(first), len(second))
+    start = len(first) - longest
+    while True:
+        # Candidate overlaps start wherever second's first character appears
+        start = first.find(second[0], start)
+        if start < 0:
+            return 0
+        length = len(first) - start
+        if length < MIN_OVERLAP_CHARS:
+            return 0
+        if second.startswith(first[start:]):
+            return length
+        start += 1
+
+
+def overlap_tokens(first, second, chars):
+    """Tokens shared by two chunks overlapping by chars characters"""
+    if not chars:
+        return 0
+    first_tokens = getattr(first, "tokens", None)
+    second_tokens = getattr(second, "tokens", None)
+    if first_tokens is not None and second_tokens is not None:
+        for length in range(min(len(first_tokens), len(second_tokens)), 0, -1):
+            if np.array_equal(first_tokens[-length:], second_tokens[:length]):
+                return length
+        return 0
+    # Plain strings (from the embedding store): prorate by characters
+    return int(count_tokens(second) * chars / len(second))
+
+
+def merge(first, second, chars, tokens):
+    """One span from two overlapping chunks, keeping token ids when both have them"""
+    text = str(first) + str(second)[chars:]
+    first_tokens = getattr(first, "tokens", None)
+    second_tokens = getattr(second, "tokens", None)
+    if first_tokens is not None and second_tokens is not None:
+        return TokenChunk(text, np.concatenate([first_tokens, second_tokens[tokens:]]))
+    return text
+
+
+def select_context(chunks, embeddings, positions, query_vecs, budget, mmr_lambda=MMR_LAMBDA):
+    """
+    Pick and merge a document's chunks for a token budget.
+
+    positions are candidate chunk positions in retrieval order; query_vecs are
+    the JD query vectors. Returns the chosen spans in document order, where
+    overlapping neighbours are merged into one span.
+    """
+    positions = sorted(set(int(p) for p in positions))
+    if not positions or budget <= 0:
+        return []
+    texts = [chunks[p] for p in positions]
+    vectors = np.asarray(embeddings, dtype="float32")[positions]
+    queries = np.asarray(query_vecs, dtype="float32").reshape(-1, vectors.shape[1])
+    relevance = (vectors @ queries.T).max(axis=1)
+    similarity = vectors @ vectors.T
+    sizes = [count_tokens(text) for text in texts]
+
+    # Overlap of each candidate with the next position, if that is a candidate too
+    index = {p: i for i, p in enumerate(positions)}
+    next_overlap = {}
+    for i, p in enumerate(positions):
+        j = index.get(p + 1)
+        if j is not None:
+            chars = overlap_chars(texts[i], texts[j])
+            next_overlap[i] = (chars, overlap_tokens(texts[i], texts[j], chars))
+
+    chosen = []
+    chosen_set = set()
+    remaining = budget
+    redundancy = np.zeros(len(positions), dtype="float32")
+    while True:
+        best, best_value, best_cost = None, 0.0, 0
+        for i in range(len(positions)):
+            if i in chosen_set:
+                continue
+            cost = sizes[i]
+            j = index.get(positions[i] - 1)
+            if j in chosen_set and j in next_overlap:
+                cost -= next_overlap[j][1]
+            j = index.get(positions[i] + 1)
+            if j in chosen_set and i in next_overlap:
+                cost -= next_overlap[i][1]
+            cost = max(1, cost)
+            if cost > remaining:
+                continue
+            gain = mmr_lambda * relevance[i] + (1 - mmr_lambda) * (1 - redundancy[i])
+            if gain > 0 and gain / cost > best_value:
+                best, best_value, best_cost = i, float(gain / cost), int(cost)
+        if best is None:
+            break
+        chosen.append(best)
+        chosen_set.add(best)
+        remaining -= best_cost
+        redundancy = np.maximum(redundancy, similarity[best])
+
+    stats = last_packing_stats.current()
+    stats['documents'] += 1
+    stats['candidates'] += len(positions)
+    stats['chunks'] += len(chosen)
+    stats['tokens'] += budget - remaining
+
+    spans = []
+    previous = None
+    for i in sorted(chosen):
+        if previous is not None and positions[i] == positions[previous] + 1 and previous in next_overlap \
+                and next_overlap[previous][0]:
+            chars, tokens = next_overlap[previous]
+            spans[-1] = merge(spans[-1], texts[i], chars, tokens)
+            stats['merged'] += 1
+            stats['overlap_tokens_saved'] += tokens
+        else:
+            spans.append(texts[i])
+        previous = i
+    return spans
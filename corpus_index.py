@@ -0,0 +1,278 @@
+"""
+One FAISS index over the chunks of many resumes.
+
+Replaces a fresh IndexFlatL2 per resume: all chunk vectors of a batch (or of
+the persistent store) go into a single index with a chunk -> resume id map,
+so one job description query retrieves the top chunks of every resume, or
+shortlists the resumes whose best chunk is closest, in a single search.
+Several queries (the requirements of one JD) can also be searched together
+and fused per resume with reciprocal rank fusion.
+
+The index type is chosen with CORPUS_INDEX_TYPE:
+    flat  exact search (default, best for request-sized batches)
+    ivf   inverted lists, for tens of thousands of stored resumes
+    hnsw  graph search, fast queries without training
+
+An index over a growing collection (the persistent store) takes new
+documents with add(); an ivf index is only retrained once the collection
+wants twice as many inverted lists as it was trained with.
+"""
+
+import math
+import os
+
+import numpy as np
+
+DEFAULT_INDEX_TYPE = os.environ.get("CORPUS_INDEX_TYPE", "flat")
+IVF_NPROBE = int(os.environ.get("CORPUS_IVF_NPROBE", "8"))
+HNSW_M = int(os.environ.get("CORPUS_HNSW_M", "32"))
+HNSW_EF_SEARCH = int(os.environ.get("CORPUS_HNSW_EF_SEARCH", "64"))
+
+# How many candidates to fetch per wanted result before falling back
+CANDIDATE_FACTOR = 4
+
+
+def ivf_nlist(n_vectors):
+    """Number of inverted lists for an ivf index over n_vectors"""
+    # FAISS wants ~39 training points per list; small corpora get fewer lists
+    return max(1, min(int(4 * math.sqrt(n_vectors)), n_vectors // 39))
+
+
+def make_index(dim, index_type, n_vectors):
+    """Create an empty FAISS index of the configured type"""
+    # Imported on first use so importing the server does not pay for FAISS
+    import faiss
+
+    if index_type == "flat":
+        return faiss.IndexFlatL2(dim)
+    if index_type == "ivf":
+        nlist = ivf_nlist(n_vectors)
+        quantizer = faiss.IndexFlatL2(dim)
+        index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_L2)
+        index.nprobe = min(IVF_NPROBE, nlist)
+        return index
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, HNSW_M)
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+        return index
+    raise ValueError(f"Unknown corpus index type: {index_type}")
+
+
+class CorpusIndex:
+    """A single FAISS index over the chunks of many documents"""
+
+    def __init__(self, dim, index_type=DEFAULT_INDEX_TYPE):
+        self.dim = dim
+        self.index_type = index_type
+        self.index = None
+        self.documents = {}
+        self.chunk_doc_ids = np.empty(0, dtype="int64")
+        self.chunk_positions = np.empty(0, dtype="int64")
+        self._doc_ids = []
+
+    @property
+    def ntotal(self):
+        return 0 if self.index is None else self.index.ntotal
+
+    def build(self, documents):
+        """Index documents given as (doc_id, chunks, embeddings) tuples"""
+        documents = [doc for doc in documents if len(doc[1])]
+        self.documents = {doc_id: (chunks, embeddings) for doc_id, chunks, embeddings in documents}
+        self._doc_ids = [doc_id for doc_id, _, _ in documents]
+
+        if documents:
+            vectors = np.ascontiguousarray(np.vstack([emb for _, _, emb in documents]), dtype="float32")
+        else:
+            vectors = np.empty((0, self.dim), dtype="float32")
+        self.chunk_doc_ids = np.concatenate(
+            [np.full(len(chunks), i, dtype="int64") for i, (_, chunks, _) in enumerate(documents)]
+        ) if documents else np.empty(0, dtype="int64")
+        self.chunk_positions = np.concatenate(
+            [np.arange(len(chunks), dtype="int64") for _, chunks, _ in documents]
+        ) if documents else np.empty(0, dtype="int64")
+
+        index_type = self.index_type
+        if index_type == "ivf" and len(vectors) < 39:
+            index_type = "flat"
+        self.index = make_index(self.dim, index_type, len(vectors))
+        if len(vectors):
+            if not self.index.is_trained:
+                self.index.train(vectors)
+            self.index.add(vectors)
+        return self
+
+    def needs_retraining(self, n_vectors):
+        """Whether an index grown to n_vectors should be rebuilt rather than added to"""
+        if self.index_type != "ivf":
+            return False
+        # 0 while a small corpus falls back to flat search
+        nlist = getattr(self.index, "nlist", 0)
+        if not nlist:
+            return n_vectors >= 39
+        return ivf_nlist(n_vectors) >= 2 * nlist
+
+    def add(self, documents):
+        """
+        Index more (doc_id, chunks, embeddings) documents; ids already indexed are skipped.
+
+        Their vectors are added to the existing index, which is only rebuilt
+        over every document when needs_retraining says so.
+        """
+        documents = [doc for doc in documents if len(doc[1]) and doc[0] not in self.documents]
+        if not documents:
+            return self
+        n_vectors = self.ntotal + sum(len(chunks) for _, chunks, _ in documents)
+        if self.index is None or self.needs_retraining(n_vectors):
+            return self.build([(doc_id, *self.documents[doc_id]) for doc_id in self._doc_ids] + documents)
+
+        first = len(self._doc_ids)
+        self.chunk_doc_ids = np.concatenate([self.chunk_doc_ids] + [
+            np.full(len(chunks), first + i, dtype="int64") for i, (_, chunks, _) in enumerate(documents)
+        ])
+        self.chunk_positions = np.concatenate([self.chunk_positions] + [
+            np.arange(len(chunks), dtype="int64") for _, chunks, _ in documents
+        ])
+        for doc_id, chunks, embeddings in documents:
+            self.documents[doc_id] = (chunks, embeddings)
+            self._doc_ids.append(doc_id)
+        self.index.add(np.ascontiguousarray(np.vstack([emb for _, _, emb in documents]), dtype="float32"))
+        return self
+
+    def _search(self, query_vecs, k):
+        if self.index_type == "hnsw":
+            self.index.hnsw.efSearch = max(HNSW_EF_SEARCH, k)
+        return self.index.search(np.ascontiguousarray(query_vecs, dtype="float32"), k)
+
+    def search_per_document(self, query_vec, k=3):
+        """
+        Return {doc_id: [(chunk_position, distance), ...]} with up to k chunks per document.
+
+        One index search serves every document; documents that did not get k
+        candidates from it are completed with an exact scan of their own vectors.
+        """
+        if not self.ntotal:
+            return {}
+        search_k = min(self.ntotal, k * len(self._doc_ids) * CANDIDATE_FACTOR)
+        D, I = self._search(query_vec, search_k)
+
+        results = {doc_id: [] for doc_id in self._doc_ids}
+        for distance, row in zip(D[0], I[0]):
+            if row < 0:
+                continue
+            doc_id = self._doc_ids[self.chunk_doc_ids[row]]
+            hits = results[doc_id]
+            if len(hits) < k:
+                hits.append((int(self.chunk_positions[row]), float(distance)))
+
+        query = np.asarray(query_vec, dtype="float32").reshape(-1)
+        for doc_id, hits in results.items():
+            chunks, embeddings = self.documents[doc_id]
+            if len(hits) < min(k, len(chunks)):
+                distances = np.sum((np.asarray(embeddings, dtype="float32") - query) ** 2, axis=1)
+                order = np.argsort(distances)[:k]
+                results[doc_id] = [(int(i), float(distances[i])) for i in order]
+        return results
+
+    def search_multi_per_document(self, query_vecs, k=3, rrf_k=60):
+        """
+        Fuse several queries into one ranking of each document's chunks.
+
+        All queries go to the index in a single search. A chunk's fused score
+        is the reciprocal rank fusion sum of 1 / (rrf_k + rank) over the
+        queries that rank it among the document's top k. Returns
+        ({doc_id: [(chunk_position, fused_score), ...]}, {doc_id: closest
+        squared L2 distance per query}). Documents that did not get k
+        candidates for every query are scored exactly from their own vectors.
+        """
+        query_vecs = np.ascontiguousarray(query_vecs, dtype="float32").reshape(-1, self.dim)
+        n_queries, n_docs = len(query_vecs), len(self._doc_ids)
+        if not self.ntotal or not n_queries:
+            return {}, {}
+        D, I = self._search(query_vecs, min(self.ntotal, k * n_docs * CANDIDATE_FACTOR))
+
+        valid = I >= 0
+        query_ids = np.broadcast_to(np.arange(n_queries)[:, None], I.shape)[valid]
+        rows, distances = I[valid], D[valid]
+        docs = self.chunk_doc_ids[rows]
+        # Hits come in distance order per query, so a stable sort by (query, doc) ranks them within each pair
+        group = query_ids * n_docs + docs
+        order = np.argsort(group, kind="stable")
+        counts = np.bincount(group, minlength=n_queries * n_docs)
+        group_starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        rank = np.empty(len(order), dtype="int64")
+        rank[order] = np.arange(len(order)) - group_starts[group[order]]
+
+        chunk_counts = np.bincount(self.chunk_doc_ids, minlength=n_docs)
+        complete = (counts.reshape(n_queries, n_docs) >= np.minimum(k, chunk_counts)).all(axis=0)
+
+        best = np.full((n_queries, n_docs), np.inf, dtype="float32")
+        first = rank == 0
+        best[query_ids[first], docs[first]] = distances[first]
+        fused_scores = np.zeros(self.ntotal, dtype="float64")
+        top = rank < k
+        np.add.at(fused_scores, rows[top], 1.0 / (rrf_k + rank[top] + 1))
+
+        fused = {}
+        coverage = {}
+        hit_rows = np.flatnonzero(fused_scores)
+        hit_rows = hit_rows[np.lexsort((self.chunk_positions[hit_rows], -fused_scores[hit_rows],
+                                        self.chunk_doc_ids[hit_rows]))]
+        for row in hit_rows:
+            doc = self.chunk_doc_ids[row]
+            if complete[doc]:
+                hits = fused.setdefault(self._doc_ids[doc], [])
+                if len(hits) < k:
+                    hits.append((int(self.chunk_positions[row]), float(fused_scores[row])))
+
+        for doc, doc_id in enumerate(self._doc_ids):
+            if complete[doc]:
+                coverage[doc_id] = best[:, doc]
+                continue
+            embeddings = np.asarray(self.documents[doc_id][1], dtype="float32")
+            doc_distances = (
+                np.sum(embeddings ** 2, axis=1)[:, None] + np.sum(query_vecs ** 2, axis=1)[None, :]
+                - 2 * embeddings @ query_vecs.T
+            )
+            doc_ranks = np.argsort(np.argsort(doc_distances, axis=0, kind="stable"), axis=0)
+            doc_scores = np.where(doc_ranks < k, 1.0 / (rrf_k + doc_ranks + 1), 0.0).sum(axis=1)
+            order = np.lexsort((np.arange(len(doc_scores)), -doc_scores))[:k]
+            fused[doc_id] = [(int(i), float(doc_scores[i])) for i in order if doc_scores[i] > 0]
+            coverage[doc_id] = np.maximum(doc_distances.min(axis=0), 0).astype("float32")
+        return fused, coverage
+
+    def top_chunks_per_document(self, query_vec, k=3):
+        """Return {doc_id: [chunk text, ...]} with the k closest chunks of each document"""
+        return {
+            doc_id: [self.documents[doc_id][0][pos] for pos, _ in hits]
+            for doc_id, hits in self.search_per_document(query_vec, k).items()
+        }
+
+    def shortlist(self, query_vec, top_n=10):
+        """
+        Return [(doc_id, distance)] for the top_n documents ranked by their closest chunk.
+
+        Distances are squared L2; for normalized embeddings similarity = 1 - distance / 2.
+        """
+        if not self.ntotal:
+            return []
+        top_n = min(top_n, len(self._doc_ids))
+        search_k = min(self.ntotal, top_n * CANDIDATE_FACTOR)
+        while True:
+            D, I = self._search(query_vec, search_k)
+            best = {}
+            for distance, row in zip(D[0], I[0]):
+                if row < 0:
+                    continue
+                doc_id = self._doc_ids[self.chunk_doc_ids[row]]
+                if doc_id not in best:
+                    best[doc_id] = float(distance)
+                    if len(best) == top_n:
+                        break
+            if len(best) >= top_n or search_k >= self.ntotal:
+                return sorted(best.items(), key=lambda item: item[1])
+            search_k = min(self.ntotal, search_k * 2)
+
+
+def build_corpus_index(documents, dim, index_type=DEFAULT_INDEX_TYPE):
+    """Build a CorpusIndex from (doc_id, chunks, embeddings) tuples"""
+    return CorpusIndex(dim, index_type).build(documents)
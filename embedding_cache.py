@@ -0,0 +1,154 @@
+"""
+Content-hash keyed cache for extracted text, chunks and embeddings.
+
+Shared by the Streamlit app (resume_checker.py) and the API server
+(api_server.py) so that every resume and job description is parsed,
+chunked and encoded once per batch instead of once per (resume, JD) pair.
+"""
+
+import hashlib
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_MAX_MB = int(os.environ.get("EMBEDDING_CACHE_MAX_MB", "512"))
+
+
+def content_hash(data):
+    """Return the SHA-256 hex digest of bytes or text"""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+def estimate_size(value):
+    """Rough resident size in bytes of a cached value"""
+    # Arrays and array-backed values such as tokenization.ChunkedDocument
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, str):
+        # Chunks from tokenization.chunk_text also hold their token ids
+        return len(value.encode("utf-8")) + 8 * len(getattr(value, "tokens", ()))
+    if isinstance(value, dict):
+        return sum(estimate_size(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_size(v) for v in value)
+    # FAISS indexes expose ntotal/d; flat storage is ntotal * d float32
+    if hasattr(value, "ntotal") and hasattr(value, "d"):
+        return int(value.ntotal) * int(value.d) * 4
+    return sys.getsizeof(value)
+
+
+class EmbeddingCache:
+    """LRU cache with a memory cap and hit/miss counters"""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return the cached value for key or None, updating LRU order"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, size=None):
+        """Store value under key, evicting least recently used entries"""
+        if size is None:
+            size = estimate_size(value)
+        if size > self.max_bytes:
+            # Larger than the whole cache; don't thrash everything else out
+            return value
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes and self._entries:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+        return value
+
+    def get_or_compute(self, key, compute, cacheable=None):
+        """Return the cached value for key, computing it on a miss and storing it unless cacheable(value) is false"""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            if cacheable is None or cacheable(value):
+                self.put(key, value)
+        return value
+
+    def clear(self):
+        """Drop all entries and reset counters"""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        """Return cache counters as a plain dict"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'current_mb': round(self.current_bytes / (1024 * 1024), 2),
+                'max_mb': round(self.max_bytes / (1024 * 1024), 2)
+            }
+
+
+# Process-wide cache shared by every caller in this process
+embedding_cache = EmbeddingCache()
+
+
+def cached_pdf_text(file_bytes, extract, cacheable=None):
+    """Return extracted text for PDF bytes, calling extract(file_bytes) once per cacheable result"""
+    return embedding_cache.get_or_compute(
+        ("text", content_hash(file_bytes)),
+        lambda: extract(file_bytes),
+        cacheable
+    )
+
+
+def cached_pdf_file_text(path, file_hash, extract, cacheable=None):
+    """Return extracted text for a spooled PDF whose content hash is known, calling extract(path) once per cacheable result"""
+    return embedding_cache.get_or_compute(("text", file_hash), lambda: extract(path), cacheable)
+
+
+def cached_query_embedding(query, model, model_name):
+    """Return the float32 embedding of a query, encoding it once per model"""
+    return embedding_cache.get_or_compute(
+        ("query", model_name, content_hash(query)),
+        lambda: np.asarray(model.encode([query], convert_to_tensor=False), dtype="float32")
+    )
+
+
+def document_key(text, model_name, chunker_id):
+    """Cache key of a document's (chunks, embeddings), like the store's (hash, model, chunker) records"""
+    return ("doc", model_name, chunker_id, content_hash(text))
+
+
+def prime_document_index(text, model_name, chunker_id, value):
+    """Seed the cache with an already computed (chunks, embeddings) tuple"""
+    return embedding_cache.put(document_key(text, model_name, chunker_id), value)
@@ -0,0 +1,254 @@
+"""
+Persistent on-disk store for extracted resume text, chunks and chunk vectors.
+
+Documents are keyed by SHA-256 of the PDF bytes, the embedding model name and
+the chunker settings. Metadata lives in SQLite and the vectors are saved as
+float32 .npy files that are memory-mapped on load, so re-screening a known
+resume skips both PDF extraction and embedding.
+
+Chunks from tokenization.chunk_text are also saved as the document's token
+ids (a uint32 .npy next to the vectors) plus each chunk's token and
+character range, and come back as a ChunkedDocument of TokenChunks.
+Documents stored before that load their chunks as plain strings.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from embedding_cache import (
+    embedding_cache,
+    content_hash,
+    prime_document_index,
+)
+from tokenization import ChunkedDocument
+
+DEFAULT_STORE_DIR = os.environ.get("EMBEDDING_STORE_DIR", ".embedding_store")
+
+
+def is_extraction_failure(text):
+    """True for the ERROR_/EMPTY_ markers returned by the extractors"""
+    return text.startswith("ERROR_") or text in ("EMPTY_FILE", "EMPTY_CONTENT")
+
+
+class EmbeddingStore:
+    """SQLite metadata plus memory-mapped float32 vector files"""
+
+    def __init__(self, root=DEFAULT_STORE_DIR):
+        self.root = root
+        self.vectors_dir = os.path.join(root, "vectors")
+        os.makedirs(self.vectors_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(root, "store.sqlite3"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS documents (
+                pdf_hash TEXT NOT NULL,
+                model_name TEXT NOT NULL,
+                chunker TEXT NOT NULL,
+                text TEXT NOT NULL,
+                chunks TEXT NOT NULL,
+                n_chunks INTEGER NOT NULL,
+                dim INTEGER NOT NULL,
+                vectors_file TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                bounds TEXT,
+                PRIMARY KEY (pdf_hash, model_name, chunker)
+            )
+            """
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(documents)")}
+        if "bounds" not in columns:
+            # Store created before chunk bounds were persisted
+            self._conn.execute("ALTER TABLE documents ADD COLUMN bounds TEXT")
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def _vectors_path(self, pdf_hash, model_name, chunker):
+        suffix = content_hash(f"{model_name}|{chunker}")[:16]
+        return os.path.join(self.vectors_dir, f"{pdf_hash}_{suffix}.npy")
+
+    @staticmethod
+    def _tokens_path(vectors_file):
+        return vectors_file[:-len(".npy")] + ".tokens.npy"
+
+    def _load_chunks(self, text, chunks_json, bounds_json, vectors_file):
+        """ChunkedDocument over the memory-mapped token ids, or plain strings without bounds"""
+        if bounds_json:
+            try:
+                tokens = np.load(self._tokens_path(vectors_file), mmap_mode="r")
+            except (OSError, ValueError):
+                tokens = None
+            if tokens is not None:
+                # One row per chunk: token start, token end, character start, character end
+                bounds = np.asarray(json.loads(bounds_json), dtype=np.int32).reshape(-1, 4)
+                return ChunkedDocument(text, tokens, bounds[:, :2], bounds[:, 2:])
+        return json.loads(chunks_json)
+
+    def load(self, pdf_hash, model_name, chunker):
+        """Return {'text', 'chunks', 'embeddings'} or None; embeddings are memory-mapped"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text, chunks, bounds, vectors_file FROM documents "
+                "WHERE pdf_hash = ? AND model_name = ? AND chunker = ?",
+                (pdf_hash, model_name, chunker)
+            ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        text, chunks_json, bounds_json, vectors_file = row
+        try:
+            embeddings = np.load(vectors_file, mmap_mode="r")
+        except (OSError, ValueError):
+            # Vector file went missing or is corrupt; treat as a miss
+            self.misses += 1
+            return None
+        self.hits += 1
+        return {
+            'text': text,
+            'chunks': self._load_chunks(text, chunks_json, bounds_json, vectors_file),
+            'embeddings': embeddings
+        }
+
+    def save(self, pdf_hash, model_name, chunker, text, chunks, embeddings):
+        """Persist text, chunks and vectors for a document"""
+        embeddings = np.ascontiguousarray(embeddings, dtype="float32")
+        vectors_file = self._vectors_path(pdf_hash, model_name, chunker)
+        self._save_array(vectors_file, embeddings)
+        bounds = None
+        # Spans index the chunked text, which differs from text only if it did not round-trip
+        if isinstance(chunks, ChunkedDocument) and chunks.text == text:
+            self._save_array(self._tokens_path(vectors_file), np.asarray(chunks.tokens, dtype=np.uint32))
+            bounds = json.dumps(np.hstack([chunks.bounds, chunks.spans]).tolist())
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents (pdf_hash, model_name, chunker, text, chunks, n_chunks, "
+                "dim, vectors_file, created_at, bounds) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (pdf_hash, model_name, chunker, text, json.dumps([str(chunk) for chunk in chunks]),
+                 len(chunks), int(embeddings.shape[1]), vectors_file, time.time(), bounds)
+            )
+            self._conn.commit()
+
+    @staticmethod
+    def _save_array(path, array):
+        tmp_file = path + ".tmp"
+        with open(tmp_file, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp_file, path)
+
+    def iter_documents(self, model_name, chunker, since=None, until=None):
+        """
+        Yield (pdf_hash, text, chunks, embeddings) for every stored document.
+
+        since and until limit them to documents saved after since and no later
+        than until (created_at timestamps, see newest).
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT pdf_hash, text, chunks, bounds, vectors_file FROM documents "
+                "WHERE model_name = ? AND chunker = ? AND created_at > ? AND created_at <= ? "
+                "ORDER BY created_at",
+                (model_name, chunker, -1.0 if since is None else since, float("inf") if until is None else until)
+            ).fetchall()
+        for pdf_hash, text, chunks_json, bounds_json, vectors_file in rows:
+            try:
+                embeddings = np.load(vectors_file, mmap_mode="r")
+            except (OSError, ValueError):
+                continue
+            yield pdf_hash, text, self._load_chunks(text, chunks_json, bounds_json, vectors_file), embeddings
+
+    def newest(self, model_name, chunker):
+        """created_at of the most recently saved document for a model and chunker, or None"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT MAX(created_at) FROM documents WHERE model_name = ? AND chunker = ?",
+                (model_name, chunker)
+            ).fetchone()[0]
+
+    def count(self, model_name, chunker):
+        """Number of stored documents for a model and chunker"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM documents WHERE model_name = ? AND chunker = ?",
+                (model_name, chunker)
+            ).fetchone()[0]
+
+    def stats(self):
+        """Return store counters as a plain dict"""
+        with self._lock:
+            documents = self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+        return {
+            'documents': documents,
+            'hits': self.hits,
+            'misses': self.misses,
+            'path': os.path.abspath(self.root)
+        }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_embedding_store():
+    """Return the process-wide store, creating it on first use"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = EmbeddingStore()
+        return _store
+
+
+def load_pdf_batch(pdfs, model_name, chunker, extract_batch, index_texts, hashes=None):
+    """
+    Return the text of each resume PDF, making sure its chunks and vectors are cached.
+
+    pdfs are PDF bytes, or paths of spooled uploads together with their
+    content hashes. Store hits load text, chunks and memory-mapped vectors
+    into the in-memory cache. Misses are extracted together with
+    extract_batch(pdfs), indexed together in one index_texts(texts) call and
+    persisted for later runs.
+    """
+    store = get_embedding_store()
+    texts = [None] * len(pdfs)
+    if hashes is None:
+        hashes = [content_hash(pdf_bytes) for pdf_bytes in pdfs]
+    to_extract = {}
+    to_index = {}
+    for i, pdf_hash in enumerate(hashes):
+        record = store.load(pdf_hash, model_name, chunker)
+        if record is not None:
+            texts[i] = record['text']
+            embedding_cache.put(("text", pdf_hash), texts[i])
+            prime_document_index(texts[i], model_name, chunker, (record['chunks'], record['embeddings']))
+            continue
+        to_index[pdf_hash] = i
+        texts[i] = embedding_cache.get(("text", pdf_hash))
+        if texts[i] is None:
+            # Identical uploads in one batch are extracted once
+            to_extract.setdefault(pdf_hash, []).append(i)
+
+    if to_extract:
+        extracted = extract_batch([pdfs[positions[0]] for positions in to_extract.values()])
+        for (pdf_hash, positions), text in zip(to_extract.items(), extracted):
+            if not is_extraction_failure(text):
+                # Failures are not cached, so a later upload of the same file is retried
+                embedding_cache.put(("text", pdf_hash), text)
+            for i in positions:
+                texts[i] = text
+
+    pending = [
+        (pdf_hash, texts[i]) for pdf_hash, i in to_index.items()
+        if not is_extraction_failure(texts[i])
+    ]
+    if pending:
+        indexed = index_texts([text for _, text in pending])
+        for (pdf_hash, text), (chunks, embeddings) in zip(pending, indexed):
+            store.save(pdf_hash, model_name, chunker, text, chunks, embeddings)
+
+    return texts
@@ -0,0 +1,566 @@
+"""
+Shared RAG engine for the API server and both Streamlit apps.
+
+One process-wide ModelRegistry loads the embedding model and the LLM on
+first use (their imports deferred too), and one InferenceWorker owns the
+LLM, so every front end in a process shares a single copy of each model.
+The extraction, indexing, retrieval, scoring and matching helpers below are
+the ones every front end calls (the API, the Streamlit apps, the bulk CLI and
+the benchmark), so a pipeline change, the result cache, JD revision reuse and
+the score parser land everywhere at once.
+
+To share one resident model between processes (e.g. the API and the
+Streamlit app on one host), run `python inference_service.py` and point the
+front ends at it with INFERENCE_SERVICE_URL; the registry then hands out
+HTTP clients with the same interface as the local models. Embeddings are
+computed locally unless INFERENCE_SERVICE_EMBEDDINGS=1.
+"""
+
+import os
+import threading
+import time
+
+from embedding_cache import content_hash, cached_pdf_text, cached_pdf_file_text, cached_query_embedding
+from embedding_store import load_pdf_batch, is_extraction_failure
+from corpus_index import build_corpus_index
+from pdf_extraction import extract_pdf_text, extract_pdf_batch, reset_extraction_stats
+from llm_backends import LLM_CONFIG, load_backend, model_id
+from inference_worker import InferenceWorker, QueueFullError, InferenceTimeoutError
+from prescreen import (
+    prescreen,
+    prescreen_requirements,
+    prescreened_result,
+    STAGE_LLM,
+    STAGE_ERROR,
+    DEFAULT_TOP_N,
+    DEFAULT_THRESHOLD,
+)
+from jd_requirements import MULTI_QUERY, RRF_K, cached_requirement_embeddings
+from fast_scoring import coverage_scores, fast_result
+from result_cache import result_cache, result_key
+from jd_revisions import (
+    jd_revision_store,
+    chunk_set_key,
+    REUSED,
+    RECOMPUTED,
+    DEFAULT_SCORE_DELTA as REVISION_SCORE_DELTA,
+)
+from scoring import (
+    FULL as SCORING_FULL,
+    SHORTLIST,
+    DEFAULT_MODE as SCORING_MODE,
+    DEFAULT_REASONING_TOP_N,
+    SCORE_CUE,
+    REASONING_CUE,
+    record_cache_lookup,
+    record_generation,
+    generation_kwargs,
+    reasoning_prompt,
+    scored_result,
+    select_for_reasoning,
+)
+from prompts import make_scoring_prefix, make_scoring_suffix, scoring_context
+from context_packing import CONTEXT_LENGTH
+from batch_embedder import index_documents_batched, reset_batch_stats
+from tokenization import chunk_text, CHUNKER_ID, reset_chunking_stats
+from metrics import stage_timer, stage_errors, observe_stage
+
+EMBED_MODEL_NAME = os.environ.get("EMBED_MODEL_NAME", "all-MiniLM-L6-v2")
+LLM_CONTEXT_LENGTH = LLM_CONFIG['context_length']
+SERVICE_URL = os.environ.get("INFERENCE_SERVICE_URL") or None
+SERVICE_EMBEDDINGS = os.environ.get("INFERENCE_SERVICE_EMBEDDINGS", "0") == "1"
+
+# Model load states reported by readiness checks
+NOT_LOADED = "not_loaded"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+# Everything besides the resume and JD that determines a scoring result
+SCORING_MODEL_ID = f"{model_id(LLM_CONFIG)}|{EMBED_MODEL_NAME}|{CHUNKER_ID}|ctx{CONTEXT_LENGTH}"
+# Bump whenever make_scoring_prefix/make_scoring_suffix change so memoized results are not reused
+SCORING_PROMPT_VERSION = "3"
+
+
+class ModelRegistry:
+    """Loads each model once per process, local or via the inference service"""
+
+    def __init__(self, service_url=SERVICE_URL):
+        self.service_url = service_url
+        self.state = NOT_LOADED
+        self.error = None
+        # Seconds spent importing and loading each component
+        self.startup_timings = {}
+        self.started_at = time.time()
+        self._embed_model = None
+        self._llm = None
+        self._embed_lock = threading.Lock()
+        self._llm_lock = threading.Lock()
+
+    def record_timing(self, component, started):
+        self.startup_timings[component] = round(time.perf_counter() - started, 3)
+
+    def load_embed_model(self):
+        """Return the embedding model, loading it on first use"""
+        if self._embed_model is None:
+            with self._embed_lock:
+                if self._embed_model is None:
+                    started = time.perf_counter()
+                    if self.service_url and SERVICE_EMBEDDINGS:
+                        from inference_service import RemoteEmbedder
+                        model = RemoteEmbedder(self.service_url)
+                    else:
+                        # Imported here so front ends start before torch is loaded
+                        from sentence_transformers import SentenceTransformer
+                        self.record_timing('import_sentence_transformers', started)
+                        started = time.perf_counter()
+                        model = SentenceTransformer(EMBED_MODEL_NAME)
+                    self._embed_model = model
+                    self.record_timing('embed_model', started)
+        return self._embed_model
+
+    def load_llm(self):
+        """Return the LLM, loading it on first use"""
+        if self._llm is None:
+            with self._llm_lock:
+                if self._llm is None:
+                    started = time.perf_counter()
+                    if self.service_url:
+                        from inference_service import RemoteLLM
+                        model = RemoteLLM(self.service_url)
+                    else:
+                        # Backend, model file and threads from llm_backends.py's config
+                        model = load_backend(LLM_CONFIG, self.startup_timings)
+                    self._llm = model
+                    self.record_timing('llm_model', started)
+        return self._llm
+
+    def load_all(self):
+        """Load both models, waiting for a load already in progress"""
+        if self.state == READY:
+            return
+        self.state = LOADING
+        try:
+            self.load_embed_model()
+            self.load_llm()
+        except Exception as e:
+            self.state = FAILED
+            self.error = str(e)
+            raise
+        self.state = READY
+        self.error = None
+        self.startup_timings['models_ready_after'] = round(time.time() - self.started_at, 3)
+
+    def start_loading(self):
+        """Load the models in a background thread so the caller can serve traffic immediately"""
+        def run():
+            try:
+                self.load_all()
+            except Exception as e:
+                print(f"Model loading failed: {e}")
+        threading.Thread(target=run, name="model-loader", daemon=True).start()
+
+
+# Process-wide registry shared by every front end in this process
+registry = ModelRegistry()
+load_embed_model = registry.load_embed_model
+load_llm = registry.load_llm
+
+_llm_worker = None
+_llm_worker_lock = threading.Lock()
+
+
+def get_llm_worker():
+    """Return the inference worker that is the only caller of the LLM in this process"""
+    global _llm_worker
+    with _llm_worker_lock:
+        if _llm_worker is None:
+            _llm_worker = InferenceWorker(load_llm)
+        return _llm_worker
+
+
+def timed_generate(prompt, request_id=None, block=False, prefix_key=None, **kwargs):
+    """
+    Generate through the LLM worker and return (text, generation seconds).
+
+    Time spent queued behind other prompts is recorded as the llm_queue
+    stage and the generation itself as the llm stage.
+    """
+    try:
+        text, seconds, queued = get_llm_worker().generate(
+            prompt, request_id=request_id, block=block, prefix_key=prefix_key, timed=True, **kwargs
+        )
+    except BaseException:
+        stage_errors.inc(stage="llm")
+        raise
+    observe_stage("llm_queue", queued)
+    observe_stage("llm", seconds)
+    return text, seconds
+
+
+def extract_text(pdf, error_prefix="ERROR_EXTRACTION", name=None):
+    """Extract text from raw PDF bytes or a PDF path (called name in error messages)"""
+    with stage_timer("extraction"):
+        return extract_pdf_text(pdf, error_prefix, name)[0]
+
+
+def extract_texts(pdfs, error_prefix="ERROR_EXTRACTION", names=None):
+    """Extract text from many PDFs in the process pool"""
+    with stage_timer("extraction"):
+        return extract_pdf_batch(pdfs, error_prefix, names=names)
+
+
+def is_extracted(text):
+    """Whether extracted text may be cached; failures are retried on the next upload"""
+    return not is_extraction_failure(text)
+
+
+def cached_extract_text(pdf_bytes, error_prefix="ERROR_EXTRACTION"):
+    """Extract text from PDF bytes; identical uploads are only parsed once"""
+    return cached_pdf_text(pdf_bytes, lambda data: extract_text(data, error_prefix), is_extracted)
+
+
+def cached_extract_file(spooled, error_prefix="ERROR_EXTRACTION"):
+    """Extract text from a spooled upload (upload_spool.SpooledFile), parsing identical files once"""
+    return cached_pdf_file_text(
+        spooled.path, spooled.hash, lambda path: extract_text(path, error_prefix, spooled.name), is_extracted
+    )
+
+
+def chunk_document(text):
+    """Chunk one document, timed as the chunking stage"""
+    with stage_timer("chunking"):
+        return chunk_text(text)
+
+
+def index_documents(texts):
+    """Chunk and embed documents with batched encoding, returning (chunks, embeddings) each"""
+    return index_documents_batched(texts, load_embed_model(), EMBED_MODEL_NAME, chunk_document, CHUNKER_ID)
+
+
+def index_document(text):
+    """Chunk and embed a document once, returning (chunks, embeddings)"""
+    return index_documents([text])[0]
+
+
+def load_resume_bytes(pdf_bytes_list, error_prefix="ERROR_EXTRACTION"):
+    """Extract and index resume PDF bytes, reusing the persistent store and batching new embeddings"""
+    reset_batch_stats()
+    reset_chunking_stats()
+    reset_extraction_stats()
+    return load_pdf_batch(
+        pdf_bytes_list, EMBED_MODEL_NAME, CHUNKER_ID,
+        lambda batch: extract_texts(batch, error_prefix), index_documents
+    )
+
+
+def load_resume_files(spooled_files, error_prefix="ERROR_EXTRACTION"):
+    """Extract and index spooled resume uploads, opening each PDF from disk in the extraction pool"""
+    reset_batch_stats()
+    reset_chunking_stats()
+    reset_extraction_stats()
+    names = {spooled.path: spooled.name for spooled in spooled_files}
+    return load_pdf_batch(
+        [spooled.path for spooled in spooled_files], EMBED_MODEL_NAME, CHUNKER_ID,
+        lambda batch: extract_texts(batch, error_prefix, [names[path] for path in batch]), index_documents,
+        hashes=[spooled.hash for spooled in spooled_files]
+    )
+
+
+def build_resume_corpus(resume_texts):
+    """Build one FAISS index over the chunks of all resumes, keyed by resume position"""
+    valid = [(i, text) for i, text in enumerate(resume_texts) if not is_extraction_failure(text)]
+    indexed = index_documents([text for _, text in valid])
+    documents = [(i, chunks, embeddings) for (i, _), (chunks, embeddings) in zip(valid, indexed)]
+    with stage_timer("index_build"):
+        return build_corpus_index(documents, load_embed_model().get_sentence_embedding_dimension())
+
+
+def retrieve_chunks(query, corpus, k=3, budget=None):
+    """
+    Retrieve the most relevant chunks of every document in the corpus for a query.
+
+    With a token budget, each document's context is packed to fill it (see
+    context_packing.py) instead of being its k closest chunks.
+    """
+    if MULTI_QUERY or budget is not None:
+        return prescreen_resumes(query, corpus, k, budget=budget)[0]
+    with stage_timer("retrieval"):
+        query_vec = cached_query_embedding(query, load_embed_model(), EMBED_MODEL_NAME)
+        return corpus.top_chunks_per_document(query_vec, k)
+
+
+def prescreen_resumes(query, corpus, k=3, top_n=DEFAULT_TOP_N, threshold=DEFAULT_THRESHOLD, budget=None):
+    """
+    Retrieve top chunks and embedding scores for every resume, and pick which go to the LLM.
+
+    Returns (top_chunks, scores, selected, coverage); coverage maps each resume
+    to its similarity per JD requirement and is empty with JD_MULTI_QUERY=0.
+    """
+    model = load_embed_model()
+    with stage_timer("retrieval"):
+        if MULTI_QUERY:
+            _, query_vecs = cached_requirement_embeddings(query, model, EMBED_MODEL_NAME)
+            return prescreen_requirements(corpus, query_vecs, k, top_n, threshold, RRF_K, budget)
+        query_vec = cached_query_embedding(query, model, EMBED_MODEL_NAME)
+        return prescreen(corpus, query_vec, k, top_n, threshold, budget) + ({},)
+
+
+def scoring_cache_key(resume_text, jd_text, with_reasoning=True):
+    """Result cache key of a resume + JD pair for the current model, prompt and output"""
+    output = "full" if with_reasoning else "score"
+    return result_key(resume_text, jd_text, SCORING_MODEL_ID, f"{SCORING_PROMPT_VERSION}:{output}")
+
+
+def build_scoring_prompt(resume_text, jd_text, top_chunks=None):
+    """Return (prompt, prefix_key, top_chunks) for scoring a resume against a JD"""
+    _, _, budget = scoring_context(jd_text)
+    if top_chunks is None:
+        # Retrieve and pack relevant chunks from a one-resume corpus
+        corpus = build_resume_corpus([resume_text])
+        top_chunks = retrieve_chunks(jd_text, corpus, k=3, budget=budget).get(0, [])
+
+    # The prefix is identical for every resume against this JD
+    scoring_prefix = make_scoring_prefix(jd_text)
+    return scoring_prefix + make_scoring_suffix(top_chunks, budget), content_hash(scoring_prefix), top_chunks
+
+
+def unreadable_result(resume_text, resume_name):
+    """Result for a resume whose text could not be extracted; no LLM call is made"""
+    return {
+        'resume_name': resume_name,
+        'score': 0.0,
+        'reasoning': f"Error processing resume: {resume_text}",
+        'chunks_used': 0,
+        'score_stage': STAGE_ERROR,
+        'embedding_score': None
+    }
+
+
+def process_resume_jd_matching(resume_text, jd_text, resume_name, top_chunks=None,
+                               request_id=None, block=False, with_reasoning=True):
+    """Process a single resume against a job description; without reasoning generation stops after the score"""
+    if is_extraction_failure(resume_text):
+        return unreadable_result(resume_text, resume_name)
+
+    # Identical resume + JD pairs are answered from memoized results
+    cache_key = scoring_cache_key(resume_text, jd_text, with_reasoning)
+    cached = result_cache.get(cache_key)
+    if cached is None and not with_reasoning:
+        # A full result answers a score-only request too
+        cached = result_cache.get(scoring_cache_key(resume_text, jd_text))
+    record_cache_lookup(cached is not None)
+    if cached is not None:
+        return dict(cached, resume_name=resume_name, cache_hit=True)
+
+    scoring_prompt, prefix_key, top_chunks = build_scoring_prompt(resume_text, jd_text, top_chunks)
+
+    try:
+        completion, seconds = timed_generate(
+            scoring_prompt,
+            request_id=request_id,
+            block=block,
+            prefix_key=prefix_key,
+            **generation_kwargs(with_reasoning, 150)
+        )
+        record_generation(completion, seconds)
+        with stage_timer("parsing"):
+            result = scored_result(completion, len(top_chunks), with_reasoning)
+        if not result.get('parse_failed'):
+            # An unparseable completion may parse on a retry, so it is not memoized
+            result_cache.put(cache_key, result)
+
+        return dict(result, resume_name=resume_name, cache_hit=False)
+    except (QueueFullError, InferenceTimeoutError):
+        # Surface backpressure to the endpoint instead of scoring 0
+        raise
+    except Exception as e:
+        return {
+            'resume_name': resume_name,
+            'score': 0.0,
+            'reasoning': f"Error processing: {str(e)}",
+            'chunks_used': 0
+        }
+
+
+def add_reasoning(result, resume_text, jd_text, top_chunks=None, request_id=None, block=False):
+    """Generate reasoning for a score-only result by continuing its prompt after the score"""
+    scoring_prompt, prefix_key, top_chunks = build_scoring_prompt(resume_text, jd_text, top_chunks)
+    completion, seconds = timed_generate(
+        reasoning_prompt(scoring_prompt, result['score']),
+        request_id=request_id,
+        block=block,
+        prefix_key=prefix_key,
+        max_new_tokens=150
+    )
+    record_generation(completion, seconds, new_pair=False)
+    result.update({
+        'reasoning': f"{SCORE_CUE} {result['score']:g}\n{REASONING_CUE}{completion}",
+        'reasoning_generated': True
+    })
+    result_cache.put(scoring_cache_key(resume_text, jd_text), {
+        'score': result['score'],
+        'reasoning': result['reasoning'],
+        'chunks_used': result['chunks_used'],
+        'reasoning_generated': True
+    })
+    return result
+
+
+def match_resumes(resume_names, resume_texts, job_descriptions,
+                  prescreen_top_n=DEFAULT_TOP_N, prescreen_threshold=DEFAULT_THRESHOLD, start=0,
+                  request_id=None, block=False, scoring_mode=SCORING_MODE,
+                  reasoning_top_n=DEFAULT_REASONING_TOP_N, previous_jd_ids=None,
+                  revision_score_delta=REVISION_SCORE_DELTA):
+    """
+    Yield one result per (resume, JD) pair, skipping the first `start` pairs.
+
+    Pairs are produced JD by JD so consecutive LLM prompts share the JD prefix.
+    In shortlist mode every pair of a JD is scored first and reasoning is then
+    generated for its best `reasoning_top_n` resumes, so results come a JD at a time.
+    previous_jd_ids[i], if set, is the revision JD i was edited from; resumes
+    whose retrieval did not change materially keep that revision's result.
+    """
+    # One corpus index over all resumes; one search per JD
+    corpus = build_resume_corpus(resume_texts)
+    screened = [
+        prescreen_resumes(jd, corpus, 3, prescreen_top_n, prescreen_threshold, budget=scoring_context(jd)[2])
+        for jd in job_descriptions
+    ]
+    resume_hashes = [content_hash(text) for text in resume_texts]
+    previous_jd_ids = list(previous_jd_ids or [])
+
+    for jd_idx, jd in enumerate(job_descriptions):
+        first_pair = jd_idx * len(resume_texts)
+        if first_pair + len(resume_texts) <= start:
+            continue
+        top_chunks, scores, selected, coverage = screened[jd_idx]
+        rev_id = jd_revision_store.record_jd(jd, cached_query_embedding(jd, load_embed_model(), EMBED_MODEL_NAME))
+        previous_id = previous_jd_ids[jd_idx] if jd_idx < len(previous_jd_ids) else None
+        chunk_keys = {resume_idx: chunk_set_key(chunks) for resume_idx, chunks in top_chunks.items()}
+
+        def score_pair(resume_idx):
+            if is_extraction_failure(resume_texts[resume_idx]):
+                result = unreadable_result(resume_texts[resume_idx], resume_names[resume_idx])
+            elif resume_idx in scores and resume_idx not in selected:
+                result = prescreened_result(
+                    resume_names[resume_idx],
+                    scores[resume_idx],
+                    len(top_chunks[resume_idx])
+                )
+            else:
+                reused = previous_id and jd_revision_store.reusable(
+                    previous_id,
+                    resume_hashes[resume_idx],
+                    chunk_keys.get(resume_idx),
+                    scores.get(resume_idx),
+                    scoring_mode == SCORING_FULL,
+                    revision_score_delta
+                )
+                if reused:
+                    result = dict(reused, resume_name=resume_names[resume_idx], cache_hit=False)
+                else:
+                    result = process_resume_jd_matching(
+                        resume_texts[resume_idx],
+                        jd,
+                        resume_names[resume_idx],
+                        top_chunks=top_chunks.get(resume_idx, []),
+                        request_id=request_id,
+                        block=block,
+                        with_reasoning=scoring_mode == SCORING_FULL
+                    )
+                if previous_id:
+                    result['revision_status'] = REUSED if reused else RECOMPUTED
+                result['score_stage'] = STAGE_LLM
+                result['embedding_score'] = scores.get(resume_idx)
+            result['job_description'] = jd[:100] + "..." if len(jd) > 100 else jd
+            if resume_idx in coverage:
+                # One entry per requirement in jd_requirements
+                result['requirement_coverage'] = [round(float(c), 3) for c in coverage[resume_idx]]
+            result['resume_index'] = resume_idx
+            result['jd_index'] = jd_idx
+            return result
+
+        if scoring_mode == SHORTLIST:
+            # Earlier pairs of a resumed JD are rescored from the result cache
+            results = [score_pair(resume_idx) for resume_idx in range(len(resume_texts))]
+            llm_scores = {
+                resume_idx: result['score'] for resume_idx, result in enumerate(results)
+                if result['score_stage'] == STAGE_LLM and not result.get('parse_failed')
+            }
+            for resume_idx in select_for_reasoning(llm_scores, reasoning_top_n):
+                if not results[resume_idx].get('reasoning_generated'):
+                    add_reasoning(
+                        results[resume_idx], resume_texts[resume_idx], jd,
+                        top_chunks.get(resume_idx, []), request_id, block
+                    )
+            pairs = enumerate(results)
+        else:
+            pairs = (
+                (resume_idx, score_pair(resume_idx)) for resume_idx in range(len(resume_texts))
+                if first_pair + resume_idx >= start
+            )
+
+        for resume_idx, result in pairs:
+            if 'reasoning_generated' in result:
+                # Scored by the LLM without error: reusable by a later edit of this JD
+                jd_revision_store.record_result(
+                    rev_id, resume_hashes[resume_idx], chunk_keys.get(resume_idx),
+                    result['embedding_score'], result
+                )
+            result['jd_revision_id'] = rev_id
+            if first_pair + resume_idx >= start:
+                yield result
+
+
+def fast_match_resumes(resume_names, resume_texts, job_descriptions, weights=None):
+    """
+    Score every (resume, JD) pair from requirement coverage alone, without the LLM.
+
+    Returns (results in resume order, requirement queries of each JD).
+    """
+    corpus = build_resume_corpus(resume_texts)
+    requirements = [cached_requirement_embeddings(jd, load_embed_model(), EMBED_MODEL_NAME) for jd in job_descriptions]
+    doc_ids = list(corpus.documents)
+    with stage_timer("fast_scoring"):
+        scores, similarities = coverage_scores(
+            [corpus.documents[doc_id][1] for doc_id in doc_ids],
+            [vecs for _, vecs in requirements],
+            weights
+        )
+    rows = {doc_id: row for row, doc_id in enumerate(doc_ids)}
+
+    results = []
+    for resume_idx, resume_text in enumerate(resume_texts):
+        for jd_idx, jd in enumerate(job_descriptions):
+            row = rows.get(resume_idx)
+            if row is None:
+                # Unreadable or empty resume: same error result as the LLM path
+                result = unreadable_result(resume_text, resume_names[resume_idx])
+            else:
+                result = fast_result(
+                    resume_names[resume_idx], scores[row, jd_idx], similarities[jd_idx][row],
+                    len(corpus.documents[resume_idx][0])
+                )
+            result['job_description'] = jd[:100] + "..." if len(jd) > 100 else jd
+            result['resume_index'] = resume_idx
+            result['jd_index'] = jd_idx
+            results.append(result)
+    return results, [queries for queries, _ in requirements]
+
+
+def jd_requirement_lists(job_descriptions):
+    """Requirement queries of each JD, matching the order of requirement_coverage"""
+    if not MULTI_QUERY:
+        return None
+    return [cached_requirement_embeddings(jd, load_embed_model(), EMBED_MODEL_NAME)[0] for jd in job_descriptions]
+
+
+def count_llm_calls(results):
+    """LLM calls made for a list of results (pre-screened and unreadable resumes make none)"""
+    return sum(1 for r in results if r['score_stage'] == STAGE_LLM)
+
+
+def count_errors(results):
+    """Results of unreadable resumes, which are neither scored by the LLM nor skipped by the pre-screen"""
+    return sum(1 for r in results if r['score_stage'] == STAGE_ERROR)
@@ -0,0 +1,158 @@
+"""
+Deterministic requirement-coverage scoring without the LLM.
+
+Reuses the chunk embeddings of the resume corpus and the requirement
+embeddings of each JD (jd_requirements.py). One matrix product gives the
+cosine similarity of every chunk to every requirement of every JD; the best
+chunk per resume and requirement is taken with a segmented max, and each
+(resume, JD) pair is scored 0-100 from three aggregates of its row:
+
+    mean     average requirement similarity
+    covered  share of requirements with similarity >= FAST_COVERED_AT
+    best     similarity of the best matched requirement
+
+Similarities are first rescaled from [FAST_SIM_FLOOR, FAST_SIM_CEILING] to
+[0, 1], since sentence embeddings of unrelated text rarely score near 0 and
+close matches rarely near 1. The weights default to FAST_WEIGHT_MEAN,
+FAST_WEIGHT_COVERED and FAST_WEIGHT_BEST and are normalized to sum to 1.
+
+Run `python fast_scoring.py` to time 200 resumes x 10 JDs.
+"""
+
+import os
+
+import numpy as np
+
+FAST = "fast"
+STAGE_FAST = "fast"
+
+DEFAULT_WEIGHTS = {
+    'mean': float(os.environ.get("FAST_WEIGHT_MEAN", "0.6")),
+    'covered': float(os.environ.get("FAST_WEIGHT_COVERED", "0.3")),
+    'best': float(os.environ.get("FAST_WEIGHT_BEST", "0.1"))
+}
+SIM_FLOOR = float(os.environ.get("FAST_SIM_FLOOR", "0.15"))
+SIM_CEILING = float(os.environ.get("FAST_SIM_CEILING", "0.65"))
+COVERED_AT = float(os.environ.get("FAST_COVERED_AT", "0.5"))
+
+
+def normalize_weights(weights=None):
+    """Default weights overridden by the given ones, scaled to sum to 1"""
+    merged = dict(DEFAULT_WEIGHTS)
+    merged.update({name: float(value) for name, value in (weights or {}).items() if value is not None})
+    unknown = set(merged) - set(DEFAULT_WEIGHTS)
+    if unknown:
+        raise ValueError(f"Unknown fast scoring weights: {', '.join(sorted(unknown))}")
+    total = sum(merged.values())
+    if total <= 0 or min(merged.values()) < 0:
+        raise ValueError("Fast scoring weights must be non-negative and not all zero")
+    return {name: value / total for name, value in merged.items()}
+
+
+def similarity_matrix(documents, requirement_vecs):
+    """
+    Best cosine similarity of any chunk of each document to each requirement.
+
+    documents is a list of chunk embedding arrays (normalized, non-empty);
+    returns an (n_documents, n_requirements) float32 array.
+    """
+    lengths = [len(embeddings) for embeddings in documents]
+    vectors = np.vstack(documents).astype("float32", copy=False)
+    similarities = vectors @ np.asarray(requirement_vecs, dtype="float32").T
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    return np.maximum.reduceat(similarities, starts, axis=0)
+
+
+def coverage_scores(documents, requirement_vec_lists, weights=None):
+    """
+    Score every document against every JD from requirement coverage.
+
+    requirement_vec_lists holds one (n_requirements, dim) array per JD; a JD
+    without requirements scores 0. Returns (scores, similarities): scores is
+    an (n_documents, n_jds) float64 array of 0-100 scores and similarities a
+    list with each JD's (n_documents, n_requirements) best-chunk similarity
+    matrix.
+    """
+    weights = normalize_weights(weights)
+    n_docs, n_jds = len(documents), len(requirement_vec_lists)
+    scores = np.zeros((n_docs, n_jds))
+    splits = [np.zeros((n_docs, 0), dtype="float32")] * n_jds
+    scored_jds = [j for j, vecs in enumerate(requirement_vec_lists) if len(vecs)]
+    if not n_docs or not scored_jds:
+        return scores, splits
+
+    counts = np.array([len(requirement_vec_lists[j]) for j in scored_jds])
+    n_jds = len(scored_jds)
+    # Every requirement of every JD in one product
+    similarities = similarity_matrix(documents, np.vstack([requirement_vec_lists[j] for j in scored_jds]))
+    rescaled = np.clip((similarities - SIM_FLOOR) / (SIM_CEILING - SIM_FLOOR), 0, 1)
+
+    # Requirement -> JD averaging matrix turns per-requirement values into per-JD means
+    jd_of_requirement = np.repeat(np.arange(n_jds), counts)
+    averaging = np.zeros((len(jd_of_requirement), n_jds), dtype="float32")
+    averaging[np.arange(len(jd_of_requirement)), jd_of_requirement] = 1.0 / counts[jd_of_requirement]
+
+    mean = rescaled @ averaging
+    covered = (rescaled >= COVERED_AT).astype("float32") @ averaging
+    best = np.maximum.reduceat(rescaled, np.concatenate(([0], np.cumsum(counts)[:-1])), axis=1)
+    # float64 before rounding, so 98.7 does not come back as 98.69999694824219
+    scores[:, scored_jds] = 100 * (weights['mean'] * mean + weights['covered'] * covered + weights['best'] * best)
+
+    for j, split in zip(scored_jds, np.split(np.clip(similarities, 0, 1), np.cumsum(counts)[:-1], axis=1)):
+        splits[j] = split
+    return np.round(scores, 1), splits
+
+
+def covered_count(similarities):
+    """Number of requirements a document covers, from its row of best-chunk similarities"""
+    rescaled = (np.asarray(similarities) - SIM_FLOOR) / (SIM_CEILING - SIM_FLOOR)
+    return int((rescaled >= COVERED_AT).sum())
+
+
+def fast_result(resume_name, score, similarities, chunks_used):
+    """Result dict for a pair scored by requirement coverage only"""
+    return {
+        'resume_name': resume_name,
+        'score': round(float(score), 1),
+        'reasoning': (
+            f"Requirement coverage score (no LLM): {covered_count(similarities)} of "
+            f"{len(similarities)} requirements covered"
+        ),
+        'chunks_used': chunks_used,
+        'score_stage': STAGE_FAST,
+        'embedding_score': round(float(score), 1),
+        'requirement_coverage': [round(float(s), 3) for s in similarities]
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import time
+
+    parser = argparse.ArgumentParser(description="Fast coverage scoring benchmark")
+    parser.add_argument("--resumes", type=int, default=200)
+    parser.add_argument("--jds", type=int, default=10)
+    parser.add_argument("--chunks", type=int, default=50, help="chunks per resume")
+    parser.add_argument("--requirements", type=int, default=16, help="requirements per JD")
+    parser.add_argument("--dim", type=int, default=384)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+
+    def normalized(*shape):
+        vectors = rng.standard_normal(shape).astype("float32")
+        return vectors / np.linalg.norm(vectors, axis=-1, keepdims=True)
+
+    documents = [normalized(int(rng.integers(1, 2 * args.chunks)), args.dim) for _ in range(args.resumes)]
+    requirements = [normalized(args.requirements, args.dim) for _ in range(args.jds)]
+    start = time.perf_counter()
+    scores, _ = coverage_scores(documents, requirements)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({
+        'resumes': args.resumes,
+        'jds': args.jds,
+        'chunks': sum(len(d) for d in documents),
+        'pairs': scores.size,
+        'seconds': round(elapsed, 4)
+    }, indent=2))
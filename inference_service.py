@@ -0,0 +1,230 @@
+"""
+Local HTTP inference service sharing one resident model between front ends.
+
+Run `python inference_service.py` once per host and start the API server
+and the Streamlit apps with INFERENCE_SERVICE_URL=http://127.0.0.1:8502;
+their engine.ModelRegistry then returns RemoteLLM (and, with
+INFERENCE_SERVICE_EMBEDDINGS=1, RemoteEmbedder) instead of loading the
+models, so the host holds a single copy of the 7B model.
+
+The service queues every prompt on its own InferenceWorker, keyed by the
+client id each front end sends, so the rotation is fair across front ends.
+Generation streams back as NDJSON lines ({"text": piece} ... {"done": true});
+a full queue is answered with HTTP 429, which RemoteLLM raises as
+QueueFullError so callers see the same back-pressure as with a local model.
+
+Endpoints:
+    POST /generate  {"prompt", "client", "stream", "max_new_tokens", "stop", ...}
+    POST /embed     {"texts", "batch_size"} -> {"shape", "vectors": base64 float32}
+    GET  /info      model names and embedding dimension
+    GET  /health    load state, startup timings and LLM queue stats
+"""
+
+import base64
+import json
+import os
+import socket
+import urllib.error
+import urllib.request
+
+import numpy as np
+
+from inference_worker import QueueFullError
+
+DEFAULT_HOST = os.environ.get("INFERENCE_SERVICE_HOST", "127.0.0.1")
+DEFAULT_PORT = int(os.environ.get("INFERENCE_SERVICE_PORT", "8502"))
+CLIENT_TIMEOUT = float(os.environ.get("INFERENCE_SERVICE_TIMEOUT", "600"))
+CLIENT_ID = os.environ.get("INFERENCE_CLIENT_ID") or f"{socket.gethostname()}:{os.getpid()}"
+
+# Model keyword arguments a client may pass through to generation
+GENERATION_ARGS = ('max_new_tokens', 'stop', 'temperature', 'top_k', 'top_p', 'repetition_penalty', 'seed')
+
+
+def encode_vectors(vectors):
+    """JSON-safe form of a float32 array"""
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    return {'shape': list(vectors.shape), 'vectors': base64.b64encode(vectors.tobytes()).decode("ascii")}
+
+
+def decode_vectors(payload):
+    """Inverse of encode_vectors"""
+    data = base64.b64decode(payload['vectors'])
+    return np.frombuffer(data, dtype="float32").reshape(payload['shape']).copy()
+
+
+def create_app(registry=None, worker=None):
+    """Flask app serving the models of registry through worker"""
+    from flask import Flask, Response, jsonify, request, stream_with_context
+    from engine import ModelRegistry, EMBED_MODEL_NAME, READY
+    from llm_backends import LLM_CONFIG, model_id
+    from inference_worker import InferenceWorker, InferenceTimeoutError
+
+    # Always local models here, even if INFERENCE_SERVICE_URL is set in this process
+    registry = registry or ModelRegistry(service_url=None)
+    worker = worker or InferenceWorker(registry.load_llm)
+    app = Flask(__name__)
+    app.config['registry'] = registry
+    app.config['worker'] = worker
+
+    def backpressure_response(error):
+        status = 429 if isinstance(error, QueueFullError) else 503
+        return jsonify({'error': str(error), 'retry_after': error.retry_after}), status, {
+            'Retry-After': str(error.retry_after)
+        }
+
+    @app.route('/health', methods=['GET'])
+    def health():
+        body = {
+            'status': registry.state,
+            'ready': registry.state == READY,
+            'error': registry.error,
+            'startup_timings': dict(registry.startup_timings),
+            'llm_queue': worker.stats()
+        }
+        return jsonify(body), (200 if registry.state == READY else 503)
+
+    @app.route('/info', methods=['GET'])
+    def info():
+        return jsonify({
+            'embed_model': EMBED_MODEL_NAME,
+            'llm_model': model_id(LLM_CONFIG),
+            'embedding_dimension': registry.load_embed_model().get_sentence_embedding_dimension()
+        })
+
+    @app.route('/embed', methods=['POST'])
+    def embed():
+        body = request.get_json(force=True)
+        texts = body.get('texts')
+        if not isinstance(texts, list):
+            return jsonify({'error': "'texts' must be a list of strings"}), 400
+        vectors = registry.load_embed_model().encode(
+            texts, batch_size=int(body.get('batch_size', 32)), convert_to_tensor=False
+        )
+        return jsonify(encode_vectors(np.asarray(vectors).reshape(len(texts), -1)))
+
+    @app.route('/generate', methods=['POST'])
+    def generate():
+        body = request.get_json(force=True)
+        prompt = body.get('prompt')
+        if not isinstance(prompt, str):
+            return jsonify({'error': "'prompt' must be a string"}), 400
+        kwargs = {name: body[name] for name in GENERATION_ARGS if body.get(name) is not None}
+        client = body.get('client') or request.remote_addr
+        try:
+            if not body.get('stream'):
+                return jsonify({'text': worker.generate(prompt, request_id=client, **kwargs)})
+            pieces = worker.stream(prompt, request_id=client, **kwargs)
+        except (QueueFullError, InferenceTimeoutError) as e:
+            return backpressure_response(e)
+        except Exception as e:
+            app.logger.exception("Generation failed")
+            return jsonify({'error': str(e)}), 500
+
+        def lines():
+            try:
+                for piece in pieces:
+                    yield json.dumps({'text': piece}) + "\n"
+            except Exception as e:
+                # Headers are already sent, so the error travels in the body
+                yield json.dumps({'error': str(e)}) + "\n"
+                return
+            yield json.dumps({'done': True}) + "\n"
+
+        return Response(stream_with_context(lines()), mimetype='application/x-ndjson')
+
+    return app
+
+
+class RemoteError(Exception):
+    """The inference service failed a request"""
+
+
+class _Client:
+    def __init__(self, url, timeout=CLIENT_TIMEOUT):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def _open(self, path, body=None):
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        req = urllib.request.Request(
+            self.url + path, data=data, headers={'Content-Type': 'application/json'}
+        )
+        try:
+            return urllib.request.urlopen(req, timeout=self.timeout)
+        except urllib.error.HTTPError as e:
+            try:
+                error = json.loads(e.read().decode("utf-8"))
+            except ValueError:
+                error = {}
+            if e.code == 429:
+                raise QueueFullError(error.get('retry_after') or int(e.headers.get('Retry-After', 1)))
+            raise RemoteError(f"Inference service returned {e.code}: {error.get('error', e.reason)}")
+        except urllib.error.URLError as e:
+            raise RemoteError(f"Inference service at {self.url} is unreachable: {e.reason}")
+
+    def _request(self, path, body=None):
+        with self._open(path, body) as response:
+            return json.loads(response.read().decode("utf-8"))
+
+
+class RemoteLLM(_Client):
+    """Callable with the ctransformers interface, generating on the inference service"""
+
+    def __init__(self, url, client_id=CLIENT_ID, timeout=CLIENT_TIMEOUT):
+        super().__init__(url, timeout)
+        self.client_id = client_id
+
+    def __call__(self, prompt, stream=False, **kwargs):
+        body = {'prompt': prompt, 'client': self.client_id, 'stream': stream}
+        body.update({name: kwargs[name] for name in GENERATION_ARGS if name in kwargs})
+        if stream:
+            return self._stream(body)
+        return self._request('/generate', body)['text']
+
+    def _stream(self, body):
+        with self._open('/generate', body) as response:
+            for line in response:
+                if not line.strip():
+                    continue
+                message = json.loads(line.decode("utf-8"))
+                if 'error' in message:
+                    raise RemoteError(message['error'])
+                if message.get('done'):
+                    return
+                yield message['text']
+        raise RemoteError("Inference service closed the stream early")
+
+
+class RemoteEmbedder(_Client):
+    """The SentenceTransformer calls the pipeline uses, served by the inference service"""
+
+    def __init__(self, url, timeout=CLIENT_TIMEOUT):
+        super().__init__(url, timeout)
+        self._dimension = None
+
+    def encode(self, sentences, batch_size=32, convert_to_tensor=False, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        vectors = decode_vectors(self._request('/embed', {'texts': texts, 'batch_size': batch_size}))
+        return vectors[0] if single else vectors
+
+    def get_sentence_embedding_dimension(self):
+        if self._dimension is None:
+            self._dimension = self._request('/info')['embedding_dimension']
+        return self._dimension
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Shared local inference service")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--lazy", action="store_true", help="load models on first request")
+    args = parser.parse_args()
+
+    app = create_app()
+    if not args.lazy:
+        app.config['registry'].start_loading()
+    print(f"Inference service on http://{args.host}:{args.port}")
+    app.run(host=args.host, port=args.port, threaded=True, debug=False)
@@ -0,0 +1,238 @@
+"""
+Dedicated LLM inference worker shared by all requests.
+
+One thread owns the model and is the only caller of it. Prompts are queued
+per request and served round-robin across requests, so a 2,000-pair batch
+cannot starve a single-resume check. A request whose next prompt shares the
+prefix just evaluated may keep the model for a few more prompts, so the
+backend can reuse that prefix's evaluated state (see prefix_cache.py). The total queue depth is bounded:
+non-blocking submits beyond it raise QueueFullError with a Retry-After
+estimate, which the API turns into HTTP 429. stream() hands back the text
+piece by piece as the model generates it.
+
+ctransformers generates one sequence at a time, so "batching" here is fair
+scheduling of single prompts on one model rather than fused decoding.
+"""
+
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+MAX_QUEUE_DEPTH = int(os.environ.get("LLM_MAX_QUEUE_DEPTH", "64"))
+WAIT_TIMEOUT = float(os.environ.get("LLM_WAIT_TIMEOUT", "600"))
+
+# Prompts sharing the previous prompt's prefix that may jump the rotation in a row
+PREFIX_RUN = int(os.environ.get("LLM_PREFIX_RUN", "4"))
+
+# Number of recent prompt latencies kept for the stats endpoint
+LATENCY_WINDOW = 500
+
+
+class QueueFullError(Exception):
+    """The inference queue is at capacity"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"LLM queue is full, retry after {retry_after} seconds")
+        self.retry_after = retry_after
+
+
+class InferenceTimeoutError(Exception):
+    """A queued prompt did not complete within the wait timeout"""
+
+    def __init__(self, retry_after):
+        super().__init__("Timed out waiting for the LLM")
+        self.retry_after = retry_after
+
+
+class InferenceWorker:
+    """Single model owner serving queued prompts fairly across requests"""
+
+    def __init__(self, get_model, max_depth=MAX_QUEUE_DEPTH):
+        self.get_model = get_model
+        self.max_depth = max_depth
+        self._queues = OrderedDict()
+        self._depth = 0
+        self._condition = threading.Condition()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._generation_times = deque(maxlen=LATENCY_WINDOW)
+        self._first_token_times = deque(maxlen=LATENCY_WINDOW)
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.prefix_reuse = 0
+        self._last_request = None
+        self._last_prefix_key = None
+        self._run_length = 0
+        self._thread = threading.Thread(target=self._run, name="llm-worker", daemon=True)
+        self._thread.start()
+
+    def queue_length(self):
+        with self._condition:
+            return self._depth
+
+    def retry_after(self):
+        """Seconds until the current queue is expected to drain"""
+        with self._condition:
+            return self._retry_after_locked()
+
+    def _retry_after_locked(self):
+        average = (sum(self._generation_times) / len(self._generation_times)) if self._generation_times else 5.0
+        return max(1, int(round(self._depth * average)))
+
+    def is_overloaded(self):
+        with self._condition:
+            return self._depth >= self.max_depth
+
+    def submit(self, prompt, request_id=None, block=False, prefix_key=None, on_token=None, **kwargs):
+        """
+        Queue a prompt and return a Future for the generated text.
+
+        With block=False a full queue raises QueueFullError; with block=True
+        the caller waits for space (used by background jobs). prefix_key
+        identifies the shared prompt prefix (e.g. a hash of instructions + JD).
+        on_token, if given, is called with each piece of text as it is generated.
+        """
+        future = Future()
+        item = (prompt, kwargs, future, time.perf_counter(), prefix_key, on_token)
+        with self._condition:
+            while self._depth >= self.max_depth:
+                if not block:
+                    self.rejected += 1
+                    raise QueueFullError(self._retry_after_locked())
+                self._condition.wait()
+            self._queues.setdefault(request_id, deque()).append(item)
+            self._depth += 1
+            self._condition.notify_all()
+        return future
+
+    def generate(self, prompt, request_id=None, block=False, prefix_key=None,
+                 timeout=WAIT_TIMEOUT, timed=False, **kwargs):
+        """Queue a prompt and wait for its text, or (text, generation seconds, queued seconds) if timed"""
+        future = self.submit(prompt, request_id, block, prefix_key, **kwargs)
+        try:
+            text = future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise InferenceTimeoutError(self.retry_after())
+        return (text, future.generation_seconds, future.queue_seconds) if timed else text
+
+    def stream(self, prompt, request_id=None, block=False, prefix_key=None,
+               timeout=WAIT_TIMEOUT, **kwargs):
+        """
+        Queue a prompt and return an iterator over its text as it is generated.
+
+        Queueing happens immediately, so QueueFullError is raised here rather
+        than on the first iteration.
+        """
+        pieces = queue.Queue()
+        future = self.submit(prompt, request_id, block, prefix_key, on_token=pieces.put, **kwargs)
+        future.add_done_callback(lambda _: pieces.put(None))
+        return self._iter_pieces(pieces, future, time.monotonic() + timeout)
+
+    def _iter_pieces(self, pieces, future, deadline):
+        while True:
+            try:
+                piece = pieces.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                future.cancel()
+                raise InferenceTimeoutError(self.retry_after())
+            if piece is None:
+                break
+            yield piece
+        # Surface generation errors after the pieces already produced
+        future.result()
+
+    def _next_item(self):
+        """Pop the next prompt, rotating across requests"""
+        with self._condition:
+            while not self._depth:
+                self._condition.wait()
+            request_id = next(iter(self._queues))
+            last = self._last_request
+            if (last != request_id and last in self._queues and self._run_length < PREFIX_RUN
+                    and self._last_prefix_key is not None
+                    and self._queues[last][0][4] == self._last_prefix_key):
+                # Stay on the request whose prefix is still evaluated
+                request_id = last
+            items = self._queues[request_id]
+            item = items.popleft()
+            if request_id == last and item[4] is not None and item[4] == self._last_prefix_key:
+                self._run_length += 1
+            else:
+                self._run_length = 0
+            self._last_request = request_id
+            # Move this request to the back so others get the next turn
+            del self._queues[request_id]
+            if items:
+                self._queues[request_id] = items
+            self._depth -= 1
+            self._condition.notify_all()
+            return item
+
+    def _run(self):
+        while True:
+            prompt, kwargs, future, queued_at, prefix_key, on_token = self._next_item()
+            if not future.set_running_or_notify_cancel():
+                continue
+            if prefix_key is not None and prefix_key == self._last_prefix_key:
+                self.prefix_reuse += 1
+            self._last_prefix_key = prefix_key
+            started = time.perf_counter()
+            first_token = None
+            try:
+                model = self.get_model()
+                if on_token is None:
+                    text = model(prompt, **kwargs)
+                else:
+                    generated = []
+                    for piece in model(prompt, stream=True, **kwargs):
+                        if first_token is None:
+                            first_token = time.perf_counter()
+                        generated.append(piece)
+                        on_token(piece)
+                    text = "".join(generated)
+            except Exception as e:
+                self.failed += 1
+                future.set_exception(e)
+                continue
+            finished = time.perf_counter()
+            with self._condition:
+                self._generation_times.append(finished - started)
+                self._latencies.append(finished - queued_at)
+                if first_token is not None:
+                    self._first_token_times.append(first_token - queued_at)
+                self.completed += 1
+            future.generation_seconds = finished - started
+            future.queue_seconds = started - queued_at
+            future.set_result(text)
+
+    def stats(self):
+        """Return queue length and latency figures as a plain dict"""
+        with self._condition:
+            latencies = sorted(self._latencies)
+            first_token_times = sorted(self._first_token_times)
+            generation_times = list(self._generation_times)
+            stats = {
+                'queue_length': self._depth,
+                'max_queue_depth': self.max_depth,
+                'active_requests': len(self._queues),
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'prefix_reuse': self.prefix_reuse
+            }
+
+        def percentile(values, q):
+            return round(values[min(len(values) - 1, int(q * len(values)))], 3) if values else None
+
+        stats.update({
+            'latency_p50_seconds': percentile(latencies, 0.5),
+            'latency_p95_seconds': percentile(latencies, 0.95),
+            'stream_ttft_p50_seconds': percentile(first_token_times, 0.5),
+            'generation_avg_seconds': round(sum(generation_times) / len(generation_times), 3)
+            if generation_times else None
+        })
+        return stats
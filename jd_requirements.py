@@ -0,0 +1,67 @@
+"""
+Job descriptions as lists of requirement queries.
+
+Embedding a whole JD as one vector truncates it at the encoder's maximum
+sequence length and blurs distinct requirements together. Instead the JD is
+split into its bullets, lines and sentences, which are encoded in one batch
+and searched together (CorpusIndex.search_multi_per_document). The best
+similarity of each resume to each requirement forms a coverage matrix whose
+mean is the pre-screen score.
+
+JD_MULTI_QUERY=0 restores single-vector retrieval.
+"""
+
+import os
+import re
+
+import numpy as np
+
+from embedding_cache import embedding_cache, content_hash
+
+MULTI_QUERY = os.environ.get("JD_MULTI_QUERY", "1") == "1"
+MAX_REQUIREMENTS = int(os.environ.get("JD_MAX_REQUIREMENTS", "16"))
+RRF_K = int(os.environ.get("JD_RRF_K", "60"))
+
+# Single words are rarely requirements on their own
+MIN_QUERY_WORDS = 2
+# Well under the 256 word-piece limit of all-MiniLM-L6-v2
+MAX_QUERY_WORDS = 60
+
+BULLET = re.compile(r"^\s*(?:[-*•·▪●◦‣]|\(?\d+[.)]|\(?[a-z][.)])\s+")
+SENTENCE_END = re.compile(r"(?<=[.;!?])\s+")
+
+
+def split_requirements(jd_text, max_queries=MAX_REQUIREMENTS):
+    """Requirement queries of a JD: bullets and lines, long ones split into sentences"""
+    requirements = []
+    seen = set()
+    for line in jd_text.splitlines():
+        line = BULLET.sub("", line).strip()
+        if not line or line.endswith(":"):
+            # Blank lines and headings such as "Requirements:"
+            continue
+        parts = SENTENCE_END.split(line) if len(line.split()) > MAX_QUERY_WORDS // 2 else [line]
+        for part in parts:
+            words = part.split()
+            for start in range(0, len(words), MAX_QUERY_WORDS):
+                query = " ".join(words[start:start + MAX_QUERY_WORDS])
+                if len(query.split()) >= MIN_QUERY_WORDS and query.lower() not in seen:
+                    seen.add(query.lower())
+                    requirements.append(query)
+    if not requirements:
+        return [jd_text.strip()] if jd_text.strip() else []
+    if len(requirements) > max_queries:
+        # Merge neighbours rather than dropping requirements past the limit
+        groups = np.array_split(np.arange(len(requirements)), max_queries)
+        requirements = [" ".join(requirements[i] for i in group) for group in groups]
+    return requirements
+
+
+def cached_requirement_embeddings(jd_text, model, model_name):
+    """Return (requirements, float32 vectors) for a JD, encoding all requirements in one batch once per model"""
+    def encode():
+        requirements = split_requirements(jd_text)
+        vectors = np.asarray(model.encode(requirements, convert_to_tensor=False), dtype="float32")
+        return requirements, vectors.reshape(len(requirements), -1)
+
+    return embedding_cache.get_or_compute(("requirements", model_name, content_hash(jd_text)), encode)
@@ -0,0 +1,132 @@
+"""
+Incremental re-ranking when a job description is edited.
+
+Every batch run records, per JD, its embedding and for each resume the set
+of top-k chunks retrieved for it, its embedding score and its LLM result.
+The JD's revision id is the hash of its normalized text. When a request
+names the revision a JD was edited from, retrieval is redone for every
+resume (cheap: resume vectors are cached) and the LLM is only called again
+for resumes whose retrieved chunk set changed or whose embedding score moved
+by more than JD_REVISION_SCORE_DELTA points; the others keep their previous
+score and reasoning.
+"""
+
+import difflib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from embedding_cache import content_hash
+from result_cache import normalize_jd
+
+DEFAULT_SCORE_DELTA = float(os.environ.get("JD_REVISION_SCORE_DELTA", "5"))
+DEFAULT_MAX_REVISIONS = int(os.environ.get("JD_REVISION_MAX_ENTRIES", "100"))
+
+REUSED = "reused"
+RECOMPUTED = "recomputed"
+
+# Result fields carried over to the edited JD
+RESULT_FIELDS = ('score', 'reasoning', 'chunks_used', 'reasoning_generated')
+
+
+def revision_id(jd_text):
+    """Id of a JD revision: the hash of its whitespace-normalized text"""
+    return content_hash(normalize_jd(jd_text))
+
+
+def chunk_set_key(chunks):
+    """Order-independent key of a resume's retrieved chunks"""
+    return content_hash("\x00".join(sorted(str(chunk) for chunk in chunks)))
+
+
+def describe_change(old_text, new_text, old_vec, new_vec):
+    """How far a JD moved between revisions, by words and by embedding"""
+    matcher = difflib.SequenceMatcher(None, old_text.split(), new_text.split(), autojunk=False)
+    added = removed = 0
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag != "equal":
+            removed += i2 - i1
+            added += j2 - j1
+    old_vec = np.asarray(old_vec, dtype="float32").reshape(-1)
+    new_vec = np.asarray(new_vec, dtype="float32").reshape(-1)
+    norms = float(np.linalg.norm(old_vec) * np.linalg.norm(new_vec))
+    return {
+        'words_added': added,
+        'words_removed': removed,
+        'text_similarity': round(matcher.ratio(), 4),
+        'embedding_similarity': round(float(old_vec @ new_vec) / norms, 4) if norms else None
+    }
+
+
+class JDRevisionStore:
+    """LRU store of per-resume retrieval and LLM results for recent JD revisions"""
+
+    def __init__(self, max_revisions=DEFAULT_MAX_REVISIONS):
+        self.max_revisions = max_revisions
+        self._revisions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, rev_id):
+        """Return {'jd_text', 'jd_vec', 'resumes'} for a revision, or None"""
+        with self._lock:
+            revision = self._revisions.get(rev_id)
+            if revision is not None:
+                self._revisions.move_to_end(rev_id)
+            return revision
+
+    def record_jd(self, jd_text, jd_vec):
+        """Start or refresh the revision of a JD and return its id"""
+        rev_id = revision_id(jd_text)
+        if self.max_revisions <= 0:
+            return rev_id
+        with self._lock:
+            revision = self._revisions.pop(rev_id, None) or {'resumes': {}}
+            revision.update({'jd_text': jd_text, 'jd_vec': np.asarray(jd_vec, dtype="float32").reshape(-1)})
+            self._revisions[rev_id] = revision
+            while len(self._revisions) > self.max_revisions:
+                self._revisions.popitem(last=False)
+        return rev_id
+
+    def record_result(self, rev_id, resume_hash, chunk_key, embedding_score, result):
+        """Remember the retrieval and LLM result of one resume under a revision"""
+        with self._lock:
+            revision = self._revisions.get(rev_id)
+            if revision is None:
+                return
+            revision['resumes'][resume_hash] = {
+                'chunk_key': chunk_key,
+                'embedding_score': embedding_score,
+                'result': {field: result[field] for field in RESULT_FIELDS if field in result}
+            }
+
+    def reusable(self, rev_id, resume_hash, chunk_key, embedding_score, with_reasoning,
+                 score_delta=DEFAULT_SCORE_DELTA):
+        """The previous result of a resume if its retrieval did not change materially, else None"""
+        revision = self.get(rev_id)
+        entry = revision['resumes'].get(resume_hash) if revision else None
+        if entry is None or entry['chunk_key'] != chunk_key:
+            return None
+        if with_reasoning and not entry['result'].get('reasoning_generated'):
+            return None
+        if (entry['embedding_score'] is None or embedding_score is None
+                or abs(embedding_score - entry['embedding_score']) > score_delta):
+            return None
+        return dict(entry['result'])
+
+    def clear(self):
+        with self._lock:
+            self._revisions.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'revisions': len(self._revisions),
+                'max_revisions': self.max_revisions,
+                'resumes': sum(len(revision['resumes']) for revision in self._revisions.values())
+            }
+
+
+# Process-wide store shared by every request in this process
+jd_revision_store = JDRevisionStore()
@@ -0,0 +1,245 @@
+"""
+In-process background job queue for long resume matching batches.
+
+A job is submitted with a JSON-serializable payload and run by a pool of
+worker threads. The runner is a generator that yields one result per
+(resume, JD) pair; results are appended to the job as they complete so
+clients can poll progress, page through partial results or stream them.
+
+When JOB_DB_PATH is set, jobs and their results are also written to SQLite
+and unfinished jobs are re-queued on restart, resuming after the last
+stored result.
+
+Each job runs in a fresh contextvars context, so the per-request pipeline
+stats (metrics.RequestStats) of one job do not carry over into the next job
+on the same worker thread.
+"""
+
+import contextvars
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+
+DEFAULT_WORKERS = int(os.environ.get("JOB_WORKERS", "1"))
+DEFAULT_DB_PATH = os.environ.get("JOB_DB_PATH", "")
+RETENTION_SECONDS = int(os.environ.get("JOB_RETENTION_SECONDS", "86400"))
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+class Job:
+    """State and results of one submitted job"""
+
+    def __init__(self, job_id, payload, total, status=QUEUED, created_at=None):
+        self.id = job_id
+        self.payload = payload
+        self.total = total
+        self.status = status
+        self.error = None
+        self.created_at = created_at or time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.results = []
+        self.condition = threading.Condition()
+
+    @property
+    def done(self):
+        return len(self.results)
+
+    @property
+    def finished(self):
+        return self.status in (COMPLETED, FAILED)
+
+    def eta_seconds(self):
+        """Estimated seconds left, from the average time per finished pair"""
+        if self.status != RUNNING or not self.started_at or not self.done:
+            return None
+        elapsed = time.time() - self.started_at
+        return round(elapsed / self.done * (self.total - self.done), 1)
+
+    def to_dict(self):
+        """Return job status as a plain dict"""
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'done': self.done,
+            'total': self.total,
+            'progress': round(self.done / self.total, 4) if self.total else 1.0,
+            'eta_seconds': self.eta_seconds(),
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+
+    def add_result(self, result):
+        with self.condition:
+            self.results.append(result)
+            self.condition.notify_all()
+
+    def set_status(self, status, error=None):
+        with self.condition:
+            self.status = status
+            self.error = error
+            if status == RUNNING:
+                self.started_at = time.time()
+            elif status in (COMPLETED, FAILED):
+                self.finished_at = time.time()
+            self.condition.notify_all()
+
+    def wait_for_results(self, offset, timeout=15.0):
+        """Block until results past offset exist or the job finishes; return (new_results, finished)"""
+        with self.condition:
+            if len(self.results) <= offset and not self.finished:
+                self.condition.wait(timeout)
+            return self.results[offset:], self.finished
+
+
+class JobQueue:
+    """Worker threads consuming jobs, with optional SQLite persistence"""
+
+    def __init__(self, runner, workers=DEFAULT_WORKERS, db_path=DEFAULT_DB_PATH):
+        self.runner = runner
+        self.jobs = {}
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._db = None
+        self._db_lock = threading.Lock()
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    total INTEGER NOT NULL,
+                    payload TEXT NOT NULL,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+                """
+            )
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS job_results (
+                    job_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    result TEXT NOT NULL,
+                    PRIMARY KEY (job_id, seq)
+                )
+                """
+            )
+            self._db.commit()
+            self._restore()
+
+        self._threads = []
+        for i in range(max(1, workers)):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, payload, total):
+        """Queue a job and return it immediately"""
+        self._prune()
+        job = Job(uuid.uuid4().hex, payload, total)
+        with self._lock:
+            self.jobs[job.id] = job
+        self._save_job(job)
+        self._queue.put(job)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            try:
+                contextvars.Context().run(self._run, job)
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job):
+        job.set_status(RUNNING)
+        self._save_job(job)
+        try:
+            # Resume after any results restored from a previous run
+            for result in self.runner(job.payload, job.done):
+                seq = job.done
+                job.add_result(result)
+                self._save_result(job, seq, result)
+            job.set_status(COMPLETED)
+        except Exception as e:
+            job.set_status(FAILED, str(e))
+        self._save_job(job)
+
+    def _prune(self):
+        """Forget finished jobs older than the retention window"""
+        cutoff = time.time() - RETENTION_SECONDS
+        with self._lock:
+            expired = [job_id for job_id, job in self.jobs.items()
+                       if job.finished and job.finished_at < cutoff]
+            for job_id in expired:
+                del self.jobs[job_id]
+        if self._db is not None and expired:
+            with self._db_lock:
+                self._db.executemany("DELETE FROM jobs WHERE id = ?", [(job_id,) for job_id in expired])
+                self._db.executemany("DELETE FROM job_results WHERE job_id = ?", [(job_id,) for job_id in expired])
+                self._db.commit()
+
+    def _save_job(self, job):
+        if self._db is None:
+            return
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job.id, job.status, job.total, json.dumps(job.payload), job.error,
+                 job.created_at, job.started_at, job.finished_at)
+            )
+            self._db.commit()
+
+    def _save_result(self, job, seq, result):
+        if self._db is None:
+            return
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO job_results VALUES (?, ?, ?)",
+                (job.id, seq, json.dumps(result))
+            )
+            self._db.commit()
+
+    def _restore(self):
+        """Load persisted jobs and re-queue the ones that had not finished"""
+        with self._db_lock:
+            rows = self._db.execute(
+                "SELECT id, status, total, payload, error, created_at, started_at, finished_at "
+                "FROM jobs ORDER BY created_at"
+            ).fetchall()
+            for job_id, status, total, payload, error, created_at, started_at, finished_at in rows:
+                job = Job(job_id, json.loads(payload), total, status, created_at)
+                job.error = error
+                job.started_at = started_at
+                job.finished_at = finished_at
+                job.results = [
+                    json.loads(result) for (result,) in self._db.execute(
+                        "SELECT result FROM job_results WHERE job_id = ? ORDER BY seq", (job_id,)
+                    )
+                ]
+                self.jobs[job_id] = job
+                if not job.finished:
+                    job.status = QUEUED
+                    self._queue.put(job)
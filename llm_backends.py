@@ -0,0 +1,182 @@
+"""
+Pluggable LLM backends behind the ctransformers calling convention.
+
+Every backend returns a callable model(prompt, max_new_tokens=..., stop=...,
+stream=...) that yields text pieces when streaming, which is all the
+InferenceWorker and the prompt-prefix cache need:
+
+    ctransformers  AutoModelForCausalLM on a GGUF file (the default)
+    llama_cpp      llama-cpp-python's Llama on a GGUF file
+    stub           deterministic scores without a model, for tests and benchmarks
+
+The configuration is read from the JSON file at LLM_CONFIG_PATH (default
+llm_config.json, written by `python autotune.py`) and then overridden by any
+of LLM_BACKEND, LLM_MODEL_PATH, LLM_MODEL_TYPE, LLM_THREADS, LLM_BATCH_SIZE,
+LLM_CONTEXT_LENGTH and LLM_GPU_LAYERS that are set. threads 0 lets the
+backend pick.
+"""
+
+import json
+import os
+import time
+import zlib
+
+CTRANSFORMERS = "ctransformers"
+LLAMA_CPP = "llama_cpp"
+STUB = "stub"
+BACKENDS = (CTRANSFORMERS, LLAMA_CPP, STUB)
+
+CONFIG_PATH = os.environ.get("LLM_CONFIG_PATH", "llm_config.json")
+
+DEFAULT_CONFIG = {
+    'backend': CTRANSFORMERS,
+    'model_path': "./mistral-7b-instruct-v0.2.Q4_K_M.gguf",
+    'model_type': "mistral",
+    'threads': 0,
+    'batch_size': 8,
+    'context_length': 2048,
+    'gpu_layers': 0,
+    'max_new_tokens': 256
+}
+
+# Environment variable overriding each config key, and its type
+ENV_OVERRIDES = {
+    'backend': ("LLM_BACKEND", str),
+    'model_path': ("LLM_MODEL_PATH", str),
+    'model_type': ("LLM_MODEL_TYPE", str),
+    'threads': ("LLM_THREADS", int),
+    'batch_size': ("LLM_BATCH_SIZE", int),
+    'context_length': ("LLM_CONTEXT_LENGTH", int),
+    'gpu_layers': ("LLM_GPU_LAYERS", int)
+}
+
+STUB_WORDS = ("strong match on skills and experience with relevant projects "
+              "but limited evidence of leadership").split()
+
+
+def load_config(path=CONFIG_PATH, environ=os.environ):
+    """Defaults, then the config file if it exists, then environment overrides"""
+    config = dict(DEFAULT_CONFIG)
+    if path and os.path.exists(path):
+        with open(path) as f:
+            config.update({key: value for key, value in json.load(f).items() if key in DEFAULT_CONFIG})
+    for key, (name, cast) in ENV_OVERRIDES.items():
+        if environ.get(name):
+            config[key] = cast(environ[name])
+    if config['backend'] not in BACKENDS:
+        raise ValueError(f"Unknown LLM backend {config['backend']!r}, expected one of {', '.join(BACKENDS)}")
+    return config
+
+
+def model_id(config):
+    """Backend and model file, which together determine what the model generates"""
+    if config['backend'] == STUB:
+        return STUB
+    return f"{config['backend']}:{os.path.basename(config['model_path'])}"
+
+
+class StubLLM:
+    """Deterministic stand-in for a GGUF model"""
+
+    def __init__(self, seconds_per_token=0.0):
+        self.seconds_per_token = seconds_per_token
+
+    def _pieces(self, prompt, max_new_tokens, stop):
+        score = zlib.crc32(prompt.encode("utf-8")) % 101
+        pieces = [f" {score}", "\n", "Reasoning:"] + [f" {word}" for word in STUB_WORDS]
+        for piece in pieces[:max_new_tokens]:
+            if stop and any(s in piece for s in stop):
+                return
+            if self.seconds_per_token:
+                time.sleep(self.seconds_per_token)
+            yield piece
+
+    def __call__(self, prompt, max_new_tokens=256, stop=None, stream=False, **kwargs):
+        pieces = self._pieces(prompt, max_new_tokens, stop)
+        return pieces if stream else "".join(pieces)
+
+
+class LlamaCppLLM:
+    """llama-cpp-python's Llama with the ctransformers calling convention"""
+
+    # ctransformers keyword -> llama-cpp-python keyword
+    KWARGS = {
+        'max_new_tokens': 'max_tokens',
+        'stop': 'stop',
+        'temperature': 'temperature',
+        'top_k': 'top_k',
+        'top_p': 'top_p',
+        'repetition_penalty': 'repeat_penalty',
+        'seed': 'seed'
+    }
+
+    def __init__(self, llama, max_new_tokens=256):
+        self.llama = llama
+        self.max_new_tokens = max_new_tokens
+
+    def __call__(self, prompt, max_new_tokens=None, stream=False, **kwargs):
+        options = {self.KWARGS[name]: value for name, value in kwargs.items() if name in self.KWARGS}
+        options['max_tokens'] = max_new_tokens or self.max_new_tokens
+        if stream:
+            return (chunk['choices'][0]['text'] for chunk in self.llama(prompt, stream=True, **options))
+        return self.llama(prompt, **options)['choices'][0]['text']
+
+    def set_cache(self, cache):
+        self.llama.set_cache(cache)
+
+    def reset(self):
+        self.llama.reset()
+
+
+def load_backend(config, timings=None):
+    """
+    Load the model a config describes and turn on prompt-prefix reuse.
+
+    timings, if given, receives the seconds spent importing the backend
+    library under 'import_<backend>'.
+    """
+    from prefix_cache import enable_prefix_cache
+
+    backend = config['backend']
+    started = time.perf_counter()
+    if backend == STUB:
+        return StubLLM()
+    if backend == CTRANSFORMERS:
+        from ctransformers import AutoModelForCausalLM
+        if timings is not None:
+            timings[f'import_{backend}'] = round(time.perf_counter() - started, 3)
+        model = AutoModelForCausalLM.from_pretrained(
+            config['model_path'],
+            model_type=config['model_type'],
+            gpu_layers=config['gpu_layers'],
+            max_new_tokens=config['max_new_tokens'],
+            context_length=config['context_length'],
+            batch_size=config['batch_size'],
+            threads=config['threads'] or -1
+        )
+    else:
+        from llama_cpp import Llama
+        if timings is not None:
+            timings[f'import_{backend}'] = round(time.perf_counter() - started, 3)
+        model = LlamaCppLLM(Llama(
+            model_path=config['model_path'],
+            n_ctx=config['context_length'],
+            n_batch=config['batch_size'],
+            n_threads=config['threads'] or None,
+            n_gpu_layers=config['gpu_layers'],
+            verbose=False
+        ), config['max_new_tokens'])
+    # Reuse the evaluated instructions + JD prefix across resumes
+    enable_prefix_cache(model)
+    return model
+
+
+def write_config(config, path=CONFIG_PATH, **extra):
+    """Write a config (plus extra keys such as tuning results) for load_config to pick up"""
+    with open(path, "w") as f:
+        json.dump(dict(config, **extra), f, indent=2)
+        f.write("\n")
+
+
+# Process-wide configuration read once at import
+LLM_CONFIG = load_config()
@@ -1,110 +1,34 @@
+import uuid
+
 import streamlit as st
-import fitz  # PyMuPDF
-import tiktoken
-import faiss
-import numpy as np
-from sentence_transformers import SentenceTransformer
-from ctransformers import AutoModelForCausalLM
+from tokenization import count_tokens
+from prompts import make_qa_prompt, qa_budget
+from corpus_index import build_corpus_index
+from embedding_store import is_extraction_failure
+from engine import (
+    load_embed_model,
+    get_llm_worker,
+    extract_text,
+    index_document,
+    retrieve_chunks,
+    LLM_CONTEXT_LENGTH,
+)
 
 # --- Setup ---
-@st.cache_resource
-def load_models():
-    embed_model = SentenceTransformer("all-MiniLM-L6-v2")
-    llm_model = AutoModelForCausalLM.from_pretrained(
-        "./mistral-7b-instruct-v0.2.Q4_K_M.gguf",
-        model_type="mistral",
-        gpu_layers=0,
-        max_new_tokens=256,
-        context_length=512  # Explicitly set context length
-    )
-    return embed_model, llm_model
+# Models load on first use through the shared registry (engine.py), so the page
+# renders immediately and other front ends on this host can share the models
+llm_worker = get_llm_worker()
 
-embed_model, llm = load_models()
+# Prompts are scheduled fairly across sessions
+if 'session_request_id' not in st.session_state:
+    st.session_state.session_request_id = uuid.uuid4().hex
 
 # --- Utils ---
-def extract_text_from_pdf(uploaded_file):
-    doc = fitz.open(stream=uploaded_file.read(), filetype="pdf")
-    return "\n".join([page.get_text() for page in doc])
-
-def chunk_text(text, max_tokens=80, stride=40):  # Reduced chunk size
-    enc = tiktoken.get_encoding("cl100k_base")
-    tokens = enc.encode(text)
-    chunks = []
-    for i in range(0, len(tokens), stride):
-        chunk = tokens[i:i + max_tokens]
-        chunk_text = enc.decode(chunk)
-        chunks.append(chunk_text)
-        if i + max_tokens >= len(tokens):
-            break
-    return chunks
-
-def build_faiss_index(chunks, model):
-    embeddings = model.encode(chunks, convert_to_tensor=False)
-    dim = len(embeddings[0])
-    index = faiss.IndexFlatL2(dim)
-    index.add(np.array(embeddings).astype("float32"))
-    return index, embeddings
-
-def retrieve_chunks(query, chunks, index, model, k=3):  # Reduced k to 3
-    query_vec = model.encode([query], convert_to_tensor=False)
-    D, I = index.search(np.array(query_vec).astype("float32"), k)
-    return [chunks[i] for i in I[0]]
-
-def make_prompt(question, context_chunks, model_max_tokens=512):
-    enc = tiktoken.get_encoding("cl100k_base")
-    
-    # Create base prompt template
-    base_prompt = (
-        "Use the context to answer the question.\n\n"
-        f"Question: {question}\nAnswer:"
-    )
-    
-    base_tokens = len(enc.encode(base_prompt))
-    
-    # Reserve tokens for the answer generation
-    reserved_for_answer = 100
-    available_for_context = model_max_tokens - base_tokens - reserved_for_answer
-    
-    # Build context within token limit
-    context = ""
-    used_tokens = 0
-    
-    for chunk in context_chunks:
-        chunk_with_separator = chunk + "\n\n"
-        chunk_tokens = len(enc.encode(chunk_with_separator))
-        
-        if used_tokens + chunk_tokens > available_for_context:
-            break
-            
-        context += chunk_with_separator
-        used_tokens += chunk_tokens
-    
-    # Final prompt
-    prompt = (
-        "Use the context to answer the question.\n\n"
-        f"Context:\n{context}"
-        f"Question: {question}\n"
-        f"Answer:"
-    )
-    
-    # Verify final prompt length
-    final_tokens = len(enc.encode(prompt))
-    if final_tokens > model_max_tokens - 50:  # Leave some buffer
-        # Truncate context if still too long
-        truncate_tokens = final_tokens - (model_max_tokens - 50)
-        context_tokens = enc.encode(context)
-        if len(context_tokens) > truncate_tokens:
-            context_tokens = context_tokens[:-truncate_tokens]
-            context = enc.decode(context_tokens)
-        
-        prompt = (
-            "Use the context to answer the question.\n\n"
-            f"Context:\n{context}"
-            f"Question: {question}\n"
-            f"Answer:"
-        )
-    
-    return prompt
+def build_document_index(raw_text):
+    """Chunk, embed and index one document"""
+    chunks, embeddings = index_document(raw_text)
+    corpus = build_corpus_index([(0, chunks, embeddings)], load_embed_model().get_sentence_embedding_dimension())
+    return corpus, chunks
 
 # --- Streamlit UI ---
 st.set_page_config(page_title="📄 PDF Q&A Chatbot")
@@ -114,12 +38,13 @@ uploaded = st.file_uploader("Upload a PDF file", type="pdf")
 
 if uploaded:
     with st.spinner("📄 Reading and processing PDF..."):
-        raw_text = extract_text_from_pdf(uploaded)
-        chunks = chunk_text(raw_text)
-
         # Store in session to avoid recomputing
         if "index" not in st.session_state or st.session_state.get("uploaded_file") != uploaded.name:
-            index, embeddings = build_faiss_index(chunks, embed_model)
+            raw_text = extract_text(uploaded.read())
+            if is_extraction_failure(raw_text):
+                st.error(f"Could not read the PDF: {raw_text}")
+                st.stop()
+            index, chunks = build_document_index(raw_text)
             st.session_state.index = index
             st.session_state.chunks = chunks
             st.session_state.uploaded_file = uploaded.name
@@ -130,39 +55,39 @@ if uploaded:
 
     if question:
         with st.spinner("🔍 Retrieving & generating answer..."):
+            # Pack as much non-overlapping relevant context as the window allows
             top_chunks = retrieve_chunks(
-                question,
-                st.session_state.chunks,
-                st.session_state.index,
-                embed_model,
-                k=3
-            )
-            prompt = make_prompt(question, top_chunks)
+                question, st.session_state.index, k=3, budget=qa_budget(question, LLM_CONTEXT_LENGTH)
+            ).get(0, [])
+            prompt = make_qa_prompt(question, top_chunks, LLM_CONTEXT_LENGTH)
             
             # Debug: Show token count
-            enc = tiktoken.get_encoding("cl100k_base")
-            token_count = len(enc.encode(prompt))
+            token_count = count_tokens(prompt)
             
             with st.expander("Debug Info"):
                 st.write(f"Prompt token count: {token_count}")
                 st.text_area("Generated prompt:", prompt, height=200)
+        
+        try:
+            st.markdown("### 🧾 Answer")
+            # Render tokens as they are generated instead of waiting for the full answer
+            answer = st.write_stream(llm_worker.stream(
+                prompt,
+                request_id=st.session_state.session_request_id,
+                block=True,
+                max_new_tokens=100  # Reduced max_new_tokens
+            ))
             
-            try:
-                answer = llm(prompt, max_new_tokens=100)  # Reduced max_new_tokens
-                
-                st.markdown("### 🧾 Answer")
-                st.write(answer)
-                
-            except Exception as e:
-                st.error(f"Error generating answer: {str(e)}")
-                st.info("Try asking a shorter question or check if your model supports the current context length.")
+        except Exception as e:
+            st.error(f"Error generating answer: {str(e)}")
+            st.info("Try asking a shorter question or check if your model supports the current context length.")
 
 # Add some helpful information
 with st.sidebar:
     st.markdown("### ℹ️ Model Info")
-    st.write("- Context Length: 512 tokens")
+    st.write(f"- Context Length: {LLM_CONTEXT_LENGTH} tokens")
     st.write("- Chunk Size: 80 tokens")
-    st.write("- Max Retrieved Chunks: 3")
+    st.write("- Retrieved Chunks: as many as fit, overlaps merged")
     st.write("- Max New Tokens: 100")
     
     st.markdown("### 💡 Tips")
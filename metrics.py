@@ -0,0 +1,224 @@
+"""
+Lightweight latency instrumentation in the Prometheus text format.
+
+Pipeline stages are wrapped in stage_timer(stage), which records the time
+into a histogram (and counts the stage's exceptions even when the caller
+turns them into an error response). Requests that opt in with
+start_request_timings() also collect their own per-stage totals, which the
+API returns under its debug flag. render() produces the text exposition
+served at /api/metrics; no prometheus_client dependency is needed.
+
+RequestStats holds the last_*_stats counters of the pipeline modules in a
+context variable as well, so concurrent requests (one thread each) keep
+their own totals instead of overwriting a shared dict.
+"""
+
+import contextlib
+import contextvars
+import threading
+import time
+from collections.abc import MutableMapping
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# Per-request {stage: {'seconds', 'count'}}, or None when not collecting
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels"""
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                for bound, bucket_count in zip(self.buckets, counts):
+                    labels = _format_labels(self.labelnames, key, [("le", _format_value(float(bound)))])
+                    lines.append(f"{self.name}_bucket{labels} {bucket_count}")
+                labels = _format_labels(self.labelnames, key, [("le", "+Inf")])
+                lines.append(f"{self.name}_bucket{labels} {count}")
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+def render_gauge(name, help_text, values, labelnames=(), metric_type="gauge"):
+    """Lines for a gauge (or another metric_type) given {label values tuple: value}, skipping None values"""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+    for key, value in values.items():
+        if value is not None:
+            lines.append(f"{name}{_format_labels(labelnames, key)} {_format_value(value)}")
+    return lines
+
+
+def render_counter(name, help_text, values, labelnames=()):
+    """Lines for a counter kept elsewhere (e.g. by the LLM worker); name should end in _total"""
+    return render_gauge(name, help_text, values, labelnames, "counter")
+
+
+stage_seconds = Histogram(
+    "resume_checker_stage_seconds", "Time spent in each pipeline stage", ("stage",)
+)
+stage_errors = Counter(
+    "resume_checker_stage_errors_total", "Exceptions raised inside a pipeline stage", ("stage",)
+)
+request_seconds = Histogram(
+    "resume_checker_request_seconds", "HTTP request latency", ("endpoint",)
+)
+requests_total = Counter(
+    "resume_checker_requests_total", "HTTP requests served", ("endpoint", "method", "status")
+)
+
+
+@contextlib.contextmanager
+def stage_timer(stage):
+    """Time the enclosed block as one observation of stage"""
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        stage_errors.inc(stage=stage)
+        raise
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+
+def observe_stage(stage, seconds):
+    """Record one observation of stage measured elsewhere, e.g. the LLM worker's queue wait"""
+    stage_seconds.observe(seconds, stage=stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        entry = timings.setdefault(stage, {'seconds': 0.0, 'count': 0})
+        entry['seconds'] += seconds
+        entry['count'] += 1
+
+
+def start_request_timings(enabled=True):
+    """Begin (or, with enabled=False, stop) collecting stage timings for the current request"""
+    _request_timings.set({} if enabled else None)
+
+
+def request_timings():
+    """Per-stage totals collected for the current request, or None"""
+    timings = _request_timings.get()
+    if timings is None:
+        return None
+    return {stage: {'seconds': round(entry['seconds'], 4), 'count': entry['count']}
+            for stage, entry in timings.items()}
+
+
+class RequestStats(MutableMapping):
+    """Dict of counters private to the current request (thread or task)
+
+    Reads and writes go to the current context's dict, created from defaults
+    on first use. reset() starts a fresh one for a new request; latest() is
+    the dict most recently reset in any context, for status endpoints.
+    """
+
+    def __init__(self, name, defaults):
+        self.defaults = dict(defaults)
+        self._var = contextvars.ContextVar(name, default=None)
+        self._latest = dict(defaults)
+
+    def current(self):
+        """The current request's dict (mutating it updates the stats)"""
+        stats = self._var.get()
+        if stats is None:
+            stats = dict(self.defaults)
+            self._var.set(stats)
+        return stats
+
+    def reset(self, **values):
+        """Start new stats for the current request from defaults, overridden by values"""
+        stats = dict(self.defaults, **values)
+        self._var.set(stats)
+        self._latest = stats
+        return stats
+
+    def latest(self):
+        """Copy of the stats of the most recently reset request"""
+        return dict(self._latest)
+
+    def __getitem__(self, key):
+        return self.current()[key]
+
+    def __setitem__(self, key, value):
+        self.current()[key] = value
+
+    def __delitem__(self, key):
+        del self.current()[key]
+
+    def __iter__(self):
+        return iter(self.current())
+
+    def __len__(self):
+        return len(self.current())
+
+    def __repr__(self):
+        return f"RequestStats({self.current()!r})"
+
+
+def render(*extra_lines):
+    """Prometheus text exposition of every built-in metric plus extra gauge lines"""
+    lines = []
+    for metric in (requests_total, request_seconds, stage_seconds, stage_errors):
+        lines.extend(metric.render())
+    for block in extra_lines:
+        lines.extend(block)
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,113 @@
+"""
+Parallel PDF text extraction for bulk uploads.
+
+PyMuPDF holds the GIL for most of its work, so a list of uploaded PDFs is
+extracted in a process pool. Results come back in upload order and failures
+keep the ERROR_/EMPTY_ markers used everywhere else, so callers can treat
+them exactly like the single-file extractor.
+
+A PDF is given either as bytes or as the path of a spooled upload
+(upload_spool.py). Paths are opened from disk by PyMuPDF, and only the path
+crosses to the worker process, so neither side holds the file in memory.
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import fitz  # PyMuPDF
+
+from metrics import RequestStats
+
+DEFAULT_WORKERS = int(os.environ.get("PDF_EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+
+# Workers must not be forked from the server: by the time the pool starts, the
+# model loader and inference threads are running, and a fork copies their locks
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+# Throughput of the current request's most recent extraction
+last_extraction_stats = RequestStats("extraction_stats", {
+    'files': 0,
+    'pages': 0,
+    'workers': 0,
+    'seconds': 0.0,
+    'pages_per_sec': 0.0
+})
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def reset_extraction_stats():
+    """Zero the last-extraction counters before a new request"""
+    last_extraction_stats.reset()
+
+
+def extract_pdf_text(pdf, error_prefix="ERROR_EXTRACTION", name=None):
+    """
+    Return (text, page_count) for PDF bytes or a PDF path, using the ERROR_/EMPTY_ markers on failure.
+
+    Error messages name a path as name (the upload's file name), or by its
+    base name, so server paths do not reach clients.
+    """
+    try:
+        if isinstance(pdf, str):
+            if os.path.getsize(pdf) == 0:
+                return "EMPTY_FILE", 0
+            doc = fitz.open(pdf, filetype="pdf")
+        elif not pdf:
+            return "EMPTY_FILE", 0
+        else:
+            doc = fitz.open(stream=pdf, filetype="pdf")
+        pages = doc.page_count
+        text = "\n".join(page.get_text() for page in doc)
+        doc.close()
+        return (text if text.strip() else "EMPTY_CONTENT"), pages
+    except Exception as e:
+        message = str(e)
+        if isinstance(pdf, str):
+            message = message.replace(pdf, name or os.path.basename(pdf))
+        return f"{error_prefix}: {message}", 0
+
+
+def _get_pool(workers):
+    """Return a process pool with the requested size, reusing it across calls"""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(START_METHOD))
+            _pool_workers = workers
+        return _pool
+
+
+def extract_pdf_batch(pdfs, error_prefix="ERROR_EXTRACTION", workers=DEFAULT_WORKERS, names=None):
+    """Extract text from many PDFs (bytes or paths, named in errors by names) concurrently, in input order"""
+    names = names or [None] * len(pdfs)
+    active = max(1, min(workers, len(pdfs)))
+    start_time = time.perf_counter()
+    if active == 1:
+        results = [extract_pdf_text(pdf, error_prefix, name) for pdf, name in zip(pdfs, names)]
+    else:
+        pool = _get_pool(workers)
+        results = list(pool.map(
+            extract_pdf_text,
+            pdfs,
+            [error_prefix] * len(pdfs),
+            names
+        ))
+    elapsed = time.perf_counter() - start_time
+
+    pages = sum(page_count for _, page_count in results)
+    last_extraction_stats.update({
+        'files': len(pdfs),
+        'pages': pages,
+        'workers': active,
+        'seconds': round(elapsed, 4),
+        'pages_per_sec': round(pages / elapsed, 1) if elapsed > 0 else 0.0
+    })
+    return [text for text, _ in results]
@@ -0,0 +1,101 @@
+"""
+Prompt-prefix reuse when scoring many resumes against the same JD.
+
+Scoring prompts are built as a shared prefix (instructions + job
+description) followed by the resume-specific suffix. Backends then skip
+re-evaluating the prefix:
+
+- ctransformers keeps the tokens it evaluated last and only evaluates the
+  part of a new prompt after the longest common prefix, so prompts for one
+  JD must be byte-identical up to the resume and sent consecutively.
+- llama-cpp-python gets a RAM state cache (set_cache) that saves and
+  restores the evaluated state for previously seen prefixes.
+
+Run `python prefix_cache.py --model <gguf>` to measure time-to-first-token
+per resume with and without prefix reuse.
+"""
+
+import os
+import time
+import warnings
+
+PREFIX_CACHE_MB = int(os.environ.get("LLM_PREFIX_CACHE_MB", "1024"))
+
+
+def enable_prefix_cache(model, capacity_mb=PREFIX_CACHE_MB):
+    """Turn on prefix state reuse for a loaded model and return the mechanism used"""
+    if hasattr(model, "set_cache"):
+        from llama_cpp import LlamaRAMCache
+        model.set_cache(LlamaRAMCache(capacity_bytes=capacity_mb * 1024 * 1024))
+        return "llama_cpp_ram_cache"
+    if hasattr(model, "prepare_inputs_for_generation"):
+        # ctransformers only reuses its context when reset is on (the default)
+        model.config.reset = True
+        return "ctransformers_context"
+    return None
+
+
+def reset_context(model):
+    """Drop the evaluated context so the next prompt starts cold"""
+    with warnings.catch_warnings():
+        # ctransformers deprecated reset() in 0.2.27 but it is the only way to clear the context
+        warnings.simplefilter("ignore")
+        model.reset()
+
+
+def time_to_first_token(model, prompt, max_new_tokens=8):
+    """Seconds until the first streamed token of prompt"""
+    start = time.perf_counter()
+    for _ in model(prompt, max_new_tokens=max_new_tokens, stream=True):
+        return time.perf_counter() - start
+    return time.perf_counter() - start
+
+
+def benchmark_prefix_reuse(model, prefix, suffixes, max_new_tokens=8):
+    """Average TTFT per resume with a cold context versus reusing the shared prefix"""
+    cold = []
+    for suffix in suffixes:
+        reset_context(model)
+        cold.append(time_to_first_token(model, prefix + suffix, max_new_tokens))
+
+    reset_context(model)
+    time_to_first_token(model, prefix + suffixes[0], max_new_tokens)
+    warm = [time_to_first_token(model, prefix + suffix, max_new_tokens) for suffix in suffixes]
+
+    return {
+        'resumes': len(suffixes),
+        'cold_ttft_avg_seconds': round(sum(cold) / len(cold), 3),
+        'prefix_reuse_ttft_avg_seconds': round(sum(warm) / len(warm), 3),
+        'speedup': round(sum(cold) / sum(warm), 2)
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import random
+
+    from ctransformers import AutoModelForCausalLM
+
+    parser = argparse.ArgumentParser(description="Prompt-prefix reuse TTFT benchmark")
+    parser.add_argument("--model", default="./mistral-7b-instruct-v0.2.Q4_K_M.gguf")
+    parser.add_argument("--resumes", type=int, default=10)
+    args = parser.parse_args()
+
+    llm = AutoModelForCausalLM.from_pretrained(
+        args.model, model_type="mistral", gpu_layers=0, context_length=512
+    )
+    enable_prefix_cache(llm)
+
+    words = ("python machine learning data engineer experience skills project "
+             "team lead university degree developed managed designed cloud").split()
+    rng = random.Random(0)
+    prefix = (
+        "Evaluate how well this resume matches the job description. "
+        "Provide a score out of 100 and brief reasoning.\n\n"
+        f"Job Description: {' '.join(rng.choices(words, k=180))}\n\n"
+        "Resume Content:\n"
+    )
+    suffixes = [" ".join(rng.choices(words, k=120)) + "\nEvaluation (Score/100 and reasoning):"
+                for _ in range(args.resumes)]
+    print(json.dumps(benchmark_prefix_reuse(llm, prefix, suffixes), indent=2))
@@ -0,0 +1,115 @@
+"""
+Embedding-only pre-screen that runs before the LLM.
+
+The corpus search that retrieves each resume's top chunks for a job
+description already yields their distances. Those are turned into a cheap
+0-100 similarity score, and only the top-N and/or above-threshold resumes
+are sent to the LLM; the rest keep their embedding score. With a JD split
+into requirement queries (see jd_requirements.py) the score is the mean of
+the resume's best similarity to each requirement.
+"""
+
+import os
+
+import numpy as np
+
+from context_packing import candidate_count, select_context
+
+# 0 disables the corresponding rule; with both disabled every resume goes to the LLM
+DEFAULT_TOP_N = int(os.environ.get("PRESCREEN_TOP_N", "0"))
+DEFAULT_THRESHOLD = float(os.environ.get("PRESCREEN_THRESHOLD", "0"))
+
+STAGE_LLM = "llm"
+STAGE_EMBEDDING = "embedding"
+# Unreadable or empty resume: not scored at all
+STAGE_ERROR = "error"
+
+
+def embedding_score(hits):
+    """0-100 score from [(chunk_position, squared L2 distance)] of normalized embeddings"""
+    if not hits:
+        return 0.0
+    similarities = 1 - np.array([distance for _, distance in hits], dtype="float32") / 2
+    return round(float(np.clip(similarities.mean(), 0, 1)) * 100, 1)
+
+
+def select_for_llm(scores, top_n=DEFAULT_TOP_N, threshold=DEFAULT_THRESHOLD):
+    """Return the ids whose score is in the top_n or at least threshold"""
+    if top_n <= 0 and threshold <= 0:
+        return set(scores)
+    selected = set()
+    if top_n > 0:
+        ranked = sorted(scores, key=lambda doc_id: scores[doc_id], reverse=True)
+        selected.update(ranked[:top_n])
+    if threshold > 0:
+        selected.update(doc_id for doc_id, score in scores.items() if score >= threshold)
+    return selected
+
+
+def context_chunks(corpus, hits, query_vecs, budget):
+    """Each document's ranked chunks, or with a token budget its packed context spans"""
+    if budget is None:
+        return {
+            doc_id: [corpus.documents[doc_id][0][pos] for pos, _ in doc_hits]
+            for doc_id, doc_hits in hits.items()
+        }
+    return {
+        doc_id: select_context(*corpus.documents[doc_id], [pos for pos, _ in doc_hits], query_vecs, budget)
+        for doc_id, doc_hits in hits.items()
+    }
+
+
+def prescreen(corpus, query_vec, k=3, top_n=DEFAULT_TOP_N, threshold=DEFAULT_THRESHOLD, budget=None):
+    """
+    Retrieve and pre-score every document in the corpus for one query.
+
+    Returns (top_chunks, scores, selected) where top_chunks maps doc id to its
+    k closest chunk texts, scores maps doc id to its embedding score and
+    selected is the set of doc ids that should go to the LLM. With a token
+    budget, top_chunks are instead packed from more candidates (see
+    context_packing.py); scores still use the k closest.
+    """
+    hits = corpus.search_per_document(query_vec, k if budget is None else candidate_count(budget, k))
+    top_chunks = context_chunks(corpus, hits, query_vec, budget)
+    scores = {doc_id: embedding_score(doc_hits[:k]) for doc_id, doc_hits in hits.items()}
+    return top_chunks, scores, select_for_llm(scores, top_n, threshold)
+
+
+def requirement_coverage(distances):
+    """0-1 similarity of a document's closest chunk to each requirement, from squared L2 distances"""
+    return np.clip(1 - np.asarray(distances, dtype="float32") / 2, 0, 1)
+
+
+def coverage_score(coverage):
+    """0-100 score from per-requirement similarities"""
+    return round(float(np.mean(coverage)) * 100, 1) if len(coverage) else 0.0
+
+
+def prescreen_requirements(corpus, query_vecs, k=3, top_n=DEFAULT_TOP_N, threshold=DEFAULT_THRESHOLD, rrf_k=60,
+                           budget=None):
+    """
+    Like prescreen, with one query per JD requirement searched together.
+
+    Returns (top_chunks, scores, selected, coverage): top_chunks are the k
+    chunks of each document ranked by reciprocal rank fusion over the
+    requirements, coverage maps doc id to its per-requirement similarities
+    and scores are their means. budget packs top_chunks as in prescreen.
+    """
+    search_k = k if budget is None else candidate_count(budget, k)
+    fused, distances = corpus.search_multi_per_document(query_vecs, search_k, rrf_k)
+    top_chunks = context_chunks(corpus, fused, query_vecs, budget)
+    coverage = {doc_id: requirement_coverage(doc_distances) for doc_id, doc_distances in distances.items()}
+    scores = {doc_id: coverage_score(doc_coverage) for doc_id, doc_coverage in coverage.items()}
+    return top_chunks, scores, select_for_llm(scores, top_n, threshold), coverage
+
+
+def prescreened_result(resume_name, score, chunks_used):
+    """Result dict for a resume that was scored by embeddings only"""
+    return {
+        'resume_name': resume_name,
+        'score': score,
+        'reasoning': "Not sent to the LLM: embedding pre-screen score below the shortlist cutoff",
+        'chunks_used': chunks_used,
+        'score_stage': STAGE_EMBEDDING,
+        'embedding_score': score
+    }
@@ -0,0 +1,125 @@
+"""
+Prompt builders for every front end.
+
+make_qa_prompt backs the PDF Q&A app (main.py). make_scoring_prefix and
+make_scoring_suffix build the scoring prompts of every resume front end
+(engine.build_scoring_prompt). Both budget the context from the token counts
+carried by the chunks (see tokenization.py), so building a prompt does not
+tokenize the chunks or the finished prompt again.
+
+The window is the configured LLM context length. scoring_context splits it
+between the JD and the resume (context_packing.py); retrieval packs the
+resume chunks for the same budget.
+
+Run `python prompts.py` to time both builders with precomputed counts against
+re-encoding every chunk and template on each call.
+"""
+
+from tokenization import count_tokens, pack_chunks
+from scoring import SCORE_CUE
+from context_packing import CONTEXT_LENGTH, plan_context
+
+# Tokens reserved for each kind of answer
+QA_ANSWER_TOKENS = 100
+SCORING_ANSWER_TOKENS = 150
+
+QA_TEMPLATE = (
+    "Use the context to answer the question.\n\n"
+    "Context:\n{context}"
+    "Question: {question}\n"
+    "Answer:"
+)
+
+
+def qa_budget(question, model_max_tokens=CONTEXT_LENGTH):
+    """Tokens left for context in a question-answering prompt"""
+    base_tokens = count_tokens(QA_TEMPLATE.format(context="", question=question))
+    return model_max_tokens - base_tokens - QA_ANSWER_TOKENS
+
+
+def make_qa_prompt(question, context_chunks, model_max_tokens=CONTEXT_LENGTH):
+    """Create a question-answering prompt whose context fits the model window"""
+    context, _ = pack_chunks(context_chunks, qa_budget(question, model_max_tokens))
+    return QA_TEMPLATE.format(context=context, question=question)
+
+
+def scoring_context(jd_text, model_max_tokens=CONTEXT_LENGTH):
+    """(JD fitted to its share, whether it was cut, resume token budget) of a scoring prompt"""
+    template_tokens = count_tokens(_scoring_prefix("", True)) + count_tokens(make_scoring_suffix([]))
+    return plan_context(jd_text, template_tokens, SCORING_ANSWER_TOKENS, model_max_tokens)
+
+
+def make_scoring_prefix(jd_text):
+    """Instructions and job description shared by every resume scored against this JD"""
+    fitted_jd, truncated, _ = scoring_context(jd_text)
+    return _scoring_prefix(fitted_jd, truncated)
+
+
+def _scoring_prefix(jd_text, truncated):
+    return f"""
+    Please analyze how well this resume matches the job requirements and provide a score from 0-100.
+    Consider skills, experience, education, and overall fit.
+    
+    Format your response as:
+    Score: [number]
+    Reasoning: [brief explanation]
+    
+    Job Requirements:
+    {jd_text}{"..." if truncated else ""}
+    
+    """
+
+
+def make_scoring_suffix(top_chunks, budget=None):
+    """Resume-specific part of the scoring prompt, with at most budget tokens of chunks"""
+    context = " ".join(top_chunks) if budget is None else pack_chunks(top_chunks, budget, " ")[0].rstrip()
+    # Ends with the score cue so generation starts with the number
+    return f"""Resume Content:
+    {context}
+    
+    {SCORE_CUE}"""
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import random
+    import time
+
+    import tokenization
+
+    parser = argparse.ArgumentParser(description="make_prompt latency benchmark")
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+
+    words = ("python machine learning data engineer experience skills project "
+             "team lead university degree developed managed designed cloud").split()
+    rng = random.Random(0)
+    resume = " ".join(rng.choices(words, k=600))
+    jd = " ".join(rng.choices(words, k=150))
+    question = "Which cloud projects did the candidate lead?"
+    token_chunks = tokenization.chunk_text(resume)[:3]
+    plain_chunks = [str(chunk) for chunk in token_chunks]
+
+    def time_calls(build, chunks, reencode):
+        start = time.perf_counter()
+        for _ in range(args.calls):
+            if reencode:
+                # Forget memoized counts so every call tokenizes like the old builders
+                tokenization._count_text_tokens.cache_clear()
+            build(chunks)
+        return round((time.perf_counter() - start) / args.calls * 1e6, 1)
+
+    def scoring_prompt(chunks):
+        # As engine.build_scoring_prompt, once the chunks are retrieved
+        _, _, budget = scoring_context(jd)
+        return make_scoring_prefix(jd) + make_scoring_suffix(chunks, budget)
+
+    results = {}
+    for name, build in (("qa", lambda chunks: make_qa_prompt(question, chunks)),
+                        ("scoring", scoring_prompt)):
+        results[name] = {
+            'reencoded_us_per_call': time_calls(build, plain_chunks, True),
+            'precomputed_us_per_call': time_calls(build, token_chunks, False)
+        }
+    print(json.dumps(results, indent=2))
@@ -0,0 +1,100 @@
+"""
+Memoized LLM scoring results.
+
+Re-running a check with the same resume and job description (for example
+after changing max_score or cutoff_score, which only rescale the result)
+returns the stored raw score and reasoning instead of generating again.
+Entries are keyed by resume hash, normalized JD hash, model identifier and
+prompt template version, expire after a TTL and are evicted LRU beyond a
+maximum entry count.
+"""
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from embedding_cache import content_hash
+
+DEFAULT_MAX_ENTRIES = int(os.environ.get("RESULT_CACHE_MAX_ENTRIES", "10000"))
+DEFAULT_TTL_SECONDS = float(os.environ.get("RESULT_CACHE_TTL_SECONDS", "86400"))
+
+
+def normalize_jd(jd_text):
+    """Collapse whitespace so reformatted copies of a JD share a key"""
+    return re.sub(r"\s+", " ", jd_text).strip()
+
+
+def result_key(resume_text, jd_text, model_id, prompt_version):
+    """Cache key for one (resume, JD, model, prompt version) scoring"""
+    return (content_hash(resume_text), content_hash(normalize_jd(jd_text)), model_id, prompt_version)
+
+
+class ResultCache:
+    """LRU cache with per-entry expiry and hit/miss counters"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """Return the cached value for key or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] < time.time():
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        """Store value under key, evicting least recently used entries"""
+        if self.max_entries <= 0:
+            return value
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (value, time.time() + self.ttl_seconds)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        """Drop all entries and reset counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.expirations = 0
+
+    def stats(self):
+        """Return cache counters as a plain dict"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+# Process-wide cache shared by every request in this process
+result_cache = ResultCache()
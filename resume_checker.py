@@ -1,29 +1,44 @@
 import streamlit as st
-import fitz  # PyMuPDF
-import tiktoken
-import faiss
-import numpy as np
 import pandas as pd
-from sentence_transformers import SentenceTransformer
-from ctransformers import AutoModelForCausalLM
 import os
-from typing import List, Dict, Tuple
 import tempfile
+import uuid
+from embedding_cache import embedding_cache
+from embedding_store import get_embedding_store, is_extraction_failure
+from pdf_extraction import last_extraction_stats
+from upload_spool import UploadTooLarge, temporary_spool
+from prescreen import (
+    STAGE_LLM,
+    STAGE_ERROR,
+    DEFAULT_TOP_N as PRESCREEN_TOP_N,
+    DEFAULT_THRESHOLD as PRESCREEN_THRESHOLD,
+)
+from fast_scoring import FAST, STAGE_FAST
+from batch_embedder import last_batch_stats
+from tokenization import last_chunking_stats
+from scoring import (
+    FULL as SCORING_FULL,
+    SCORE_ONLY,
+    SHORTLIST,
+    DEFAULT_MODE as SCORING_MODE,
+    DEFAULT_REASONING_TOP_N,
+    last_scoring_stats,
+    reset_scoring_stats,
+)
+from engine import (
+    cached_extract_file,
+    load_resume_files,
+    match_resumes,
+    fast_match_resumes,
+)
 
 # --- Setup ---
-@st.cache_resource
-def load_models():
-    embed_model = SentenceTransformer("all-MiniLM-L6-v2")
-    llm_model = AutoModelForCausalLM.from_pretrained(
-        "./mistral-7b-instruct-v0.2.Q4_K_M.gguf",
-        model_type="mistral",
-        gpu_layers=0,
-        max_new_tokens=256,
-        context_length=512
-    )
-    return embed_model, llm_model
-
-embed_model, llm = load_models()
+# Models load on first use through the shared registry (engine.py), so every
+# browser session of this server, and the API when run in the same process
+# or behind the same inference service, shares one copy of each model.
+# Prompts are scheduled fairly across sessions
+if 'session_request_id' not in st.session_state:
+    st.session_state.session_request_id = uuid.uuid4().hex
 
 # --- Utils ---
 def extract_text_from_pdf(uploaded_file):
@@ -36,134 +51,22 @@ def extract_text_from_pdf(uploaded_file):
         if uploaded_file.size == 0:
             return "EMPTY_FILE"
         
-        doc = fitz.open(stream=uploaded_file.read(), filetype="pdf")
-        text = "\n".join([page.get_text() for page in doc])
-        doc.close()
+        # Spooled to disk and opened from there; identical uploads are only parsed once
+        with temporary_spool() as spool:
+            text = cached_extract_file(spool.add(uploaded_file), "ERROR_EXTRACTING_TEXT")
         
         # Reset file pointer for potential future reads
         uploaded_file.seek(0)
-        
-        return text if text.strip() else "EMPTY_CONTENT"
+        return text
     except Exception as e:
         uploaded_file.seek(0)  # Reset pointer even on error
         return f"ERROR_EXTRACTING_TEXT: {str(e)}"
 
-def chunk_text(text, max_tokens=80, stride=40):
-    """Split text into chunks for processing"""
-    enc = tiktoken.get_encoding("cl100k_base")
-    tokens = enc.encode(text)
-    chunks = []
-    for i in range(0, len(tokens), stride):
-        chunk = tokens[i:i + max_tokens]
-        chunk_text = enc.decode(chunk)
-        chunks.append(chunk_text)
-        if i + max_tokens >= len(tokens):
-            break
-    return chunks
-
-def build_faiss_index(chunks, model):
-    """Build FAISS index for semantic search"""
-    embeddings = model.encode(chunks, convert_to_tensor=False)
-    dim = len(embeddings[0])
-    index = faiss.IndexFlatL2(dim)
-    index.add(np.array(embeddings).astype("float32"))
-    return index, embeddings
-
-def retrieve_chunks(query, chunks, index, model, k=3):
-    """Retrieve most relevant chunks for a query"""
-    query_vec = model.encode([query], convert_to_tensor=False)
-    D, I = index.search(np.array(query_vec).astype("float32"), k)
-    return [chunks[i] for i in I[0]]
-
-def make_prompt(jd, context_chunks, model_max_tokens=512):
-    """Create prompt for LLM to evaluate resume against JD"""
-    enc = tiktoken.get_encoding("cl100k_base")
-    
-    base_prompt = (
-        "Evaluate how well this resume matches the job description. "
-        "Consider skills, experience, education, and overall fit. "
-        "Provide a score out of 100 and brief reasoning.\n\n"
-        f"Job Description: {jd}\n\n"
-        "Resume Content:\n"
-    )
-    
-    base_tokens = len(enc.encode(base_prompt))
-    reserved_for_answer = 150
-    available_for_context = model_max_tokens - base_tokens - reserved_for_answer
-    
-    # Build context within token limit
-    context = ""
-    used_tokens = 0
-    
-    for chunk in context_chunks:
-        chunk_with_separator = chunk + "\n\n"
-        chunk_tokens = len(enc.encode(chunk_with_separator))
-        
-        if used_tokens + chunk_tokens > available_for_context:
-            break
-            
-        context += chunk_with_separator
-        used_tokens += chunk_tokens
-    
-    prompt = (
-        "Evaluate how well this resume matches the job description. "
-        "Consider skills, experience, education, and overall fit. "
-        "Provide a score out of 100 and brief reasoning.\n\n"
-        f"Job Description: {jd}\n\n"
-        f"Resume Content:\n{context}\n"
-        "Evaluation (Score/100 and reasoning):"
-    )
-    
-    return prompt
-
-def extract_score_from_response(response: str) -> Tuple[float, str]:
-    """Extract numerical score from LLM response"""
-    try:
-        # Look for numbers in the response
-        import re
-        numbers = re.findall(r'\b(\d+(?:\.\d+)?)\b', response)
-        if numbers:
-            # Take the first number that's between 0 and 100
-            for num in numbers:
-                score = float(num)
-                if 0 <= score <= 100:
-                    return score, response
-        # If no valid score found, return 0
-        return 0.0, response
-    except:
-        return 0.0, response
-
-def process_resume_jd_matching(resume_text: str, jd: str, resume_name: str) -> Dict:
-    """Process a single resume against a job description"""
-    # Chunk the resume
-    chunks = chunk_text(resume_text)
-    
-    # Build index for this resume
-    index, embeddings = build_faiss_index(chunks, embed_model)
-    
-    # Retrieve relevant chunks
-    top_chunks = retrieve_chunks(jd, chunks, index, embed_model, k=3)
-    
-    # Create prompt and get LLM response
-    prompt = make_prompt(jd, top_chunks)
-    
-    try:
-        response = llm(prompt, max_new_tokens=100)
-        score, reasoning = extract_score_from_response(response)
-        
-        return {
-            'resume_name': resume_name,
-            'score': score,
-            'reasoning': reasoning,
-            'chunks_used': len(top_chunks)
-        }
-    except Exception as e:
-        return {
-            'resume_name': resume_name,
-            'score': 0.0,
-            'reasoning': f"Error processing: {str(e)}",
-            'chunks_used': 0
-        }
+def load_resume_texts(uploaded_files):
+    """Extract and index resume PDFs, reusing the persistent store and batching new embeddings"""
+    # Copied to disk file by file instead of collecting every upload's bytes in a list
+    with temporary_spool() as spool:
+        return load_resume_files(spool.add_all(uploaded_files), "ERROR_EXTRACTING_TEXT")
 
 # --- Streamlit UI ---
 st.set_page_config(page_title="📄 Resume Checker", layout="wide")
@@ -179,6 +82,41 @@ with st.sidebar:
     st.write(f"Max Score: {max_score}")
     st.write(f"Cutoff Score: {cutoff_score}")
     st.write(f"Model: Mistral 7B (Local)")
+    
+    st.markdown("### 🔎 Embedding Pre-screen")
+    prescreen_top_n = st.number_input(
+        "Send top N resumes per JD to the LLM (0 = all)",
+        min_value=0, max_value=200, value=PRESCREEN_TOP_N, step=5
+    )
+    prescreen_threshold = st.number_input(
+        "Also send resumes with embedding score ≥ (0 = off)",
+        min_value=0.0, max_value=100.0, value=PRESCREEN_THRESHOLD, step=5.0
+    )
+    
+    st.markdown("### 🧮 Scoring")
+    scoring_labels = {
+        SCORING_FULL: "Score + reasoning",
+        SCORE_ONLY: "Score only (fastest)",
+        SHORTLIST: "Score all, reasoning for top N",
+        FAST: "Requirement coverage only (no LLM)"
+    }
+    scoring_mode = st.selectbox(
+        "LLM output",
+        list(scoring_labels),
+        index=list(scoring_labels).index(SCORING_MODE),
+        format_func=scoring_labels.get
+    )
+    reasoning_top_n = st.number_input(
+        "Reasoning for top N resumes per JD",
+        min_value=1, max_value=200, value=DEFAULT_REASONING_TOP_N, step=1,
+        disabled=scoring_mode != SHORTLIST
+    )
+    
+    st.markdown("### 🗃️ Embedding Cache")
+    cache_stats = embedding_cache.stats()
+    st.write(f"Hits / Misses: {cache_stats['hits']} / {cache_stats['misses']}")
+    st.write(f"Memory: {cache_stats['current_mb']} / {cache_stats['max_mb']} MB")
+    st.write(f"Stored resumes: {get_embedding_store().stats()['documents']}")
 
 # Main content area
 col1, col2 = st.columns([1, 1])
@@ -227,66 +165,104 @@ if uploaded_resumes and uploaded_jds:
         else:
             # Initialize results storage
             all_results = []
+            reset_scoring_stats(scoring_mode)
             
             # Progress bar
             progress_bar = st.progress(0)
             status_text = st.empty()
             
-            total_operations = len(uploaded_resumes) * len(uploaded_jds)
-            current_operation = 0
+            # Extract every resume once up front and embed new ones in shared batches
+            status_text.text("Extracting and embedding resumes...")
+            try:
+                resume_texts = load_resume_texts(uploaded_resumes)
+            except UploadTooLarge as e:
+                st.error(f"❌ {e}")
+                st.stop()
+            if last_extraction_stats['files']:
+                st.caption(
+                    f"Extracted {last_extraction_stats['pages']} pages from "
+                    f"{last_extraction_stats['files']} resumes with "
+                    f"{last_extraction_stats['workers']} workers at "
+                    f"{last_extraction_stats['pages_per_sec']} pages/sec"
+                )
+            if last_batch_stats['chunks']:
+                st.caption(
+                    f"Embedded {last_batch_stats['chunks']} chunks from "
+                    f"{last_batch_stats['documents']} resumes at "
+                    f"{last_batch_stats['chunks_per_sec']} chunks/sec"
+                )
+            if last_chunking_stats['documents']:
+                st.caption(
+                    f"Chunked {last_chunking_stats['documents']} resumes into "
+                    f"{last_chunking_stats['chunks']} chunks in {last_chunking_stats['seconds']}s, "
+                    f"{last_chunking_stats['bytes_per_document'] // 1024} KB per resume"
+                )
+            resume_names = [resume.name for resume in uploaded_resumes]
+            for resume_name, resume_text in zip(resume_names, resume_texts):
+                if is_extraction_failure(resume_text):
+                    st.warning(f"⚠️ Could not extract text from resume: {resume_name}")
             
-            # Process each JD against each resume
-            for jd_idx, jd_file in enumerate(uploaded_jds):
-                # Extract JD text
+            # Extract JD texts, skipping the ones that failed
+            jd_names, jd_texts = [], []
+            for jd_file in uploaded_jds:
                 if jd_file.type == "application/pdf":
                     jd_text = extract_text_from_pdf(jd_file)
                 else:  # txt file
                     jd_file.seek(0)  # Reset file pointer
                     jd_text = jd_file.read().decode('utf-8')
                 
-                # Skip if JD text extraction failed
                 if jd_text.startswith("ERROR_") or jd_text == "EMPTY_FILE" or jd_text == "EMPTY_CONTENT":
                     st.warning(f"⚠️ Could not extract text from JD: {jd_file.name}")
                     continue
+                jd_names.append(jd_file.name)
+                jd_texts.append(jd_text)
+            
+            # Same matching as the API: result cache, pre-screen, scoring modes and score parsing
+            if scoring_mode == FAST:
+                # One matrix product scores every readable resume; the LLM is never loaded
+                results, _ = fast_match_resumes(resume_names, resume_texts, jd_texts)
+            else:
+                results = match_resumes(
+                    resume_names, resume_texts, jd_texts,
+                    prescreen_top_n=prescreen_top_n,
+                    prescreen_threshold=prescreen_threshold,
+                    request_id=st.session_state.session_request_id,
+                    block=True,
+                    scoring_mode=scoring_mode,
+                    reasoning_top_n=reasoning_top_n
+                )
+            
+            total_operations = max(1, len(resume_texts) * len(jd_texts))
+            for current_operation, result in enumerate(results, 1):
+                # Update progress
+                progress_bar.progress(current_operation / total_operations)
+                jd_name = jd_names[result['jd_index']]
+                status_text.text(f"Processed: {result['resume_name']} against {jd_name}")
                 
-                for resume_idx, resume_file in enumerate(uploaded_resumes):
-                    # Update progress
-                    current_operation += 1
-                    progress = current_operation / total_operations
-                    progress_bar.progress(progress)
-                    status_text.text(f"Processing: {resume_file.name} against {jd_file.name}")
-                    
-                    # Extract resume text
-                    resume_text = extract_text_from_pdf(resume_file)
-                    
-                    # Skip if resume text extraction failed
-                    if resume_text.startswith("ERROR_") or resume_text == "EMPTY_FILE" or resume_text == "EMPTY_CONTENT":
-                        st.warning(f"⚠️ Could not extract text from resume: {resume_file.name}")
-                        continue
-                    
-                    # Process matching
-                    result = process_resume_jd_matching(
-                        resume_text, 
-                        jd_text, 
-                        resume_file.name
-                    )
-                    
-                    # Add JD info to result
-                    result['jd_name'] = jd_file.name
-                    result['jd_index'] = jd_idx
-                    result['resume_index'] = resume_idx
-                    
-                    all_results.append(result)
+                # Unreadable resumes were reported above
+                if is_extraction_failure(resume_texts[result['resume_index']]):
+                    continue
+                result['jd_name'] = jd_name
+                all_results.append(result)
             
             # Store results in session state
             st.session_state.matching_results = all_results
-            st.session_state.uploaded_jds = uploaded_jds
-            st.session_state.uploaded_resumes = uploaded_resumes
+            # Only the names are kept; the uploads themselves are not held across reruns
+            st.session_state.jd_names = jd_names
             
             progress_bar.progress(1.0)
             status_text.text("✅ Matching completed!")
             
-            st.success(f"✅ Processed {len(uploaded_resumes)} resumes against {len(uploaded_jds)} job descriptions")
+            st.success(f"✅ Processed {len(uploaded_resumes)} resumes against {len(jd_names)} job descriptions")
+            skipped = sum(1 for r in all_results if r['score_stage'] not in (STAGE_LLM, STAGE_ERROR))
+            if skipped and scoring_mode != FAST:
+                st.info(f"🔎 Embedding pre-screen skipped {skipped} of {len(all_results)} LLM calls")
+            if last_scoring_stats['generations']:
+                st.caption(
+                    f"LLM ({scoring_labels[scoring_mode]}): {last_scoring_stats['generations']} generations, "
+                    f"{last_scoring_stats['avg_tokens_per_pair']} tokens and "
+                    f"{last_scoring_stats['avg_seconds_per_pair']}s per pair"
+                )
 
 # Display results
 if 'matching_results' in st.session_state:
@@ -301,11 +277,11 @@ if 'matching_results' in st.session_state:
     with tab1:
         st.subheader("📈 Summary by Job Description")
         
-        for jd_idx, jd_file in enumerate(st.session_state.uploaded_jds):
+        for jd_idx, jd_name in enumerate(st.session_state.jd_names):
             jd_results = df[df['jd_index'] == jd_idx]
             
             if not jd_results.empty:
-                st.markdown(f"### {jd_file.name}")
+                st.markdown(f"### {jd_name}")
                 
                 # Calculate statistics
                 avg_score = jd_results['score'].mean()
@@ -342,13 +318,13 @@ if 'matching_results' in st.session_state:
         with col1:
             selected_jd = st.selectbox(
                 "Select Job Description",
-                [jd.name for jd in st.session_state.uploaded_jds]
+                st.session_state.jd_names
             )
         with col2:
             show_passed_only = st.checkbox("Show only passed candidates", value=False)
         
         # Filter data
-        jd_idx = [i for i, jd in enumerate(st.session_state.uploaded_jds) if jd.name == selected_jd][0]
+        jd_idx = st.session_state.jd_names.index(selected_jd)
         filtered_df = df[df['jd_index'] == jd_idx]
         
         if show_passed_only:
@@ -364,18 +340,26 @@ if 'matching_results' in st.session_state:
                 st.write("**Reasoning:**")
                 st.write(row['reasoning'])
                 st.write(f"**Chunks used:** {row['chunks_used']}")
+                stage_labels = {
+                    STAGE_LLM: 'LLM',
+                    STAGE_FAST: 'Requirement coverage (no LLM)',
+                    STAGE_ERROR: 'Not scored (unreadable resume)'
+                }
+                st.write(f"**Scored by:** {stage_labels.get(row['score_stage'], 'Embedding pre-screen')}")
     
     with tab3:
         st.subheader("📊 Analytics")
         
         # Overall statistics
-        col1, col2, col3 = st.columns(3)
+        col1, col2, col3, col4 = st.columns(4)
         with col1:
             st.metric("Total Matches", len(df))
         with col2:
             st.metric("Average Score", f"{df['score'].mean():.1f}")
         with col3:
             st.metric("Pass Rate", f"{(len(df[df['score'] >= cutoff_score])/len(df))*100:.1f}%")
+        with col4:
+            st.metric("LLM Calls Skipped", int((~df['score_stage'].isin([STAGE_LLM, STAGE_ERROR])).sum()))
         
         # Score distribution
         st.subheader("Score Distribution")
@@ -0,0 +1,139 @@
+"""
+Score-first structured output for LLM resume scoring.
+
+Scoring prompts end with the cue "Score:", so the model's first tokens are
+the number. Three modes:
+
+    full        score, then reasoning (up to the usual token limit)
+    score_only  stop at the end of the score line, a handful of tokens
+    shortlist   score_only for every pair, then reasoning for the best
+                REASONING_TOP_N resumes per JD by continuing their prompt
+
+The score is read from the start of the completion ("85", "85/100",
+"**85**"); a completion without one gives a result with parse_failed set
+and a score of 0, which is never cached.
+
+Generated tokens (counted with the shared cl100k encoder) and generation
+seconds are accumulated in last_scoring_stats and averaged per scored pair,
+including any reasoning generated afterwards for that pair. Pairs answered
+from the result cache make no generation and are counted as cache_hits
+instead, so a request served from memoized results is recognizable.
+"""
+
+import os
+import re
+import warnings
+
+from metrics import RequestStats
+from tokenization import count_tokens
+
+FULL = "full"
+SCORE_ONLY = "score_only"
+SHORTLIST = "shortlist"
+MODES = (FULL, SCORE_ONLY, SHORTLIST)
+
+DEFAULT_MODE = os.environ.get("SCORING_MODE", FULL)
+if DEFAULT_MODE not in MODES:
+    warnings.warn(f"Unknown SCORING_MODE {DEFAULT_MODE!r}, expected one of {', '.join(MODES)}; using {FULL!r}")
+    DEFAULT_MODE = FULL
+DEFAULT_REASONING_TOP_N = int(os.environ.get("REASONING_TOP_N", "5"))
+
+SCORE_CUE = "Score:"
+REASONING_CUE = "Reasoning:"
+# A number plus its newline is a few tokens; the cap only guards against rambling
+SCORE_ONLY_MAX_TOKENS = 8
+SCORE_ONLY_REASONING = "Reasoning not generated (score-only scoring)"
+
+# The number at the start of a completion, allowing markdown emphasis around it
+LEADING_SCORE = re.compile(r"^\s*[*_]*\s*(\d+(?:\.\d+)?)")
+# What follows a finished number: anything but more digits (after an optional full stop)
+SCORE_END = re.compile(r"\.?[^\d.]")
+
+# Totals of the current request since its last reset
+last_scoring_stats = RequestStats("scoring_stats", {
+    'mode': DEFAULT_MODE,
+    'pairs': 0,
+    'generations': 0,
+    'generated_tokens': 0,
+    'seconds': 0.0,
+    'avg_tokens_per_pair': 0.0,
+    'avg_seconds_per_pair': 0.0,
+    'cache_hits': 0,
+    'cache_misses': 0
+})
+
+
+def reset_scoring_stats(mode=DEFAULT_MODE):
+    """Zero the generation counters before a new request"""
+    last_scoring_stats.reset(mode=mode)
+
+
+def record_generation(text, seconds, new_pair=True):
+    """Add one generation to last_scoring_stats; reasoning for an already scored pair passes new_pair=False"""
+    stats = last_scoring_stats.current()
+    stats['pairs'] += 1 if new_pair else 0
+    stats['generations'] += 1
+    stats['generated_tokens'] += count_tokens(text)
+    stats['seconds'] = round(stats['seconds'] + seconds, 4)
+    if stats['pairs']:
+        stats['avg_tokens_per_pair'] = round(stats['generated_tokens'] / stats['pairs'], 1)
+        stats['avg_seconds_per_pair'] = round(stats['seconds'] / stats['pairs'], 3)
+
+
+def record_cache_lookup(hit):
+    """Count one pair looked up in the result cache"""
+    last_scoring_stats['cache_hits' if hit else 'cache_misses'] += 1
+
+
+def normalize_mode(mode):
+    """Return mode if it is a known scoring mode, else the default"""
+    return mode if mode in MODES else DEFAULT_MODE
+
+
+def generation_kwargs(with_reasoning, max_new_tokens):
+    """Model keyword arguments for a scoring generation"""
+    if with_reasoning:
+        return {'max_new_tokens': max_new_tokens}
+    return {'max_new_tokens': SCORE_ONLY_MAX_TOKENS, 'stop': ["\n"]}
+
+
+def parse_score(completion, complete=True):
+    """
+    Score at the start of a completion of a prompt ending in SCORE_CUE, or None.
+
+    A completion that is still streaming (complete=False) only gives its score
+    once something other than digits follows the number.
+    """
+    match = LEADING_SCORE.match(completion)
+    if not match or not (complete or SCORE_END.match(completion, match.end())):
+        return None
+    return max(0.0, min(100.0, float(match.group(1))))
+
+
+def scored_result(completion, chunks_used, with_reasoning=True, score=None):
+    """Result of a scoring generation; parse_failed instead of a guessed score when it has none"""
+    if score is None:
+        score = parse_score(completion)
+    if score is None:
+        return {
+            'score': 0.0,
+            'reasoning': f"Could not parse a score from the model output: {completion.strip()[:200]!r}",
+            'chunks_used': chunks_used,
+            'parse_failed': True
+        }
+    return {
+        'score': score,
+        'reasoning': SCORE_CUE + completion if with_reasoning else SCORE_ONLY_REASONING,
+        'chunks_used': chunks_used,
+        'reasoning_generated': with_reasoning
+    }
+
+
+def reasoning_prompt(prompt, score):
+    """Continue a scored prompt so the model writes only the reasoning"""
+    return f"{prompt} {score:g}\n{REASONING_CUE}"
+
+
+def select_for_reasoning(scores, top_n=DEFAULT_REASONING_TOP_N):
+    """Ids of the top_n highest scores"""
+    return set(sorted(scores, key=lambda key: scores[key], reverse=True)[:max(0, top_n)])
@@ -45,6 +45,8 @@ def start_server():
     print("📍 Server will be available at: http://localhost:8501")
     print("🔗 Test endpoint: http://localhost:8501/api/test")
     print("📊 Status endpoint: http://localhost:8501/api/status")
+    print("🩺 Readiness endpoint: http://localhost:8501/api/health/ready")
+    print("📈 Metrics endpoint: http://localhost:8501/api/metrics")
     print("\nPress Ctrl+C to stop the server\n")
     
     try:
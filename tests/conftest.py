@@ -0,0 +1,47 @@
+"""
+Shared test setup.
+
+The modules live at the repository root, so it is put on sys.path. The
+cl100k encoding is downloaded by tiktoken on first use; tests swap in a
+byte-level stand-in so they run offline and count tokens predictably.
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tokenization  # noqa: E402
+
+
+class ByteEncoder:
+    """Stand-in for a tiktoken encoding: one token per 3 bytes of UTF-8"""
+
+    def encode(self, text):
+        data = text.encode("utf-8")
+        return [int.from_bytes(data[i:i + 3].ljust(3, b"\0"), "big") for i in range(0, len(data), 3)]
+
+    def decode_tokens_bytes(self, tokens):
+        return [int(token).to_bytes(3, "big").rstrip(b"\0") for token in tokens]
+
+    def decode(self, tokens):
+        return b"".join(self.decode_tokens_bytes(tokens)).decode("utf-8", errors="replace")
+
+
+ENCODER = ByteEncoder()
+# Replaced before any other module imports get_encoder by name
+tokenization.get_encoder = lambda name=tokenization.ENCODING_NAME: ENCODER
+
+
+def unit_vectors(rng, *shape):
+    """Random float32 vectors normalized along the last axis"""
+    vectors = rng.standard_normal(shape).astype("float32")
+    return vectors / np.linalg.norm(vectors, axis=-1, keepdims=True)
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
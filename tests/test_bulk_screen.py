@@ -0,0 +1,117 @@
+import csv
+import json
+import os
+
+import pytest
+
+import bulk_screen
+import engine
+from fast_scoring import FAST
+
+
+@pytest.fixture
+def run(tmp_path, monkeypatch):
+    """bulk_screen in fast mode over five dummy resumes, with indexing and scoring faked"""
+    resumes, jds = tmp_path / "resumes", tmp_path / "jds"
+    resumes.mkdir()
+    jds.mkdir()
+    for i in range(5):
+        (resumes / f"r{i}.pdf").write_bytes(b"%PDF resume " + bytes([i]))
+    (jds / "backend.txt").write_text("python developer")
+    (jds / "notes.md").write_text("not a job description")
+    output = str(tmp_path / "results.csv")
+    scored = []
+
+    def index_batch(batch):
+        start, _, files = batch
+        return start, [f.name for f in files], [f"text of {f.name}" for f in files]
+
+    def score_batch(batch, jd_names, jd_texts, scoring_mode, prescreen_threshold):
+        start, names, _ = batch
+        if start in fail_at:
+            raise RuntimeError("scoring crashed")
+        scored.append(start)
+        return [{'resume_index': start + i, 'resume_name': name, 'jd_index': 0, 'jd_name': jd_names[0],
+                 'score': 50.0} for i, name in enumerate(names)]
+
+    fail_at = set()
+    monkeypatch.setattr(engine, "load_embed_model", lambda: None)
+    monkeypatch.setattr(bulk_screen, "index_batch", index_batch)
+    monkeypatch.setattr(bulk_screen, "score_batch", score_batch)
+
+    def screen(fail=(), **kwargs):
+        fail_at.clear()
+        fail_at.update(fail)
+        return bulk_screen.bulk_screen(str(resumes), str(jds), output, FAST, batch_size=2, queue_depth=1,
+                                       **kwargs)
+
+    screen.output = output
+    screen.resumes = resumes
+    screen.scored = scored
+    return screen
+
+
+def read_rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def test_writes_one_row_per_pair_and_a_checkpoint(run):
+    summary = run()
+
+    assert summary['pairs_written'] == 5 and summary['job_descriptions'] == 1
+    assert [row['resume_name'] for row in read_rows(run.output)] == [f"r{i}.pdf" for i in range(5)]
+    assert {row['jd_name'] for row in read_rows(run.output)} == {"backend.txt"}
+    with open(bulk_screen.checkpoint_path(run.output)) as f:
+        checkpoint = json.load(f)
+    assert checkpoint['resumes_done'] == checkpoint['resumes_total'] == 5
+    assert checkpoint['output_bytes'] == os.path.getsize(run.output)
+
+
+def test_rerun_resumes_after_the_last_finished_batch(run):
+    with pytest.raises(RuntimeError):
+        run(fail={2})
+    assert len(read_rows(run.output)) == 2
+
+    summary = run()
+
+    assert run.scored == [0, 2, 4]
+    assert summary['pairs_written'] == 3
+    assert [int(row['resume_index']) for row in read_rows(run.output)] == [0, 1, 2, 3, 4]
+
+
+def test_rows_of_an_unfinished_batch_are_dropped_on_resume(run):
+    with pytest.raises(RuntimeError):
+        run(fail={4})
+    with open(run.output, "a", encoding="utf-8") as f:
+        f.write("4,r4.pdf,0,backend.txt,50.0,partial\n")
+
+    run()
+
+    assert [int(row['resume_index']) for row in read_rows(run.output)] == [0, 1, 2, 3, 4]
+
+
+def test_changed_inputs_do_not_reuse_the_checkpoint(run):
+    with pytest.raises(RuntimeError):
+        run(fail={2})
+    (run.resumes / "r9.pdf").write_bytes(b"%PDF new")
+
+    with pytest.raises(ValueError, match="--restart"):
+        run()
+
+    summary = run(restart=True)
+    assert summary['pairs_written'] == 6
+    assert len(read_rows(run.output)) == 6
+
+
+def test_existing_output_without_a_checkpoint_is_not_replaced(run):
+    with open(run.output, "w") as f:
+        f.write("someone else's results\n")
+
+    with pytest.raises(ValueError, match="--overwrite"):
+        run()
+    with open(run.output) as f:
+        assert f.read() == "someone else's results\n"
+
+    run(overwrite=True)
+    assert len(read_rows(run.output)) == 5
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+import context_packing as cp
+from conftest import unit_vectors
+from tokenization import TokenChunk, chunk_text, count_tokens
+
+TEXT = "\n".join(f"line {i} " + " ".join(f"skill{i}x{j}" for j in range(12)) for i in range(30))
+
+
+@pytest.fixture
+def document():
+    return chunk_text(TEXT, sections=False)
+
+
+def test_plan_context_truncates_a_long_jd_to_its_share():
+    jd, truncated, resume_tokens = cp.plan_context("requirement " * 3000, 50, 150, 2048)
+
+    assert truncated
+    assert count_tokens(jd) <= int((2048 - 200) * cp.JD_SHARE)
+    assert resume_tokens == 2048 - 200 - int((2048 - 200) * cp.JD_SHARE)
+
+
+def test_plan_context_gives_a_short_jd_what_it_needs():
+    jd, truncated, resume_tokens = cp.plan_context("python developer", 50, 150, 2048)
+
+    assert (jd, truncated) == ("python developer", False)
+    assert resume_tokens == 2048 - 200 - count_tokens("python developer")
+
+
+def test_plan_context_rejects_a_window_without_room():
+    with pytest.raises(ValueError):
+        cp.plan_context("jd", 400, 150, 500)
+
+
+def test_neighbouring_windows_overlap_by_whole_tokens(document):
+    first, second = document[0], document[1]
+    chars = cp.overlap_chars(first, second)
+    tokens = cp.overlap_tokens(first, second, chars)
+
+    assert chars > 0
+    np.testing.assert_array_equal(first.tokens[-tokens:], second.tokens[:tokens])
+    merged = cp.merge(first, second, chars, tokens)
+    assert isinstance(merged, TokenChunk)
+    assert str(merged) == TEXT[document.spans[0][0]:document.spans[1][1]]
+    assert len(merged.tokens) == len(first.tokens) + len(second.tokens) - tokens
+
+
+def test_unrelated_chunks_do_not_overlap():
+    assert cp.overlap_chars("alpha beta gamma delta", "epsilon zeta eta theta") == 0
+
+
+def test_select_context_stays_within_budget_and_merges_neighbours(document, rng):
+    vectors = unit_vectors(rng, len(document), 16)
+    query = vectors[4:5]
+    vectors[[3, 5, 6, 10]] = query
+    cp.reset_packing_stats()
+
+    spans = cp.select_context(document, vectors, [3, 4, 5, 6, 10], query, 600, mmr_lambda=1.0)
+
+    stats = dict(cp.last_packing_stats)
+    assert sum(count_tokens(span) for span in spans) <= 600
+    assert stats['merged'] >= 1 and stats['overlap_tokens_saved'] > 0
+    assert spans[0] == TEXT[document.spans[3][0]:document.spans[6][1]]
+
+
+def test_select_context_prefers_the_most_relevant_chunk_for_a_small_budget(document, rng):
+    vectors = unit_vectors(rng, len(document), 16)
+
+    spans = cp.select_context(document, vectors, range(len(document)), vectors[7:8], count_tokens(document[7]))
+
+    assert spans == [document[7]]
+
+
+def test_select_context_with_no_budget_is_empty(document, rng):
+    assert cp.select_context(document, unit_vectors(rng, len(document), 16), [0, 1], np.ones((1, 16)), 0) == []
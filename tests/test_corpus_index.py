@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+from conftest import unit_vectors
+from corpus_index import CorpusIndex, build_corpus_index, ivf_nlist
+
+DIM = 16
+
+
+def make_documents(rng, start, count, chunks=5):
+    return [(doc_id, [f"doc {doc_id} chunk {i}" for i in range(chunks)], unit_vectors(rng, chunks, DIM))
+            for doc_id in range(start, start + count)]
+
+
+def exact_top(documents, query, k):
+    """Expected {doc_id: chunk positions} by brute force"""
+    return {doc_id: list(np.argsort(np.sum((embeddings - query) ** 2, axis=1))[:k])
+            for doc_id, _, embeddings in documents}
+
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw"])
+def test_incremental_add_matches_a_full_build(rng, index_type):
+    first, second = make_documents(rng, 0, 6), make_documents(rng, 6, 4)
+    query = unit_vectors(rng, 1, DIM)
+
+    grown = CorpusIndex(DIM, index_type).build(first)
+    index_before = grown.index
+    grown.add(second)
+    rebuilt = build_corpus_index(first + second, DIM, index_type)
+
+    assert grown.index is index_before
+    assert grown.ntotal == rebuilt.ntotal == 50
+    assert grown.top_chunks_per_document(query) == rebuilt.top_chunks_per_document(query)
+
+
+def test_flat_search_finds_each_documents_closest_chunks(rng):
+    documents = make_documents(rng, 0, 8)
+    query = unit_vectors(rng, 1, DIM)
+
+    hits = build_corpus_index(documents, DIM, "flat").search_per_document(query, k=2)
+
+    assert {doc_id: [pos for pos, _ in found] for doc_id, found in hits.items()} == exact_top(documents, query, 2)
+
+
+def test_add_skips_known_and_empty_documents(rng):
+    documents = make_documents(rng, 0, 3)
+    index = build_corpus_index(documents, DIM, "flat")
+
+    index.add(documents[:1] + [(99, [], np.empty((0, DIM), dtype="float32"))])
+
+    assert index.ntotal == 15
+    assert set(index.documents) == {0, 1, 2}
+
+
+def test_ivf_is_retrained_only_when_the_corpus_outgrows_it(rng):
+    index = build_corpus_index(make_documents(rng, 0, 40, chunks=10), DIM, "ivf")
+    nlist = index.index.nlist
+    assert nlist == ivf_nlist(400)
+
+    trained = index.index
+    index.add(make_documents(rng, 40, 5, chunks=10))
+    assert index.index is trained
+
+    index.add(make_documents(rng, 45, 200, chunks=10))
+    assert index.index is not trained
+    assert index.index.nlist >= 2 * nlist
+    assert index.ntotal == 2450
+
+
+def test_small_ivf_corpus_falls_back_to_flat_until_trainable(rng):
+    index = build_corpus_index(make_documents(rng, 0, 2), DIM, "ivf")
+    assert not hasattr(index.index, "nlist")
+
+    index.add(make_documents(rng, 2, 10))
+    assert index.index.nlist == ivf_nlist(60)
+
+
+def test_rrf_fusion_ranks_a_chunk_matching_every_query_first(rng):
+    queries = unit_vectors(rng, 2, DIM)
+    embeddings = unit_vectors(rng, 6, DIM)
+    # Chunk 4 sits between both queries; chunks 0 and 1 each match one of them exactly
+    embeddings[0], embeddings[1] = queries[0], queries[1]
+    middle = queries[0] + queries[1]
+    embeddings[4] = middle / np.linalg.norm(middle)
+    index = build_corpus_index([("a", [str(i) for i in range(6)], embeddings)], DIM, "flat")
+
+    fused, coverage = index.search_multi_per_document(queries, k=2, rrf_k=60)
+
+    positions = [pos for pos, _ in fused["a"]]
+    assert positions[0] == 4
+    assert set(positions) == {4, 0} or set(positions) == {4, 1}
+    assert fused["a"][0][1] == pytest.approx(2 / 62)
+    np.testing.assert_allclose(coverage["a"], [0.0, 0.0], atol=1e-5)
+
+
+def test_shortlist_ranks_documents_by_their_closest_chunk(rng):
+    documents = make_documents(rng, 0, 10)
+    query = unit_vectors(rng, 1, DIM)
+    closest = {doc_id: float(np.min(np.sum((embeddings - query) ** 2, axis=1)))
+               for doc_id, _, embeddings in documents}
+
+    shortlist = build_corpus_index(documents, DIM, "flat").shortlist(query, top_n=3)
+
+    assert [doc_id for doc_id, _ in shortlist] == sorted(closest, key=closest.get)[:3]
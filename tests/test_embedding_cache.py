@@ -0,0 +1,68 @@
+import numpy as np
+
+from embedding_cache import EmbeddingCache, content_hash, document_key, estimate_size
+
+
+def test_evicts_least_recently_used_beyond_the_memory_cap():
+    cache = EmbeddingCache(max_bytes=300)
+    for key in "abc":
+        cache.put(key, b"x" * 100)
+    cache.get("a")
+    cache.put("d", b"x" * 100)
+
+    assert cache.get("b") is None
+    assert [cache.get(key) is not None for key in "acd"] == [True, True, True]
+    assert cache.evictions == 1
+    assert cache.current_bytes == 300
+
+
+def test_value_larger_than_the_cache_is_not_stored():
+    cache = EmbeddingCache(max_bytes=100)
+    cache.put("small", b"x" * 50)
+
+    assert cache.put("huge", b"x" * 500) == b"x" * 500
+    assert cache.get("huge") is None
+    assert cache.get("small") is not None
+
+
+def test_replacing_a_key_updates_its_size():
+    cache = EmbeddingCache(max_bytes=1000)
+    cache.put("a", np.zeros(100, dtype="float32"))
+    cache.put("a", np.zeros(10, dtype="float32"))
+
+    assert cache.current_bytes == 40
+    assert cache.stats()['entries'] == 1
+
+
+def test_get_or_compute_skips_uncacheable_values():
+    cache = EmbeddingCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return "ERROR_EXTRACTION: broken"
+
+    for _ in range(2):
+        cache.get_or_compute("k", compute, cacheable=lambda text: not text.startswith("ERROR_"))
+
+    assert len(calls) == 2
+    assert cache.stats()['misses'] == 2
+
+
+def test_document_key_depends_on_model_and_chunker():
+    key = document_key("resume text", "model-a", "cl100k_base:80:40")
+
+    assert key == ("doc", "model-a", "cl100k_base:80:40", content_hash("resume text"))
+    assert key != document_key("resume text", "model-b", "cl100k_base:80:40")
+    assert key != document_key("resume text", "model-a", "cl100k_base:120:60")
+
+
+def test_content_hash_is_the_same_for_text_and_its_bytes():
+    assert content_hash("résumé") == content_hash("résumé".encode("utf-8"))
+
+
+def test_estimate_size_counts_arrays_and_containers():
+    vectors = np.zeros((4, 8), dtype="float32")
+
+    assert estimate_size(vectors) == 128
+    assert estimate_size((["ab", "cd"], vectors)) == 4 + 128
@@ -0,0 +1,96 @@
+import json
+import sqlite3
+import time
+
+import numpy as np
+import pytest
+
+from embedding_store import EmbeddingStore
+from tokenization import ChunkedDocument, TokenChunk, chunk_text
+
+MODEL = "test-model"
+CHUNKER = "test-chunker"
+TEXT = "Experience\n" + " ".join(f"built service {i} in python" for i in range(60)) + "\nEducation\nBSc"
+
+
+@pytest.fixture
+def store(tmp_path):
+    return EmbeddingStore(str(tmp_path / "store"))
+
+
+def test_round_trip_memory_maps_vectors(store, rng):
+    chunks = chunk_text(TEXT)
+    embeddings = rng.standard_normal((len(chunks), 8)).astype("float32")
+    store.save("h1", MODEL, CHUNKER, TEXT, chunks, embeddings)
+
+    record = store.load("h1", MODEL, CHUNKER)
+
+    assert record['text'] == TEXT
+    assert isinstance(record['embeddings'], np.memmap)
+    np.testing.assert_array_equal(record['embeddings'], embeddings)
+    assert store.load("h1", MODEL, "other-chunker") is None
+    assert store.stats()['hits'] == 1 and store.stats()['misses'] == 1
+
+
+def test_chunks_reload_as_token_chunks(store, rng):
+    chunks = chunk_text(TEXT)
+    store.save("h1", MODEL, CHUNKER, TEXT, chunks, rng.standard_normal((len(chunks), 8)))
+
+    reloaded = store.load("h1", MODEL, CHUNKER)['chunks']
+
+    assert isinstance(reloaded, ChunkedDocument)
+    assert [str(chunk) for chunk in reloaded] == [str(chunk) for chunk in chunks]
+    assert all(isinstance(chunk, TokenChunk) for chunk in reloaded)
+    for original, chunk in zip(chunks, reloaded):
+        np.testing.assert_array_equal(chunk.tokens, original.tokens)
+
+
+def test_plain_string_chunks_reload_as_strings(store, rng):
+    store.save("h1", MODEL, CHUNKER, "a b", ["a", "b"], rng.standard_normal((2, 8)))
+
+    assert store.load("h1", MODEL, CHUNKER)['chunks'] == ["a", "b"]
+
+
+def test_missing_vector_file_is_a_miss(store, rng, tmp_path):
+    store.save("h1", MODEL, CHUNKER, "a", ["a"], rng.standard_normal((1, 8)))
+    for path in (tmp_path / "store" / "vectors").iterdir():
+        path.unlink()
+
+    assert store.load("h1", MODEL, CHUNKER) is None
+
+
+def test_iter_documents_limits_to_a_time_window(store, rng):
+    def save(pdf_hash):
+        store.save(pdf_hash, MODEL, CHUNKER, pdf_hash, [pdf_hash], rng.standard_normal((1, 8)))
+        time.sleep(0.01)
+
+    save("h0")
+    save("h1")
+    indexed_until = store.newest(MODEL, CHUNKER)
+    save("h2")
+
+    assert [doc[0] for doc in store.iter_documents(MODEL, CHUNKER)] == ["h0", "h1", "h2"]
+    assert [doc[0] for doc in store.iter_documents(MODEL, CHUNKER, until=indexed_until)] == ["h0", "h1"]
+    assert [doc[0] for doc in store.iter_documents(MODEL, CHUNKER, since=indexed_until)] == ["h2"]
+    assert store.count(MODEL, CHUNKER) == 3
+
+
+def test_store_without_bounds_column_is_migrated(tmp_path, rng):
+    root = tmp_path / "old"
+    root.mkdir()
+    conn = sqlite3.connect(str(root / "store.sqlite3"))
+    conn.execute(
+        "CREATE TABLE documents (pdf_hash TEXT NOT NULL, model_name TEXT NOT NULL, chunker TEXT NOT NULL, "
+        "text TEXT NOT NULL, chunks TEXT NOT NULL, n_chunks INTEGER NOT NULL, dim INTEGER NOT NULL, "
+        "vectors_file TEXT NOT NULL, created_at REAL NOT NULL, PRIMARY KEY (pdf_hash, model_name, chunker))"
+    )
+    vectors_file = str(root / "old.npy")
+    np.save(vectors_file, rng.standard_normal((1, 8)).astype("float32"))
+    conn.execute("INSERT INTO documents VALUES ('h', ?, ?, 'a', ?, 1, 8, ?, 0)",
+                 (MODEL, CHUNKER, json.dumps(["a"]), vectors_file))
+    conn.commit()
+    conn.close()
+
+    store = EmbeddingStore(str(root))
+
+    assert store.load("h", MODEL, CHUNKER)['chunks'] == ["a"]
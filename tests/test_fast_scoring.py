@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from conftest import unit_vectors
+from fast_scoring import DEFAULT_WEIGHTS, coverage_scores, covered_count, normalize_weights
+
+X, Y = [1.0, 0.0], [0.0, 1.0]
+
+
+def test_scores_from_mean_coverage_and_best_match():
+    documents = [np.array([X]), np.array([X, Y]), np.array([[-1.0, 0.0]])]
+
+    scores, similarities = coverage_scores(documents, [np.array([X, Y])])
+
+    # One of two requirements matched exactly: mean 0.5, covered 0.5, best 1
+    expected = 100 * (0.5 * DEFAULT_WEIGHTS['mean'] + 0.5 * DEFAULT_WEIGHTS['covered'] + DEFAULT_WEIGHTS['best'])
+    expected /= sum(DEFAULT_WEIGHTS.values())
+    assert scores[:, 0].tolist() == [round(expected, 1), 100.0, 0.0]
+    np.testing.assert_allclose(similarities[0], [[1, 0], [1, 1], [0, 0]])
+    assert covered_count(similarities[0][0]) == 1
+
+
+def test_jd_without_requirements_scores_zero(rng):
+    documents = [unit_vectors(rng, n, 8) for n in (3, 1, 5)]
+    requirements = [unit_vectors(rng, 4, 8), unit_vectors(rng, 2, 8)]
+
+    scores, similarities = coverage_scores(documents, requirements[:1] + [np.empty((0, 8))] + requirements[1:])
+    alone, _ = coverage_scores(documents, requirements)
+
+    assert scores.shape == (3, 3)
+    assert scores[:, 1].tolist() == [0.0, 0.0, 0.0]
+    np.testing.assert_array_equal(scores[:, [0, 2]], alone)
+    assert similarities[1].shape == (3, 0)
+
+
+def test_scores_round_to_exact_tenths(rng):
+    scores, _ = coverage_scores([unit_vectors(rng, 4, 8) for _ in range(20)], [unit_vectors(rng, 7, 8)])
+
+    assert scores.dtype == np.float64
+    assert all(float(score) == round(float(score), 1) for score in scores.ravel())
+    assert all(len(repr(float(score)).split(".")[1]) == 1 for score in scores.ravel())
+
+
+def test_no_documents_or_jds():
+    scores, _ = coverage_scores([], [np.array([X])])
+    assert scores.shape == (0, 1)
+    scores, _ = coverage_scores([np.array([X])], [])
+    assert scores.shape == (1, 0)
+
+
+def test_weights_override_defaults_and_sum_to_one():
+    weights = normalize_weights({'best': 1.0, 'covered': None})
+
+    assert sum(weights.values()) == pytest.approx(1.0)
+    assert weights['best'] > weights['covered']
+
+
+@pytest.mark.parametrize("weights", [{'recency': 1.0}, {'mean': -1.0}, {'mean': 0, 'covered': 0, 'best': 0}])
+def test_invalid_weights_are_rejected(weights):
+    with pytest.raises(ValueError):
+        normalize_weights(weights)
@@ -0,0 +1,96 @@
+import threading
+
+import pytest
+
+from job_queue import COMPLETED, FAILED, JobQueue
+from metrics import RequestStats
+
+
+def wait_finished(job, timeout=5.0):
+    offset = 0
+    while True:
+        results, finished = job.wait_for_results(offset, timeout)
+        if finished:
+            return
+        if not results:
+            pytest.fail("job made no progress")
+        offset += len(results)
+
+
+def count_runner(payload, start):
+    for i in range(start, payload['n']):
+        yield {'i': i}
+
+
+def test_results_are_collected_in_order():
+    jobs = JobQueue(count_runner, workers=2)
+    job = jobs.submit({'n': 5}, 5)
+
+    wait_finished(job)
+
+    assert job.status == COMPLETED
+    assert job.results == [{'i': i} for i in range(5)]
+    assert job.to_dict()['progress'] == 1.0
+
+
+def test_runner_errors_fail_the_job():
+    def runner(payload, start):
+        yield {'i': 0}
+        raise RuntimeError("model crashed")
+
+    job = JobQueue(runner).submit({}, 3)
+    wait_finished(job)
+
+    assert job.status == FAILED
+    assert job.error == "model crashed"
+    assert job.done == 1
+
+
+def test_unfinished_job_resumes_after_its_stored_results(tmp_path):
+    db_path = str(tmp_path / "jobs.sqlite3")
+    blocked = threading.Event()
+
+    def stalling_runner(payload, start):
+        yield {'i': start}
+        yield {'i': start + 1}
+        blocked.set()
+        threading.Event().wait()  # the "process" dies here
+
+    first = JobQueue(stalling_runner, db_path=db_path).submit({'n': 5}, 5)
+    assert blocked.wait(5.0)
+
+    starts = []
+
+    def runner(payload, start):
+        starts.append(start)
+        return count_runner(payload, start)
+
+    restarted = JobQueue(runner, db_path=db_path)
+    job = restarted.get(first.id)
+    wait_finished(job)
+
+    assert starts == [2]
+    assert job.status == COMPLETED
+    assert job.results == [{'i': i} for i in range(5)]
+
+    restarted._queue.join()  # the final status is saved after waiters are notified
+    again = JobQueue(runner, db_path=db_path)
+    assert again.get(first.id).status == COMPLETED
+    assert again.queue_depth() == 0
+    assert starts == [2]
+
+
+def test_each_job_starts_with_fresh_request_stats():
+    stats = RequestStats("test_job_stats", {'pairs': 0})
+    seen = []
+
+    def runner(payload, start):
+        seen.append(stats.current()['pairs'])
+        stats.current()['pairs'] += payload['n']
+        yield {}
+
+    jobs = JobQueue(runner, workers=1)
+    for n in (3, 4):
+        wait_finished(jobs.submit({'n': n}, 1))
+
+    assert seen == [0, 0]
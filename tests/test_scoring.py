@@ -0,0 +1,57 @@
+import pytest
+
+from scoring import SCORE_ONLY_REASONING, parse_score, scored_result
+
+
+@pytest.mark.parametrize("completion, score", [
+    (" 85\nReasoning: good fit", 85.0),
+    (" 85/100", 85.0),
+    (" **85**", 85.0),
+    ("72.5 out of 100", 72.5),
+    (" 7", 7.0),
+    (" 150", 100.0),
+])
+def test_parse_score_reads_the_leading_number(completion, score):
+    assert parse_score(completion) == score
+
+
+@pytest.mark.parametrize("completion", ["", " I cannot rate this.", "Reasoning: 85", " -"])
+def test_parse_score_without_a_leading_number(completion):
+    assert parse_score(completion) is None
+
+
+def test_streaming_parse_waits_for_the_end_of_the_number():
+    prefixes = [" ", " 7", " 72", " 72.", " 72/", " 72/10"]
+
+    assert [parse_score(text, complete=False) for text in prefixes] == [None, None, None, None, 72.0, 72.0]
+
+
+def test_streaming_parse_does_not_stop_inside_a_decimal():
+    assert parse_score(" 72.5", complete=False) is None
+    assert parse_score(" 72.5\n", complete=False) == 72.5
+
+
+def test_stream_and_final_parse_agree():
+    completion = " 72/100, solid"
+    streamed = next(score for i in range(len(completion) + 1)
+                    if (score := parse_score(completion[:i], complete=False)) is not None)
+
+    assert streamed == parse_score(completion) == 72.0
+
+
+def test_scored_result_with_and_without_reasoning():
+    full = scored_result(" 85\nReasoning: strong", 3)
+    score_only = scored_result(" 85", 3, with_reasoning=False)
+
+    assert full == {'score': 85.0, 'reasoning': "Score: 85\nReasoning: strong", 'chunks_used': 3,
+                    'reasoning_generated': True}
+    assert score_only['reasoning'] == SCORE_ONLY_REASONING
+    assert score_only['reasoning_generated'] is False
+
+
+def test_scored_result_flags_parse_failures():
+    result = scored_result("no idea", 2)
+
+    assert result['parse_failed'] is True
+    assert result['score'] == 0.0
+    assert "no idea" in result['reasoning']
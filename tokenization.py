@@ -0,0 +1,265 @@
+"""
+Shared tiktoken encoder and array-backed chunking.
+
+A document is tokenized once into a NumPy array together with the character
+offset of every token. Chunks are (start, end) token ranges over that array
+and their text is a slice of the document, made only when a chunk is read
+(for embedding, retrieval or display), so no token is decoded per window.
+Optionally, windows never straddle a resume section heading (Experience,
+Education, Skills, ...).
+
+Chunks read from a ChunkedDocument are TokenChunk strings carrying their
+token ids, so prompt assembly budgets with precomputed counts instead of
+re-encoding. The embedding store persists the token ids and chunk ranges
+and rebuilds the ChunkedDocument on load; only chunks stored before that
+come back as plain strings, which are encoded once with a memoized count.
+
+Run `python tokenization.py` to compare chunking time and memory against
+decoding every window.
+"""
+
+import functools
+import os
+import re
+import sys
+import time
+
+import numpy as np
+import tiktoken
+
+from metrics import RequestStats
+
+ENCODING_NAME = "cl100k_base"
+SEPARATOR = "\n\n"
+CHUNK_MAX_TOKENS = 80
+CHUNK_STRIDE = 40
+SECTION_AWARE = os.environ.get("CHUNK_SECTIONS", "1") == "1"
+
+# Identifies the chunking settings so stored chunks are invalidated if they change
+CHUNKER_ID = f"{ENCODING_NAME}:{CHUNK_MAX_TOKENS}:{CHUNK_STRIDE}" + (":sections" if SECTION_AWARE else "")
+
+SECTION_HEADING = re.compile(
+    r"^[ \t]*(?:professional |work |relevant |technical |key )?"
+    r"(?:summary|profile|objective|experience|employment(?: history)?|work history|"
+    r"education|skills|projects|certifications?|awards|achievements|publications|"
+    r"languages|interests|volunteering)[ \t]*:?[ \t]*$",
+    re.IGNORECASE | re.MULTILINE
+)
+
+# Totals of the current request since its last reset
+last_chunking_stats = RequestStats("chunking_stats", {
+    'documents': 0,
+    'chunks': 0,
+    'tokens': 0,
+    'seconds': 0.0,
+    'bytes': 0,
+    'string_bytes': 0,
+    'bytes_per_document': 0,
+    'string_bytes_per_document': 0
+})
+
+
+def reset_chunking_stats():
+    """Zero the chunking counters before a new request"""
+    last_chunking_stats.reset()
+
+
+@functools.lru_cache(maxsize=None)
+def get_encoder(name=ENCODING_NAME):
+    """Return the tiktoken encoding, loading it once per process"""
+    return tiktoken.get_encoding(name)
+
+
+class TokenChunk(str):
+    """Chunk text that remembers the token ids it was decoded from"""
+
+    def __new__(cls, text, tokens):
+        chunk = super().__new__(cls, text)
+        chunk.tokens = tokens
+        return chunk
+
+    def __getnewargs__(self):
+        return str(self), self.tokens
+
+
+class ChunkedDocument:
+    """A document's tokens stored once, with chunks as (start, end) token ranges"""
+
+    def __init__(self, text, tokens, bounds, spans):
+        self.text = text
+        self.tokens = tokens
+        # Token range and character range of each chunk
+        self.bounds = bounds
+        self.spans = spans
+
+    def __len__(self):
+        return len(self.bounds)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        start, end = self.bounds[index]
+        char_start, char_end = self.spans[index]
+        return TokenChunk(self.text[char_start:char_end], self.tokens[start:end])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    @property
+    def nbytes(self):
+        """Resident size of the text and arrays backing every chunk"""
+        return sys.getsizeof(self.text) + self.tokens.nbytes + self.bounds.nbytes + self.spans.nbytes
+
+    def string_nbytes(self):
+        """Approximate size of the same chunks held as separate strings"""
+        return int((self.spans[:, 1] - self.spans[:, 0]).sum()) + sys.getsizeof("") * len(self)
+
+
+def token_offsets(enc, tokens):
+    """Character offset of each token in the decoded text, plus the total length"""
+    token_bytes = enc.decode_tokens_bytes(tokens)
+    lengths = np.fromiter(map(len, token_bytes), dtype=np.int64, count=len(token_bytes))
+    data = np.frombuffer(b"".join(token_bytes), dtype=np.uint8)
+    # A byte starts a character unless it is a UTF-8 continuation byte
+    char_starts = (data & 0xC0) != 0x80
+    char_index = np.concatenate(([0], np.cumsum(char_starts)))
+    byte_starts = np.concatenate(([0], np.cumsum(lengths)))
+    # A token starting mid-character is placed at the start of that character
+    mid_character = ~np.append(char_starts, True)[byte_starts]
+    return char_index[byte_starts] - mid_character
+
+
+def section_starts(text, offsets):
+    """Token indexes where a section heading line begins"""
+    positions = [match.start() for match in SECTION_HEADING.finditer(text)]
+    if not positions:
+        return np.empty(0, dtype=np.int64)
+    return np.unique(np.searchsorted(offsets[:-1], positions, side="left"))
+
+
+def window_bounds(section_bounds, max_tokens, stride):
+    """(start, end) windows of max_tokens every stride tokens, kept inside each section"""
+    windows = []
+    for start, end in section_bounds:
+        if end <= start:
+            continue
+        count = max(0, -(-(end - start - max_tokens) // stride)) + 1
+        starts = start + stride * np.arange(count, dtype=np.int64)
+        windows.append(np.stack([starts, np.minimum(starts + max_tokens, end)], axis=1))
+    if not windows:
+        return np.empty((0, 2), dtype=np.int32)
+    return np.concatenate(windows).astype(np.int32)
+
+
+def chunk_text(text, max_tokens=CHUNK_MAX_TOKENS, stride=CHUNK_STRIDE, sections=SECTION_AWARE):
+    """Split text into overlapping token windows backed by one token array"""
+    start_time = time.perf_counter()
+    enc = get_encoder()
+    token_list = enc.encode(text)
+    tokens = np.asarray(token_list, dtype=np.uint32)
+    offsets = token_offsets(enc, token_list)
+    if offsets[-1] != len(text):
+        # Only text that does not round-trip (e.g. lone surrogates) is decoded again
+        text = enc.decode(token_list)
+
+    boundaries = [0, len(tokens)]
+    if sections:
+        # Sections shorter than one stride are merged into the next one
+        for index in section_starts(text, offsets):
+            if index - boundaries[-2] >= stride:
+                boundaries.insert(-1, int(index))
+    section_bounds = list(zip(boundaries[:-1], boundaries[1:]))
+    bounds = window_bounds(section_bounds, max_tokens, stride)
+    # Per-token offsets are only needed here; keep the character range of each chunk
+    document = ChunkedDocument(text, tokens, bounds, offsets[bounds].astype(np.int32))
+
+    stats = last_chunking_stats.current()
+    stats['documents'] += 1
+    stats['chunks'] += len(document)
+    stats['tokens'] += len(tokens)
+    stats['seconds'] = round(stats['seconds'] + time.perf_counter() - start_time, 4)
+    stats['bytes'] += document.nbytes
+    stats['string_bytes'] += document.string_nbytes()
+    stats['bytes_per_document'] = stats['bytes'] // stats['documents']
+    stats['string_bytes_per_document'] = stats['string_bytes'] // stats['documents']
+    return document
+
+
+@functools.lru_cache(maxsize=4096)
+def _count_text_tokens(text):
+    return len(get_encoder().encode(text))
+
+
+def count_tokens(text):
+    """Token count of text, using the precomputed ids of a TokenChunk"""
+    tokens = getattr(text, "tokens", None)
+    if tokens is not None:
+        return len(tokens)
+    return _count_text_tokens(str(text))
+
+
+def pack_chunks(chunks, budget, separator=SEPARATOR):
+    """Join chunks in order while they fit in budget tokens; return (context, tokens_used)"""
+    separator_tokens = count_tokens(separator)
+    parts = []
+    used = 0
+    for chunk in chunks:
+        chunk_tokens = count_tokens(chunk) + separator_tokens
+        if used + chunk_tokens > budget:
+            break
+        parts.append(chunk + separator)
+        used += chunk_tokens
+    return "".join(parts), used
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import random
+
+    parser = argparse.ArgumentParser(description="Chunking time and memory benchmark")
+    parser.add_argument("--documents", type=int, default=200)
+    args = parser.parse_args()
+
+    words = ("python machine learning data engineer experience skills project "
+             "team lead university degree developed managed designed cloud").split()
+    headings = ["Summary", "Experience", "Education", "Skills", "Projects"]
+    rng = random.Random(0)
+    texts = [
+        "\n".join(f"{heading}\n" + " ".join(rng.choices(words, k=rng.randint(40, 250)))
+                  for heading in headings)
+        for _ in range(args.documents)
+    ]
+
+    def decode_per_window(text, max_tokens=CHUNK_MAX_TOKENS, stride=CHUNK_STRIDE):
+        enc = get_encoder()
+        tokens = enc.encode(text)
+        chunks = []
+        for i in range(0, len(tokens), stride):
+            chunks.append(enc.decode(tokens[i:i + max_tokens]))
+            if i + max_tokens >= len(tokens):
+                break
+        return chunks
+
+    get_encoder()
+    start = time.perf_counter()
+    eager = [decode_per_window(text) for text in texts]
+    eager_seconds = time.perf_counter() - start
+
+    results = {'documents': args.documents}
+    results['decode_per_window'] = {
+        'seconds': round(eager_seconds, 4),
+        'chunks': sum(len(chunks) for chunks in eager),
+        'bytes_per_document': sum(sys.getsizeof(chunk) for chunks in eager for chunk in chunks) // args.documents
+    }
+    for label, sections in (("token_array", False), ("token_array_sections", True)):
+        reset_chunking_stats()
+        for text in texts:
+            chunk_text(text, sections=sections)
+        results[label] = {
+            'seconds': last_chunking_stats['seconds'],
+            'chunks': last_chunking_stats['chunks'],
+            'bytes_per_document': last_chunking_stats['bytes_per_document']
+        }
+    print(json.dumps(results, indent=2))
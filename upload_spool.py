@@ -0,0 +1,146 @@
+"""
+Disk spooling for uploaded PDFs.
+
+Uploads are copied to a temp directory in fixed-size blocks while their
+SHA-256 is computed, so a request never holds a whole upload (let alone a
+200-file batch) in memory. PyMuPDF then opens each spooled file from disk
+and only the extracted text and vectors stay resident.
+
+The API has Werkzeug write each multipart file straight into an UploadFile,
+which hashes it on the way in. Spooling such an upload hard-links the file
+instead of copying it a second time (a copy is only made across file
+systems), and the HTTP body is capped by MAX_CONTENT_LENGTH before it is
+parsed.
+
+The files of one spool share a size budget of UPLOAD_MAX_BYTES (default
+256 MB); going over it raises UploadTooLarge, which the API answers with
+HTTP 413. Spools live under UPLOAD_SPOOL_DIR, or the system temp directory
+if it is unset.
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+from collections import namedtuple
+from contextlib import contextmanager
+
+MAX_UPLOAD_BYTES = int(os.environ.get("UPLOAD_MAX_BYTES", str(256 * 1024 * 1024)))
+SPOOL_DIR = os.environ.get("UPLOAD_SPOOL_DIR") or None
+BLOCK_SIZE = 1024 * 1024
+
+# A spooled upload: original file name, path on disk, content hash and size in bytes
+SpooledFile = namedtuple("SpooledFile", ["name", "path", "hash", "size"])
+
+
+class UploadTooLarge(Exception):
+    """The files of one request exceed the upload size cap"""
+
+    def __init__(self, limit):
+        super().__init__(f"Uploads exceed the limit of {limit // (1024 * 1024)} MB per request")
+        self.limit = limit
+
+
+class UploadFile:
+    """Named temp file under SPOOL_DIR that one upload is written into, hashed as it is written"""
+
+    def __init__(self, prefix="upload_"):
+        if SPOOL_DIR:
+            os.makedirs(SPOOL_DIR, exist_ok=True)
+        # Removed when closed, i.e. when Werkzeug closes the request's files
+        self.file = tempfile.NamedTemporaryFile(prefix=prefix, suffix=".pdf", dir=SPOOL_DIR)
+        self.name = self.file.name
+        self.digest = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self.digest.update(data)
+        self.size += len(data)
+        return self.file.write(data)
+
+    def __iter__(self):
+        return iter(self.file)
+
+    def __getattr__(self, attr):
+        return getattr(self.file, attr)
+
+
+def make_spool_dir(prefix="upload_"):
+    """New temp directory under SPOOL_DIR"""
+    if SPOOL_DIR:
+        os.makedirs(SPOOL_DIR, exist_ok=True)
+    return tempfile.mkdtemp(prefix=prefix, dir=SPOOL_DIR)
+
+
+def hash_file(path):
+    """SHA-256 hex digest of a file, read block by block (same digest as content_hash)"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class UploadSpool:
+    """Uploads of one request spooled into a directory under a shared size budget"""
+
+    def __init__(self, directory, max_bytes=MAX_UPLOAD_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.files = []
+
+    def add(self, upload, name=None):
+        """Spool a file-like upload to disk and return its SpooledFile"""
+        name = name or getattr(upload, "filename", None) or getattr(upload, "name", None) or "upload.pdf"
+        path = os.path.join(self.directory, f"{len(self.files)}.pdf")
+        stream = getattr(upload, "stream", upload)
+        if isinstance(stream, UploadFile):
+            return self._link(stream, name, path)
+        if hasattr(upload, "seek"):
+            upload.seek(0)
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with open(path, "wb") as f:
+                for block in iter(lambda: upload.read(BLOCK_SIZE), b""):
+                    size += len(block)
+                    if self.total_bytes + size > self.max_bytes:
+                        raise UploadTooLarge(self.max_bytes)
+                    digest.update(block)
+                    f.write(block)
+        except UploadTooLarge:
+            os.remove(path)
+            raise
+        self.total_bytes += size
+        spooled = SpooledFile(name, path, digest.hexdigest(), size)
+        self.files.append(spooled)
+        return spooled
+
+    def _link(self, upload_file, name, path):
+        """Spool an UploadFile already on disk by hard-linking it, with the hash computed while it was written"""
+        if self.total_bytes + upload_file.size > self.max_bytes:
+            raise UploadTooLarge(self.max_bytes)
+        upload_file.flush()
+        try:
+            os.link(upload_file.name, path)
+        except OSError:
+            # Spool directory on another file system
+            shutil.copyfile(upload_file.name, path)
+        self.total_bytes += upload_file.size
+        spooled = SpooledFile(name, path, upload_file.digest.hexdigest(), upload_file.size)
+        self.files.append(spooled)
+        return spooled
+
+    def add_all(self, uploads):
+        return [self.add(upload) for upload in uploads]
+
+
+@contextmanager
+def temporary_spool(max_bytes=MAX_UPLOAD_BYTES, prefix="upload_"):
+    """UploadSpool in a temp directory that is removed on exit"""
+    directory = make_spool_dir(prefix)
+    try:
+        yield UploadSpool(directory, max_bytes)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)